@@ -1,14 +1,11 @@
 from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
+from functools import cache
 from typing import Callable
 from app.data.models import Word
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from app.data.config import ROOT_DIR
 from typing import List
 import logging
+import os
 from app.decorators import log_calls
 from app.config import send_document_url
 from httpx import AsyncClient
@@ -16,7 +13,17 @@ from httpx import AsyncClient
 
 logger = logging.getLogger(__name__)
 
-pdfmetrics.registerFont(TTFont('NotoSans', '/Users/oleg/Downloads/Noto_Sans,Noto_Sans_JP/Noto_Sans_JP/static/NotoSansJP-Regular.ttf'))
+FONT_PATH = os.path.join(ROOT_DIR, 'assets', 'fonts', 'NotoSans-Regular.ttf')
+
+
+@cache
+def register_fonts(font_name: str = 'NotoSans', font_path: str = FONT_PATH):
+    '''Registers the TTF font once, on the first generated PDF.'''
+
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfbase import pdfmetrics
+
+    pdfmetrics.registerFont(TTFont(font_name, font_path))
 
 class PDF:
     '''This class implements the generation of PDF files with a list of words.'''
@@ -34,14 +41,26 @@ class PDF:
         self.client = client
         self.send_msg_func = send_msg_func
         self.elements = []
-        self.styles = getSampleStyleSheet()
-        self.normal = self.styles[self.style]
-        self.normal.fontName = self.font_name
-        self.normal.fontSize = self.font_size
+        self._normal = None
+
+    @property
+    def normal(self):
+        '''The paragraph style, reportlab is imported on first use.'''
+        if self._normal is None:
+            from reportlab.lib.styles import getSampleStyleSheet
+
+            register_fonts(self.font_name)
+            self._normal = getSampleStyleSheet()[self.style]
+            self._normal.fontName = self.font_name
+            self._normal.fontSize = self.font_size
+        return self._normal
 
 
     @log_calls
     async def generate_pdf(self, words: List[Word],) -> dict|bool:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 
         buffer = BytesIO()
 
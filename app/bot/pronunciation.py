@@ -1,8 +1,9 @@
 import asyncio
-from gtts import gTTS
 import aiofiles
 import tempfile
 import os
+import time
+from collections import Counter
 from app.telegram_utils.utils import send_message
 from app.config import send_voice_url
 import logging
@@ -10,18 +11,29 @@ from app.decorators import log_calls, except_timeout, send_action, sync_log_call
 from httpx import AsyncClient
 from app.data.cache.redis_crud import *
 from app.data.models import User
+from app.data.config import settings
+from app.task_supervisor import TaskSupervisor
 
 logger = logging.getLogger(__name__)
 
 GOOGLE_TTS_URL = 'https://translate.google.com/translate_tts'
 
+# part of the file_id cache key, change it when the synthesis parameters change
+VOICE_SETTINGS = 'gtts:com:normal'
+
 class Pronunciation:
     '''This class implements the generation of bytes for an audio file and
     sending a voice message with pronunciation to the user.'''
 
-    def __init__(self, client: AsyncClient) -> None:
+    def __init__(self, client: AsyncClient, supervisor: TaskSupervisor | None = None) -> None:
         self.send_voice_url = send_voice_url
         self.client = client
+        # the container passes its own, the 'tts_warm' kind limits the syntheses in the background
+        self.supervisor = supervisor or TaskSupervisor({'tts_warm': settings.TASK_LIMIT_TTS_WARM})
+        self.voice_stats = Counter()
+        self.voice_latency = Counter()
+        # (chat_id, word, lang) -> the synthesis running in the background
+        self.warming: dict[tuple[int, str, str], asyncio.Task] = {}
 
 
     @sync_log_calls
@@ -29,6 +41,10 @@ class Pronunciation:
         '''This function generates bytes and writes them to a file.'''
 
         logger.debug(f'language: {lang}')
+        if redis_get_voice_file_id(word=word, lang=lang, voice=VOICE_SETTINGS):
+            # the voice is already on Telegram servers, send_voice will not upload it
+            return 'cached'
+
         tts_bytes = redis_get_hash(chat_id=chat_id, word=word, lang=lang, field='pronunciation')
 
         if tts_bytes is None or tts_bytes == 'Error':
@@ -52,16 +68,64 @@ class Pronunciation:
 
         return tts_bytes
 
+    def warm(self, chat_id: int, word: str, lang: str) -> asyncio.Task | None:
+        '''Synthesizes the voice of a word in the background, so a later send_voice
+        does not wait for it. Words that are cached or already warming are skipped.'''
+
+        if not word:
+            return None
+        key = (chat_id, word, lang)
+        task = self.warming.get(key)
+        if task is None:
+            task = self.supervisor.spawn('tts_warm', self._warm(chat_id, word, lang), name=f'tts-warm-{chat_id}')
+            if task is None:
+                return None
+            self.warming[key] = task
+            task.add_done_callback(lambda _: self.warming.pop(key, None))
+            self.voice_stats['warmed'] += 1
+        return task
+
+    async def _warm(self, chat_id: int, word: str, lang: str):
+        try:
+            return await asyncio.to_thread(self.generate_tts, word=word, lang=lang, chat_id=chat_id)
+        except Exception:
+            logger.exception('could not warm the voice of %s', word)
+            return 'Error'
+
     def synthesize(self, tmp_path, word: str, lang: str) -> None:
+        from gtts import gTTS
+
         tts = gTTS(text=word, lang=lang)
         with open(tmp_path, "wb") as f:
             tts.write_to_fp(f)
 
     @except_timeout(5)
-    @send_action(0.33, 'record_voice')
+    @send_action('record_voice')
     @log_calls
     async def send_voice(self, chat_id: int, word: str, lang: str, reply_to: int, user_state: User):
 
+        cached = redis_get_voice_file_id(word=word, lang=lang, voice=VOICE_SETTINGS)
+        if cached is not None:
+            file_id, size = cached
+            sent = await self.send_cached_voice(chat_id, file_id, reply_to, size)
+            if sent:
+                return
+            if sent is None:
+                # the id is still good, uploading the voice again would not help
+                return {'detail': 'failed to send voice message'}
+            redis_delete_voice_file_id(word=word, lang=lang, voice=VOICE_SETTINGS)
+            # generate_tts skipped the synthesis while the file_id was valid
+            if redis_get_hash(chat_id=chat_id, word=word, lang=lang, field='pronunciation') is None:
+                await asyncio.to_thread(self.generate_tts, word=word, lang=lang, chat_id=chat_id)
+        else:
+            self.voice_stats['misses'] += 1
+
+        warming = self.warming.get((chat_id, word, lang))
+        if warming is not None:
+            # the bytes are in Redis once it is done, no need to poll for them
+            self.voice_stats['warm_waits'] += 1
+            await asyncio.shield(warming)
+
         tts_data = None
         count = 0
 
@@ -80,25 +144,80 @@ class Pronunciation:
                 continue
             else:
                 tts_data = tts_data_from_redis
+                break
 
             count += 1
 
             await asyncio.sleep(0.2)
 
+        if not tts_data:
+            # nobody is synthesizing it (reverse review words are never voiced in advance)
+            tts_data = await self.warm(chat_id, word, lang)
+            if not isinstance(tts_data, bytes):
+                await send_message(chat_id=chat_id, text='Failed to generate voice message. Please try again later.',
+                                   user_state=user_state, client=self.client)
+                return {'detail': 'failed to generate voice message'}
+
         try:
 
             files = {'voice': (f'{word}.mp3', tts_data, 'audio/mpeg')}
-            data = {
-                'chat_id':chat_id,
-                'reply_to_message_id': reply_to
-            }
+            data = {'chat_id': chat_id}
+            if reply_to is not None:
+                data['reply_to_message_id'] = reply_to
+            start = time.monotonic()
             response = await self.client.post(url=send_voice_url, data=data, files=files)
+            self.voice_latency['upload'] += time.monotonic() - start
             logger.info(f'response: {response}')
             json_response = response.json()
             logger.info(f'response: {json_response}')
 
             if not json_response:
                 logger.error('file is empty')
+            elif json_response.get('ok'):
+                self.voice_stats['uploads'] += 1
+                self.voice_stats['bytes_uploaded'] += len(tts_data)
+                file_id = json_response['result']['voice']['file_id']
+                redis_set_voice_file_id(word=word, lang=lang, voice=VOICE_SETTINGS, file_id=file_id,
+                                        size=len(tts_data), ttl=settings.VOICE_FILE_ID_TTL)
         except Exception:
             logger.exception('voice message was not sent')
             raise
+
+    async def send_cached_voice(self, chat_id: int, file_id: str, reply_to: int, size: int) -> bool | None:
+        '''Sends an already uploaded voice by its file_id. Returns False if Telegram rejects
+        the id and None if the message failed for any other reason (the id stays cached).'''
+
+        start = time.monotonic()
+        payload = {'chat_id': chat_id, 'voice': file_id}
+        if reply_to is not None:
+            payload['reply_to_message_id'] = reply_to
+        response = await self.client.post(url=send_voice_url, json=payload)
+        json_response = response.json()
+
+        if json_response.get('ok'):
+            self.voice_latency['hit'] += time.monotonic() - start
+            self.voice_stats['hits'] += 1
+            self.voice_stats['bytes_saved'] += size
+            return True
+
+        description = json_response.get('description') or ''
+        if response.status_code == 400 and ('file identifier' in description.lower() or 'file_id' in description.lower()):
+            self.voice_stats['stale'] += 1
+            logger.warning('cached voice %s was rejected: %s', file_id, description)
+            return False
+
+        self.voice_stats['failed'] += 1
+        logger.error('cached voice %s was not sent: %s %s', file_id, response.status_code, description)
+        return None
+
+    def voice_cache_stats(self) -> dict:
+        hits = self.voice_stats['hits']
+        uploads = self.voice_stats['uploads']
+        requests = hits + self.voice_stats['misses'] + self.voice_stats['stale']
+        return {
+            **{name: self.voice_stats[name] for name in ('hits', 'misses', 'stale', 'uploads', 'bytes_uploaded', 'bytes_saved',
+                                                          'failed', 'warmed', 'warm_waits')},
+            'hit_rate': round(hits / requests, 3) if requests else 0.0,
+            'avg_hit_ms': round(self.voice_latency['hit'] / hits * 1000, 3) if hits else 0.0,
+            'avg_upload_ms': round(self.voice_latency['upload'] / uploads * 1000, 3) if uploads else 0.0,
+        }
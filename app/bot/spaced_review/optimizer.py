@@ -0,0 +1,203 @@
+'''Fits the scheduler parameters of every chat to its review log.
+
+Run: python -m app.bot.spaced_review.optimizer [--retention 0.9] [--min-reviews 200]
+'''
+import argparse
+import asyncio
+import logging
+from typing import Callable, NamedTuple
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.data.models import ReviewLog, SchedulerParameters
+from app.data.config import settings
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, Deck, SchedulerParams, schedule
+
+logger = logging.getLogger(__name__)
+
+PENALTIES = np.linspace(0.25, 1.25, 9)
+MEMORIES = np.geomspace(0.25, 4.0, 25)
+INTERVAL_FACTORS = (0.25, 4.0)
+# the forgetting curve is 90% at memory * stability minutes
+_CURVE = 9.0
+_LOG_FLOOR = np.log(1e-6)
+
+
+class ReviewHistory(NamedTuple):
+    '''The review log as parallel arrays, a card is word_id * 2 + reverse.'''
+
+    chat_id: np.ndarray
+    card: np.ndarray
+    reviewed_at: np.ndarray
+    rating: np.ndarray
+    elapsed: np.ndarray
+    repetitions: np.ndarray
+    easiness: np.ndarray
+    stability: np.ndarray
+
+    @classmethod
+    def of(cls, columns: np.ndarray) -> 'ReviewHistory':
+        '''From rows of chat_id, word_id, reverse, reviewed_at (epoch seconds), rating, elapsed,
+        repetitions, easiness and stability, sorted by card and time.'''
+
+        chat_id, word_id, reverse, reviewed_at, rating, elapsed, repetitions, easiness, stability = columns.T
+        card = word_id.astype(np.int64) * 2 + reverse.astype(np.int64)
+        order = np.lexsort((reviewed_at, card))
+        return cls(chat_id.astype(np.int64)[order], card[order], reviewed_at[order], rating.astype(np.int64)[order],
+                   elapsed[order], repetitions.astype(np.int64)[order], easiness[order], stability[order])
+
+
+class Fit(NamedTuple):
+    chat_id: int
+    reviews: int
+    good_penalty: float
+    memory: float
+    interval_factor: float
+    log_loss: float
+    # the share of reviews recalled at the intervals of the default parameters
+    retention: float
+
+
+def recall_probability(elapsed, stability, memory):
+    return 1.0 / (1.0 + elapsed / (_CURVE * memory * stability))
+
+
+def replay(history: ReviewHistory, params: SchedulerParams = DEFAULT_PARAMS) -> np.ndarray:
+    '''The stability of the card before each review if it had been scheduled with params.
+
+    Every card starts from its state logged with its first review. The k-th
+    reviews of all cards are scheduled together, so there are as many array
+    updates as the most reviewed card has reviews.'''
+
+    if not len(history.card):
+        return np.empty(0)
+
+    _, first, counts = np.unique(history.card, return_index=True, return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    first, counts = first[order], counts[order]
+
+    deck = Deck.of(history.repetitions[first], np.maximum(1, history.stability[first]).astype(np.int64),
+                   history.easiness[first], history.stability[first], params)
+    before = np.empty(len(history.card))
+    for k in range(counts[0]):
+        # the cards are sorted by their number of reviews, those with a k-th review come first
+        active = np.searchsorted(-counts, -k, side='left')
+        deck = Deck(*(column[:active] for column in deck))
+        rows = first[:active] + k
+        before[rows] = deck.stability
+        deck = schedule(history.rating[rows], deck, params)
+    return before
+
+
+def fit(history: ReviewHistory, retention: float = 0.9, min_reviews: int = 200,
+        penalties=PENALTIES, memories=MEMORIES) -> list[Fit]:
+    '''Grid search of good_penalty and the memory of each chat by the likelihood of its recalls.
+
+    For every good_penalty the log is replayed once, then the log likelihood of
+    every memory is summed per chat with bincount. interval_factor is the
+    multiple of the stability at which the fitted forgetting curve falls to
+    `retention`.'''
+
+    chats, chat_of_row = np.unique(history.chat_id, return_inverse=True)
+    usable = (history.elapsed > 0) & (history.stability > 0)
+    chat_of_row = chat_of_row[usable]
+    recalled = history.rating[usable] >= 3
+    reviews = np.bincount(chat_of_row, minlength=len(chats))
+
+    best = np.full(len(chats), -np.inf)
+    best_penalty = np.full(len(chats), DEFAULT_PARAMS.good_penalty)
+    best_memory = np.ones(len(chats))
+    for penalty in penalties:
+        stability = replay(history, DEFAULT_PARAMS._replace(good_penalty=float(penalty)))[usable]
+        ratio = history.elapsed[usable] / stability
+        log_ratio = np.log(ratio)
+        for memory in memories:
+            # with x = ratio / (9 * memory): log p = -log(1 + x), log(1 - p) = log x - log(1 + x)
+            scale = _CURVE * memory
+            log_recall = -np.log1p(ratio / scale)
+            log_forget = np.maximum(log_ratio - np.log(scale) + log_recall, _LOG_FLOOR)
+            likelihood = np.bincount(chat_of_row, np.where(recalled, log_recall, log_forget), minlength=len(chats))
+            better = likelihood > best
+            best[better] = likelihood[better]
+            best_penalty[better] = penalty
+            best_memory[better] = memory
+
+    factor = np.clip(best_memory * _CURVE * (1 / retention - 1), *INTERVAL_FACTORS)
+    kept = reviews >= min_reviews
+    return [
+        Fit(int(chat_id), int(count), float(penalty), float(memory), float(interval_factor),
+            float(-loss / max(count, 1)), float(recall_probability(1.0, 1.0, memory)))
+        for chat_id, count, penalty, memory, interval_factor, loss in zip(
+            chats[kept], reviews[kept], best_penalty[kept], best_memory[kept], factor[kept], best[kept])
+    ]
+
+
+async def load_history(db: AsyncSession, batch: int = 100_000) -> ReviewHistory:
+    '''The whole review log, streamed in batches.'''
+
+    query = select(
+        ReviewLog.chat_id, ReviewLog.word_id, ReviewLog.reverse, func.extract('epoch', ReviewLog.reviewed_at),
+        ReviewLog.rating, ReviewLog.elapsed, ReviewLog.repetitions, ReviewLog.easiness, ReviewLog.stability,
+    ).execution_options(yield_per=batch)
+
+    chunks = []
+    result = await db.stream(query)
+    async for rows in result.partitions():
+        chunks.append(np.array(rows, dtype=np.float64))
+    logger.info('review log loaded: %i rows', sum(len(chunk) for chunk in chunks))
+    return ReviewHistory.of(np.concatenate(chunks) if chunks else np.empty((0, 9)))
+
+
+async def save_fits(db: AsyncSession, fits: list[Fit]):
+    if not fits:
+        return
+    statement = pg_insert(SchedulerParameters)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[SchedulerParameters.chat_id],
+            set_={
+                'good_penalty': statement.excluded.good_penalty,
+                'interval_factor': statement.excluded.interval_factor,
+                'reviews': statement.excluded.reviews,
+                'fitted_at': func.now(),
+            },
+        ),
+        [{'chat_id': f.chat_id, 'good_penalty': f.good_penalty, 'interval_factor': f.interval_factor,
+          'reviews': f.reviews} for f in fits],
+    )
+    await db.commit()
+
+
+async def run(session_factory: Callable[[], AsyncSession], retention: float = 0.9, min_reviews: int = 200) -> list[Fit]:
+    async with session_factory() as db:
+        history = await load_history(db)
+        fits = fit(history, retention, min_reviews)
+        await save_fits(db, fits)
+    logger.info('scheduler parameters fitted for %i chats', len(fits))
+    return fits
+
+
+def main():
+    from app.data.db_init import async_session_factory, dispose_engines
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--retention', type=float, default=settings.REVIEW_TARGET_RETENTION)
+    parser.add_argument('--min-reviews', type=int, default=settings.SCHEDULER_FIT_MIN_REVIEWS)
+    args = parser.parse_args()
+
+    async def fit_all():
+        try:
+            return await run(async_session_factory, args.retention, args.min_reviews)
+        finally:
+            await dispose_engines()
+
+    fits = asyncio.run(fit_all())
+    print(f'{len(fits)} chats fitted')
+    for f in fits[:20]:
+        print(f'{f.chat_id:>12} reviews={f.reviews:<8} good_penalty={f.good_penalty:.2f} '
+              f'interval_factor={f.interval_factor:.2f} retention={f.retention:.3f}')
+
+
+if __name__ == '__main__':
+    main()
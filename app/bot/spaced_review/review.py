@@ -4,14 +4,21 @@ from app.telegram_utils.utils import send_message
 from app.data.word_crud import WordsCRUD
 from app.schemas. bot_schemas import ReviewState
 from app.bot.pronunciation import Pronunciation
-from app.telegram_utils.bottom_funcs import send_keyboard
-from app.telegram_utils.bottoms import review_bottoms
+from app.telegram_utils.bottom_funcs import send_keyboard, send_card, edit_card
+from app.telegram_utils.bottoms import review_bottoms, review_inline_bottoms
+from app.data.config import settings
 from app.telegram_utils.utils import update_bd
+from app.data.unit_of_work import after_commit
 from app.dependencies import session_dep
-from typing import List
+import asyncio
 import logging
+import time
 from httpx import AsyncClient
-from app.bot.spaced_review.review_states import review_states
+from app.bot.spaced_review.review_states import ReviewLogEntry, ReviewSession, ReviewWord, review_sessions
+from app.bot.spaced_review.review_buffer import review_buffer
+from app.bot.spaced_review.review_pages import review_pager
+from app.bot.spaced_review.review_latency import review_latency
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, Deck, SchedulerParams, schedule
 from app.decorators import send_action, except_timeout
 
 logger = logging.getLogger(__name__)
@@ -19,8 +26,6 @@ logger = logging.getLogger(__name__)
 
 
 class SpacedReview:
-    EASINESS_4 = 1.75
-    EASINESS_5 = 2.5
     quality_map = {
         'forgot': 0,
         'hard': 3,
@@ -34,62 +39,115 @@ class SpacedReview:
         self.pronunciation = pronunciation
         self.db = db
         self.client = client
+        self.sessions: dict[int, ReviewSession] = {}
+        self.pager = review_pager
+        self.params = DEFAULT_PARAMS
 
 
-    def calculate_interval(self, repetitions: int, quality: int, last_interval: int) -> int:
-        '''A function that calculates the interval for the next repetition.'''
-
-        match repetitions:
-            case 1:
-                return 1
-            case 2:
-                return 5
-            case 3:
-                return 10
-            case _:
-                match quality:
-                    case 4:
-                        return int(last_interval * self.EASINESS_4)
-                    case 5:
-                        return int(last_interval * self.EASINESS_5)
-                return last_interval
+    async def update_word_states(self, quality: int, word: Word,
+                                 params: SchedulerParams | None = None) -> ReviewLogEntry | None:
+        '''A function that updates the state of words in the database for further work,
+        returns the entry of the rating for the review log.'''
 
+        params = params or self.params
+        logger.debug('data before update: rep: %s, interval: %s', word.repetitions, word.interval)
+        deck = Deck.of(
+            [word.repetitions], [word.interval],
+            None if word.easiness is None else [word.easiness],
+            None if word.stability is None else [word.stability],
+            params,
+        )
+        now = datetime.now(timezone.utc)
+        entry = None
+        if word.review_time is not None:
+            # review_time is always set to the time of the last rating plus the interval
+            elapsed = now - word.review_time + timedelta(minutes=word.interval)
+            entry = ReviewLogEntry(word.id, now, quality, elapsed / timedelta(minutes=1), int(deck.repetitions[0]),
+                                   float(deck.easiness[0]), float(deck.stability[0]))
+
+        deck = schedule(quality, deck, params)
+        word.repetitions = int(deck.repetitions[0])
+        word.interval = int(deck.interval[0])
+        word.easiness = float(deck.easiness[0])
+        word.stability = float(deck.stability[0])
+
+        logger.info('data after update: rep: %s, interval: %s, easiness: %.2f', word.repetitions, word.interval,
+                    word.easiness)
+
+        word.review_time = now + timedelta(minutes=word.interval)
+        logger.debug('review_time: %s', word.review_time)
+        return entry
 
-    async def update_word_states(self, quality: int, word: Word):
-        '''A function that updates the state of words in the database for further work.'''
 
-        logger.debug('data before update: rep: %s, interval: %s', word.repetitions, word.interval)
-        if quality < 3:
-            word.repetitions = 0
-            word.interval = 1
-        elif quality > 3:
-            word.repetitions += 1
-            word.interval = self.calculate_interval(
-                word.repetitions,
-                quality,
-                word.interval
-            )
+    async def record_result(self, chat_id: int, word: ReviewWord, entry: ReviewLogEntry | None = None):
+        '''Buffers the rated word, the buffer is written every few ratings and when the session ends.'''
 
-        logger.info('data after update: rep: %s, interval: %s', word.repetitions, word.interval)
+        session = self.sessions[chat_id]
+        flushed = 0
+        if review_buffer.add(session, word, entry):
+            flushed = await review_buffer.flush(chat_id, session, self.db)
+        await review_sessions.put(chat_id, session)
+        if flushed:
+            # stored with the written results until they are committed, then without them
+            await after_commit(self.db, review_sessions.put, chat_id, session)
 
-        word.review_time = datetime.now(timezone.utc) + timedelta(minutes=word.interval)
-        logger.debug('review_time: %s', word.review_time)
 
+    async def load_session(self, chat_id: int, user_state: User) -> ReviewSession | None:
+        '''The review session of the chat, None (and the user is told) when it has expired.'''
 
-    async def get_review_words(self, chat_id: int, user_state: User) -> List[Word]|None:
-        words = await self.word_crud.get_words_for_review(chat_id, user_state)
-        if not words:
-            await send_message(chat_id, 'At the moment there are no words to repeat.', user_state, self.client)
+        session = self.sessions.get(chat_id)
+        if session is None:
+            session = await review_sessions.get(chat_id)
+        if session is None:
             user_state.state = 'ready'
+            user_state.review_index = 0
+            await send_message(chat_id, 'The review session has expired, start it again.', user_state, self.client,
+                               remove_keyboard=True)
+            await update_bd(user_state, self.db)
             return None
 
+        self.sessions[chat_id] = session
+        return session
+
+
+    async def session_words(self, session: ReviewSession, *positions: int) -> list[ReviewWord]:
+        '''The words at the given positions with the ratings not written yet, in one query.'''
+
+        ids = [session.ids[position] for position in positions if position < len(session)]
+        rows = await self.word_crud.get_review_words(session.model, ids)
+
+        words = []
+        for word_id in ids:
+            row = rows.get(word_id)
+            # deleted during the session
+            word = ReviewWord(*row) if row is not None else ReviewWord(word_id, '', '', 0, 1, None)
+            result = session.results.get(word_id)
+            if result is not None:
+                word.repetitions, word.interval, word.review_time, word.easiness, word.stability = result
+            words.append(word)
         return words
 
 
+    def warm_voices(self, chat_id: int, user_state: User, words):
+        '''Starts synthesizing the voices of upcoming cards, one of them may be forgotten.'''
+
+        for word in words:
+            voice_word = word.word if user_state.curr_command == '/repeating' else word.translate
+            self.pronunciation.warm(chat_id, voice_word, user_state.lang_code)
+
+
+    def upcoming(self, user_state: User) -> range:
+        '''Positions of the current card, the next one and the ones to warm voices for.'''
+
+        return range(user_state.review_index, user_state.review_index + 2 + settings.REVIEW_WARM_AHEAD)
+
+
     async def check_word_quality(self, chat_id: int, word: Word, quality: int, user_state: User):
         '''A function that performs the logic of sending the translation to the user and pronouncing the forgotten word during repetition.'''
 
         if quality == 0:
+            # read before the next card changes message_id
+            reply_to = user_state.message_id - 1
 
             if user_state.curr_command == '/repeating':
                 word_param = 'word'
@@ -98,10 +156,10 @@ class SpacedReview:
 
             word_for_voice_msg = getattr(word, word_param)
 
-            await send_message(chat_id, f'Translation of a forgotten word: {word.translate}', user_state, self.client, reply_to_message_id=user_state.message_id - 1)
+            await send_message(chat_id, f'Translation of a forgotten word: {word.translate}', user_state, self.client, reply_to_message_id=reply_to)
 
             await self.pronunciation.send_voice(chat_id=chat_id, word=word_for_voice_msg, lang=user_state.lang_code,
-                                                reply_to=user_state.message_id - 1, user_state=user_state)
+                                                reply_to=reply_to, user_state=user_state)
 
 
     async def check_valid_answer(self, chat_id: int, msg: str, user_state: User, reply_to: int) -> bool:
@@ -116,9 +174,9 @@ class SpacedReview:
         return True
 
 
-    async def check_if_finish(self, chat_id: int, word: Word, words: list[Word], user_state: User,
+    async def check_if_finish(self, chat_id: int, word: ReviewWord, session: ReviewSession, user_state: User,
                               text: str, quality: int, reply_to_id: int, model_param: str) -> bool|None:
-        if user_state.review_index == len(words) - 1 or text == 'finish repeating':
+        if user_state.review_index == len(session) - 1 or text == 'finish repeating':
             await self.finish_review(chat_id, word, user_state, quality, reply_to_id, model_param)
             return True
 
@@ -128,16 +186,26 @@ class SpacedReview:
     async def start_review(self, chat_id: int, user_state: User, text: str, client: AsyncClient, model_param: str):
         '''A function that starts a repetition and changes the user's state on await_raiting.'''
 
-        if user_state.curr_command == '/repeating':
-            words = await self.word_crud.get_words_for_review(chat_id, user_state)
-        else:
-            words = await self.word_crud.get_words_for_reverse_review(chat_id, user_state)
+        session, words = await self.pager.start(self.word_crud, chat_id, user_state.lang_code,
+                                                reverse=user_state.curr_command != '/repeating')
+        if not words:
+            await send_message(chat_id, 'At the moment there are no words to repeat.', user_state, self.client)
+            return
 
         user_state.state = 'await_rating'
 
-        review_states[chat_id] = words
-
         user_state.review_index = 0
+        self.warm_voices(chat_id, user_state, words[:1 + settings.REVIEW_WARM_AHEAD])
+
+        if settings.REVIEW_UI == 'edit':
+            session.card_id = await send_card(
+                chat_id, client, f"Let's start repeating, evaluate how well you remember this word.\n\n{words[0].word}",
+                review_inline_bottoms,
+            )
+            await review_sessions.put(chat_id, session)
+            return
+
+        await review_sessions.put(chat_id, session)
 
         await send_message(chat_id=chat_id, user_state=user_state, text="Let's start repeating, evaluate how well you remember this word.", client=self.client)
 
@@ -150,38 +218,61 @@ class SpacedReview:
                               client: AsyncClient, reply_to_id: int, model_param: str):
         '''A function that starts the continuation of repetition until completion.'''
 
-        words = review_states[chat_id]
+        if settings.REVIEW_UI == 'edit':
+            return await self.continue_review_in_place(chat_id, user_state, text, client)
 
-        if user_state.review_index == len(words):
+        started = time.monotonic()
+        session = await self.load_session(chat_id, user_state)
+        if session is None:
+            return {'details': 'review session has expired'}
+
+        if user_state.review_index == len(session):
             user_state.review_index = 0
 
-        word = words[user_state.review_index]
+        await self.pager.ensure(self.word_crud, chat_id, user_state.lang_code, session, user_state.review_index + 1)
+        words = await self.session_words(session, *self.upcoming(user_state))
+        word = words[0]
         logger.debug('review word: %s', word)
 
         quality = self.quality_map.get(text)
 
-        if await self.check_if_finish(chat_id, word, words, user_state, text, quality, reply_to_id, model_param):
+        if await self.check_if_finish(chat_id, word, session, user_state, text, quality, reply_to_id, model_param):
             return {'details':'review has been finished'}
 
 
         if not await self.check_valid_answer(chat_id, text, user_state, reply_to_id):
             return {'details': 'invalid answer'}
 
-        await self.check_word_quality(chat_id, word, quality, user_state)
-
-        await self.update_word_states(quality, word)
+        entry = await self.update_word_states(quality, word, session.params)
+        await self.record_result(chat_id, word, entry)
 
         user_state.review_index += 1
+        self.pager.prefetch(chat_id, user_state.lang_code, session, user_state.review_index)
+        self.warm_voices(chat_id, user_state, words[1:])
 
-        next_word = words[user_state.review_index]
+        next_word = words[1]
         logger.debug('next word: %s', next_word)
 
-        user_state.message_id = await send_message(text=next_word.word, chat_id=chat_id, user_state=user_state, client=client)
+        async def send_next_card():
+            user_state.message_id = await send_message(text=next_word.word, chat_id=chat_id, user_state=user_state, client=client)
+            review_latency.observe(time.monotonic() - started, forgot=quality == 0)
 
+        # the feedback for a forgotten word does not hold the next card back
+        await asyncio.gather(self.check_word_quality(chat_id, word, quality, user_state), send_next_card())
 
-    async def finish_review(self, chat_id: int, word: Word, user_state: User, quality: int, reply_to_id: int, model_param: str):
+
+    async def finish_review(self, chat_id: int, word: ReviewWord, user_state: User, quality: int, reply_to_id: int, model_param: str):
         await self.check_word_quality(chat_id, word, quality, user_state)
 
+        session = self.sessions.get(chat_id)
+        if session is None:
+            session = await review_sessions.get(chat_id)
+        if session is not None:
+            if quality is not None:
+                entry = await self.update_word_states(quality, word, session.params)
+                review_buffer.add(session, word, entry)
+            await review_buffer.flush(chat_id, session, self.db)
+
         await send_message(chat_id=chat_id, user_state=user_state, text='Repeating has been finished.', client=self.client, remove_keyboard=True)
 
         user_state.state = 'ready'
@@ -189,6 +280,88 @@ class SpacedReview:
 
         await update_bd(user_state, self.db)
 
-        del review_states[chat_id]
+        # a rollback keeps the session with its results for the next attempt
+        await after_commit(self.db, review_sessions.delete, chat_id)
+        self.sessions.pop(chat_id, None)
+        self.pager.discard(chat_id)
+
+
+    async def continue_review_in_place(self, chat_id: int, user_state: User, text: str, client: AsyncClient):
+        '''Rates the current card and edits the card message to show the next word,
+        so a session costs one sendMessage instead of one or more per word.'''
+
+        started = time.monotonic()
+        session = await self.load_session(chat_id, user_state)
+        if session is None:
+            return {'details': 'review session has expired'}
+        # None when the card could not be sent, the next step sends a new one instead of editing
+        card_id = session.card_id
+
+        if text == 'finish repeating':
+            return await self.finish_review_in_place(chat_id, user_state, client, card_id, 'Repeating has been finished.')
+
+        quality = self.quality_map.get(text)
+        if quality is None:
+            await send_message(chat_id, 'Invalid answer', user_state, self.client, inline_reply=True)
+            return {'details': 'invalid answer'}
+
+        await self.pager.ensure(self.word_crud, chat_id, user_state.lang_code, session, user_state.review_index + 1)
+        words = await self.session_words(session, *self.upcoming(user_state))
+        word = words[0]
+
+        entry = await self.update_word_states(quality, word, session.params)
+        await self.record_result(chat_id, word, entry)
+        user_state.review_index += 1
+        self.pager.prefetch(chat_id, user_state.lang_code, session, user_state.review_index)
+        self.warm_voices(chat_id, user_state, words[1:])
+
+        feedback = f'Translation of a forgotten word: {word.translate}\n\n' if quality == 0 else ''
+
+        if user_state.review_index == len(session):
+            next_step = self.finish_review_in_place(chat_id, user_state, client, card_id,
+                                                    f'{feedback}Repeating has been finished.')
+        else:
+            next_step = self.show_card(chat_id, user_state, client, card_id, f'{feedback}{words[1].word}',
+                                       started, quality == 0)
+
+        if quality != 0:
+            return await next_step
+
+        word_for_voice_msg = word.word if user_state.curr_command == '/repeating' else word.translate
+        _, result = await asyncio.gather(
+            self.pronunciation.send_voice(chat_id=chat_id, word=word_for_voice_msg, lang=user_state.lang_code,
+                                          reply_to=card_id, user_state=user_state),
+            next_step,
+        )
+        return result
+
+
+    async def show_card(self, chat_id: int, user_state: User, client: AsyncClient, card_id: int, text: str,
+                        started: float, forgot: bool):
+        await update_bd(user_state, self.db)
+        if card_id is None:
+            session = self.sessions[chat_id]
+            session.card_id = await send_card(chat_id, client, text, review_inline_bottoms)
+            await review_sessions.put(chat_id, session)
+        else:
+            await edit_card(chat_id, card_id, client, text, review_inline_bottoms, inline_reply=True)
+        review_latency.observe(time.monotonic() - started, forgot=forgot)
+        return {'details': 'card has been updated'}
+
+
+    async def finish_review_in_place(self, chat_id: int, user_state: User, client: AsyncClient, card_id: int, text: str):
+        await review_buffer.flush(chat_id, self.sessions[chat_id], self.db)
 
+        user_state.state = 'ready'
+        user_state.review_index = 0
+        await update_bd(user_state, self.db)
+
+        if card_id is None:
+            await send_message(chat_id, text, user_state, self.client)
+        else:
+            await edit_card(chat_id, card_id, client, text, inline_reply=True)
 
+        await after_commit(self.db, review_sessions.delete, chat_id)
+        self.sessions.pop(chat_id, None)
+        self.pager.discard(chat_id)
+        return {'details': 'review has been finished'}
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from typing import Callable
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.data.unit_of_work import after_commit, commit_or_defer
+from app.data.config import settings
+from app.data.models import ReviewLog
+from app.bot.spaced_review.review_states import ReviewLogEntry, ReviewSession, ReviewSessionStore, review_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewBuffer:
+    '''Writes the results of review sessions in batches.
+
+    The words of a session are read without being bound to the database session,
+    so rating them writes nothing. Their new repetitions, interval and review_time
+    are kept with the review session and written with one bulk UPDATE by primary
+    key when the session ends, every `flush_every` ratings, and by the sweeper for
+    sessions idle for `idle_timeout` seconds. Every rating is appended to the
+    review log in the same transaction. The results are absolute and a log entry
+    already written is skipped, so writing a batch twice is harmless. The written
+    results leave the session only once the transaction has committed.'''
+
+    def __init__(self, store: ReviewSessionStore, flush_every: int = 10, idle_timeout: float = 300.0):
+        self.store = store
+        self.flush_every = flush_every
+        self.idle_timeout = idle_timeout
+
+        self.ratings = 0
+        self.flushes = 0
+        self.rows = 0
+        self.logged = 0
+        self.swept = 0
+        self.errors = 0
+
+    def add(self, session: ReviewSession, word, entry: ReviewLogEntry | None = None) -> bool:
+        '''Buffers the current state of a rated word and its log entry, returns True when a flush is due.'''
+
+        self.ratings += 1
+        return session.add_result(word, entry) >= self.flush_every
+
+    async def flush(self, chat_id: int, session: ReviewSession, db: AsyncSession) -> int:
+        '''Writes the buffered results of the session, returns the number of rows.
+        They stay with the session until the commit, deferred by the unit of work of
+        the update, has succeeded, and for the next flush if it fails.'''
+
+        if not session.results:
+            return 0
+
+        model = session.model
+        written = dict(session.results)
+        log = list(session.log)
+        rows = [{'id': word_id, **result._asdict()} for word_id, result in written.items()]
+        try:
+            # limited to the chat, a word deleted during the session is skipped instead of failing the batch;
+            # the words are not in the session, there is nothing to synchronize
+            await db.execute(update(model).where(model.chat_id == chat_id)
+                             .execution_options(synchronize_session=None), rows)
+            if log:
+                await db.execute(
+                    pg_insert(ReviewLog).on_conflict_do_nothing(
+                        index_elements=[ReviewLog.word_id, ReviewLog.reverse, ReviewLog.reviewed_at],
+                    ),
+                    [{'chat_id': chat_id, 'reverse': session.reverse, **entry._asdict()} for entry in log],
+                )
+            await commit_or_defer(db)
+        except Exception:
+            self.errors += 1
+            logger.exception('could not write %i review results of chat %s', len(rows), chat_id)
+            raise
+
+        await after_commit(db, self._written, session, written, log)
+        return len(rows)
+
+    def _written(self, session: ReviewSession, written: dict, log: list):
+        # a word rated again since the flush keeps its newer result
+        for word_id, result in written.items():
+            if session.results.get(word_id) == result:
+                del session.results[word_id]
+        logged = set(log)
+        session.log[:] = [entry for entry in session.log if entry not in logged]
+        self.logged += len(log)
+        self.flushes += 1
+        self.rows += len(written)
+
+    async def sweep(self, session_factory: Callable[[], AsyncSession], idle_for: float | None = None) -> int:
+        '''Flushes the sessions idle for longer than idle_for (idle_timeout by default), 0 flushes all.'''
+
+        idle = await self.store.idle(self.idle_timeout if idle_for is None else idle_for)
+        if not idle:
+            return 0
+
+        rows = 0
+        async with session_factory() as db:
+            for chat_id in idle:
+                session = await self.store.get(chat_id)
+                if session is None:
+                    # expired, only its entry in the index is left
+                    await self.store.delete(chat_id)
+                    continue
+                try:
+                    rows += await self.flush(chat_id, session, db)
+                except Exception:
+                    await db.rollback()
+                    continue
+                # a rating during the flush saved a newer session, it keeps the results as
+                # well and writes them again with its next flush
+                await self.store.replace(chat_id, session)
+                self.swept += 1
+        return rows
+
+    async def run_sweeper(self, session_factory: Callable[[], AsyncSession], interval: float = 60.0):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep(session_factory)
+            except Exception:
+                logger.exception('review buffer sweep failed')
+
+    def stats(self) -> dict:
+        return {
+            'flush_every': self.flush_every,
+            'ratings': self.ratings,
+            'flushes': self.flushes,
+            'rows': self.rows,
+            'logged': self.logged,
+            'swept': self.swept,
+            'errors': self.errors,
+            'sessions': self.store.stats(),
+        }
+
+
+review_buffer = ReviewBuffer(review_sessions, flush_every=settings.REVIEW_FLUSH_EVERY,
+                             idle_timeout=settings.REVIEW_FLUSH_IDLE)
@@ -0,0 +1,54 @@
+import logging
+from collections import deque
+from app.data.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class ReviewLatency:
+    '''Time from a rating to the next card being on its way, per kind of rating
+    ('rated' or 'forgot', which also sends the translation and the voice), over
+    the last `window` ratings of each kind.
+
+    The target is only a reporting threshold: over_target counts the ratings
+    slower than it, nothing is skipped or cut short to meet it.'''
+
+    def __init__(self, target: float = 0.5, window: int = 1000):
+        self.target = target
+        self.samples: dict[str, deque[float]] = {
+            'rated': deque(maxlen=window),
+            'forgot': deque(maxlen=window),
+        }
+
+        self.count = 0
+        self.over_target = 0
+
+    def observe(self, seconds: float, forgot: bool = False):
+        self.samples['forgot' if forgot else 'rated'].append(seconds)
+        self.count += 1
+        if seconds > self.target:
+            self.over_target += 1
+            logger.debug('next card after %.3f s, the target is %.3f s', seconds, self.target)
+
+    def stats(self) -> dict:
+        result = {
+            'target_ms': round(self.target * 1000, 1),
+            'count': self.count,
+            'over_target': self.over_target,
+        }
+        for kind, samples in self.samples.items():
+            values = sorted(samples)
+            result[kind] = {
+                'count': len(values),
+                'p50_ms': round(_percentile(values, 0.5) * 1000, 1) if values else 0.0,
+                'p95_ms': round(_percentile(values, 0.95) * 1000, 1) if values else 0.0,
+                'max_ms': round(values[-1] * 1000, 1) if values else 0.0,
+            }
+        return result
+
+
+review_latency = ReviewLatency(target=settings.REVIEW_CARD_LATENCY_TARGET)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.data.word_crud import WordsCRUD
+from app.data.db_init import async_session_factory
+from app.data.config import settings
+from app.bot.spaced_review.review_states import ReviewSession
+from app.task_supervisor import TaskSupervisor
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewPager:
+    '''Loads the due words of a review session in pages, most overdue first.
+
+    Starting a session reads one page. When the session gets within
+    `prefetch_ahead` words of the end of what is loaded, the next page is read in
+    the background by the task supervisor, on its own database session. The update that needs the page
+    takes it if the session still ends where the prefetch started (another worker
+    may have loaded the page meanwhile), otherwise it reads the page itself.'''
+
+    def __init__(self, page_size: int = 20, prefetch_ahead: int = 5,
+                 session_factory: Callable[[], AsyncSession] | None = None, max_prefetches: int = 10000,
+                 supervisor: TaskSupervisor | None = None):
+        self.page_size = page_size
+        self.prefetch_ahead = prefetch_ahead
+        self.session_factory = session_factory
+        self.max_prefetches = max_prefetches
+        # replaced by the container's, the 'review_page' kind limits the reads in the background
+        self.supervisor = supervisor or TaskSupervisor({'review_page': settings.TASK_LIMIT_REVIEW_PAGE})
+        # chat_id -> (the cursor the page starts after, the task reading it)
+        self.prefetches: dict[int, tuple[tuple[datetime, int], asyncio.Task]] = {}
+
+        self.pages = 0
+        self.prefetched = 0
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.errors = 0
+
+    async def start(self, word_crud: WordsCRUD, chat_id: int, language: str, reverse: bool) -> tuple[ReviewSession, list]:
+        '''A new session with its first page loaded, and the rows of that page. The
+        scheduler parameters fitted for the chat come with the page.'''
+
+        self.discard(chat_id)
+        session = ReviewSession((), reverse=reverse, as_of=datetime.now(timezone.utc), done=False)
+        rows = await word_crud.get_due_page(session.model, chat_id, language, session.as_of, None, self.page_size,
+                                            with_params=True)
+        self.pages += 1
+        self._append(session, rows)
+        if rows and rows[0].good_penalty is not None:
+            session.params = session.params._replace(good_penalty=rows[0].good_penalty,
+                                                     interval_factor=rows[0].interval_factor)
+        return session, rows
+
+    async def ensure(self, word_crud: WordsCRUD, chat_id: int, language: str, session: ReviewSession, position: int):
+        '''Loads pages until the word at position is loaded or there are no more words.'''
+
+        while position >= len(session) and not session.done:
+            rows = await self._take_prefetched(chat_id, session)
+            if rows is None:
+                rows = await word_crud.get_due_page(session.model, chat_id, language, session.as_of,
+                                                    session.after, self.page_size)
+                self.pages += 1
+            self._append(session, rows)
+
+    def prefetch(self, chat_id: int, language: str, session: ReviewSession, position: int):
+        '''Starts reading the next page when the session is close to the end of the loaded words.'''
+
+        if (session.done or self.session_factory is None or chat_id in self.prefetches
+                or len(session) - position > self.prefetch_ahead):
+            return
+
+        if len(self.prefetches) >= self.max_prefetches:
+            # abandoned sessions never take their page
+            self.discard(next(iter(self.prefetches)))
+
+        task = self.supervisor.spawn(
+            'review_page', self._read_page(session.model, chat_id, language, session.as_of, session.after),
+            name=f'review-page-{chat_id}',
+        )
+        if task is None:
+            return
+        self.prefetches[chat_id] = (session.after, task)
+        self.prefetched += 1
+
+    def discard(self, chat_id: int):
+        entry = self.prefetches.pop(chat_id, None)
+        if entry is None:
+            return
+        entry[1].cancel()
+
+    async def _read_page(self, model, chat_id: int, language: str, as_of: datetime, after: tuple[datetime, int]) -> list:
+        async with self.session_factory() as db:
+            return await WordsCRUD(db).get_due_page(model, chat_id, language, as_of, after, self.page_size)
+
+    async def _take_prefetched(self, chat_id: int, session: ReviewSession) -> list | None:
+        entry = self.prefetches.pop(chat_id, None)
+        if entry is None:
+            return None
+
+        after, task = entry
+        if after != session.after:
+            task.cancel()
+            self.prefetch_misses += 1
+            return None
+
+        # the supervisor logs a failed read and returns None, the page is read again
+        rows = None if task.cancelled() else await task
+        if rows is None:
+            self.errors += 1
+            return None
+        self.prefetch_hits += 1
+        self.pages += 1
+        return rows
+
+    def _append(self, session: ReviewSession, rows: list):
+        session.ids += tuple(row.id for row in rows)
+        if rows:
+            session.after = (rows[-1].review_time, rows[-1].id)
+        session.done = len(rows) < self.page_size
+
+    def stats(self) -> dict:
+        return {
+            'page_size': self.page_size,
+            'prefetch_ahead': self.prefetch_ahead,
+            'pending': len(self.prefetches),
+            'pages': self.pages,
+            'prefetched': self.prefetched,
+            'prefetch_hits': self.prefetch_hits,
+            'prefetch_misses': self.prefetch_misses,
+            'errors': self.errors,
+        }
+
+
+review_pager = ReviewPager(page_size=settings.REVIEW_PAGE_SIZE, prefetch_ahead=settings.REVIEW_PREFETCH_AHEAD,
+                           session_factory=async_session_factory)
@@ -1,3 +1,316 @@
+import logging
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, NamedTuple
+from app.data.models import Word, WordRevers
+from app.data.config import settings
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, SchedulerParams
+from app.data.cache.redis_crud import (redis_get_review_session, redis_set_review_session,
+                                       redis_replace_review_session, redis_delete_review_session,
+                                       redis_idle_review_sessions)
 
+logger = logging.getLogger(__name__)
 
-review_states = {}
\ No newline at end of file
+# times are packed as whole microseconds since the epoch, so they come back exactly
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+# word id, repetitions, interval, review_time, easiness, stability
+_RESULT = struct.Struct('<IIIqdd')
+# the time the words had to be due at, review_time and id of the last word loaded
+_PAGE = struct.Struct('<qqI')
+# word id, reviewed_at, rating, elapsed, and repetitions, easiness, stability before the rating
+_LOG = struct.Struct('<IqBdIdd')
+# the fitted scheduler parameters of the chat: good_penalty, interval_factor
+_PARAMS = struct.Struct('<dd')
+
+
+def _pack_time(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _unpack_time(value: int) -> datetime:
+    return _EPOCH + value * _MICROSECOND
+
+
+class ReviewResult(NamedTuple):
+    repetitions: int
+    interval: int
+    review_time: datetime
+    easiness: float
+    stability: float
+
+
+class ReviewLogEntry(NamedTuple):
+    word_id: int
+    reviewed_at: datetime
+    rating: int
+    elapsed: float
+    repetitions: int
+    easiness: float
+    stability: float
+
+
+class ReviewWord:
+    '''The columns of a word a review needs, not bound to any session,
+    so rating it writes nothing until the results are flushed.'''
+
+    __slots__ = ('id', 'word', 'translate', 'repetitions', 'interval', 'review_time', 'easiness', 'stability')
+
+    def __init__(self, id: int, word: str, translate: str, repetitions: int, interval: int, review_time: datetime,
+                 easiness: float = 2.5, stability: float = 1.0):
+        self.id = id
+        self.word = word
+        self.translate = translate
+        self.repetitions = repetitions
+        self.interval = interval
+        self.review_time = review_time
+        self.easiness = easiness
+        self.stability = stability
+
+    def __repr__(self):
+        return f'ReviewWord(id={self.id}, word={self.word!r})'
+
+
+class ReviewSession:
+    '''A review session by word ids: the words loaded so far, where the next page
+    starts, the card message of the edit-in-place UI, the scheduler parameters of
+    the chat and the ratings not written to the database yet. The position in the
+    session is the review_index of the chat state.'''
+
+    __slots__ = ('reverse', 'ids', 'card_id', 'results', 'log', 'touched', 'as_of', 'after', 'done', 'params')
+
+    def __init__(self, ids, reverse: bool = False, card_id: int | None = None,
+                 results: dict[int, ReviewResult] | None = None, touched: float | None = None,
+                 as_of: datetime | None = None, after: tuple[datetime, int] | None = None, done: bool = True,
+                 log: list[ReviewLogEntry] | None = None, params: SchedulerParams = DEFAULT_PARAMS):
+        self.reverse = reverse
+        self.ids = tuple(ids)
+        self.card_id = card_id
+        # word id -> the latest result, a word rated twice is written once
+        self.results = results if results is not None else {}
+        # every rating, for the review log
+        self.log = log if log is not None else []
+        self.touched = time.time() if touched is None else touched
+        # paging: the words due at as_of, after (review_time, id), until done
+        self.as_of = as_of
+        self.after = after
+        self.done = done
+        self.params = params
+
+    @property
+    def model(self) -> type[Word] | type[WordRevers]:
+        return WordRevers if self.reverse else Word
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_result(self, word, entry: ReviewLogEntry | None = None) -> int:
+        '''Remembers the current state of a rated word and the rating, returns the number of unwritten results.'''
+
+        self.results[word.id] = ReviewResult(word.repetitions, word.interval, word.review_time,
+                                             word.easiness, word.stability)
+        if entry is not None:
+            self.log.append(entry)
+        return len(self.results)
+
+    def encode(self) -> dict[str, bytes]:
+        fields = {
+            'k': b'r' if self.reverse else b'w',
+            'ids': struct.pack(f'<{len(self.ids)}I', *self.ids),
+            't': repr(self.touched).encode(),
+        }
+        if self.card_id is not None:
+            fields['card'] = str(self.card_id).encode()
+        if not self.done:
+            fields['pg'] = _PAGE.pack(_pack_time(self.as_of), _pack_time(self.after[0]), self.after[1])
+        if self.results:
+            fields['res'] = b''.join(
+                _RESULT.pack(word_id, result.repetitions, result.interval, _pack_time(result.review_time),
+                             result.easiness, result.stability)
+                for word_id, result in self.results.items()
+            )
+        if self.log:
+            fields['log'] = b''.join(
+                _LOG.pack(entry.word_id, _pack_time(entry.reviewed_at), *entry[2:]) for entry in self.log
+            )
+        if self.params != DEFAULT_PARAMS:
+            fields['sp'] = _PARAMS.pack(self.params.good_penalty, self.params.interval_factor)
+        return fields
+
+    @classmethod
+    def decode(cls, fields: dict) -> 'ReviewSession':
+        fields = {key.decode() if isinstance(key, bytes) else key: value for key, value in fields.items()}
+        ids = fields['ids']
+        results = {
+            word_id: ReviewResult(repetitions, interval, _unpack_time(review_time), easiness, stability)
+            for word_id, repetitions, interval, review_time, easiness, stability in _RESULT.iter_unpack(fields.get('res', b''))
+        }
+        log = [
+            ReviewLogEntry(word_id, _unpack_time(reviewed_at), *rest)
+            for word_id, reviewed_at, *rest in _LOG.iter_unpack(fields.get('log', b''))
+        ]
+        params = DEFAULT_PARAMS
+        if 'sp' in fields:
+            good_penalty, interval_factor = _PARAMS.unpack(fields['sp'])
+            params = DEFAULT_PARAMS._replace(good_penalty=good_penalty, interval_factor=interval_factor)
+        paging = {}
+        if 'pg' in fields:
+            as_of, after_time, after_id = _PAGE.unpack(fields['pg'])
+            paging = {
+                'as_of': _unpack_time(as_of),
+                'after': (_unpack_time(after_time), after_id),
+                'done': False,
+            }
+        return cls(
+            ids=struct.unpack(f'<{len(ids) // 4}I', ids),
+            reverse=fields['k'] == b'r',
+            card_id=int(fields['card']) if 'card' in fields else None,
+            results=results,
+            log=log,
+            params=params,
+            touched=float(fields['t']),
+            **paging,
+        )
+
+
+class ReviewSessionStore:
+    '''Review sessions by chat_id in a Redis hash per chat with a TTL, so any worker
+    can continue a session and abandoned ones expire. Without the Redis functions
+    the encoded sessions are kept in this process.'''
+
+    def __init__(self, ttl: int = 24 * 3600,
+                 load: Callable[[int], Awaitable[dict | None]] | None = None,
+                 save: Callable[[int, dict, float, int], Awaitable[None]] | None = None,
+                 delete: Callable[[int], Awaitable[None]] | None = None,
+                 idle: Callable[[float], Awaitable[list[int]]] | None = None,
+                 replace: Callable[[int, dict, float, int], Awaitable[bool]] | None = None):
+        self.ttl = ttl
+        self._load = load
+        self._save = save
+        self._delete = delete
+        self._idle = idle
+        self._replace = replace
+        self.local: dict[int, dict[str, bytes]] = {}
+
+        self.loads = 0
+        self.saves = 0
+        self.misses = 0
+        self.conflicts = 0
+        self.errors = 0
+
+    @property
+    def shared(self) -> bool:
+        return self._load is not None
+
+    async def get(self, chat_id: int) -> ReviewSession | None:
+        '''Returns the session of the chat, None if there is none or it has expired.'''
+
+        try:
+            if self.shared:
+                fields = await self._load(chat_id)
+            else:
+                fields = self.local.get(chat_id)
+                if fields is not None and float(fields['t']) + self.ttl < time.time():
+                    del self.local[chat_id]
+                    fields = None
+        except Exception:
+            self.errors += 1
+            logger.exception('could not load the review session of %s', chat_id)
+            return None
+
+        if not fields:
+            self.misses += 1
+            return None
+        try:
+            session = ReviewSession.decode(fields)
+        except (KeyError, ValueError, struct.error):
+            # written by a version with another layout, it is started again
+            self.errors += 1
+            logger.warning('could not decode the review session of %s', chat_id)
+            return None
+        self.loads += 1
+        return session
+
+    async def put(self, chat_id: int, session: ReviewSession, touch: bool = True):
+        if touch:
+            session.touched = time.time()
+        fields = session.encode()
+        try:
+            if self.shared:
+                await self._save(chat_id, fields, session.touched, self.ttl)
+            else:
+                self.local[chat_id] = fields
+        except Exception:
+            self.errors += 1
+            logger.exception('could not save the review session of %s', chat_id)
+            return
+        self.saves += 1
+
+    async def replace(self, chat_id: int, session: ReviewSession) -> bool:
+        '''Saves the session as loaded, without touching it, unless it was saved again
+        since. Returns False if it was, the newer session is kept.'''
+
+        fields = session.encode()
+        try:
+            if self.shared:
+                replaced = await self._replace(chat_id, fields, session.touched, self.ttl)
+            else:
+                stored = self.local.get(chat_id)
+                replaced = stored is not None and stored['t'] == fields['t']
+                if replaced:
+                    self.local[chat_id] = fields
+        except Exception:
+            self.errors += 1
+            logger.exception('could not save the review session of %s', chat_id)
+            return False
+        if not replaced:
+            self.conflicts += 1
+            return False
+        self.saves += 1
+        return True
+
+    async def delete(self, chat_id: int):
+        try:
+            if self.shared:
+                await self._delete(chat_id)
+            else:
+                self.local.pop(chat_id, None)
+        except Exception:
+            self.errors += 1
+            logger.exception('could not delete the review session of %s', chat_id)
+
+    async def idle(self, idle_for: float) -> list[int]:
+        '''The chats whose session has unwritten results and has not been touched for idle_for seconds.'''
+
+        before = time.time() - idle_for
+        try:
+            if self.shared:
+                return await self._idle(before)
+        except Exception:
+            self.errors += 1
+            logger.exception('could not list the idle review sessions')
+            return []
+        return [chat_id for chat_id, fields in self.local.items() if 'res' in fields and float(fields['t']) <= before]
+
+    def stats(self) -> dict:
+        return {
+            'shared': self.shared,
+            'local': len(self.local),
+            'ttl': self.ttl,
+            'loads': self.loads,
+            'saves': self.saves,
+            'misses': self.misses,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+        }
+
+
+review_sessions = ReviewSessionStore(
+    ttl=settings.REVIEW_SESSION_TTL,
+    load=redis_get_review_session if settings.REVIEW_SESSION_REDIS else None,
+    save=redis_set_review_session if settings.REVIEW_SESSION_REDIS else None,
+    delete=redis_delete_review_session if settings.REVIEW_SESSION_REDIS else None,
+    idle=redis_idle_review_sessions if settings.REVIEW_SESSION_REDIS else None,
+    replace=redis_replace_review_session if settings.REVIEW_SESSION_REDIS else None,
+)
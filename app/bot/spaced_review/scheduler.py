@@ -0,0 +1,201 @@
+'''The scheduler of the review cards, vectorized over decks, and the forecast of their load.
+
+Run: python -m app.bot.spaced_review.scheduler [--chat-id N] [--days 7] [--bucket day] [--quality 4]
+'''
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, NamedTuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.data.models import Word, WordRevers
+from app.data.word_crud import WordsCRUD
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = {'hour': 60, 'day': 24 * 60}
+
+
+class SchedulerParams(NamedTuple):
+    '''The parameters of the scheduler, intervals are in minutes.'''
+
+    initial_easiness: float = 2.5
+    min_easiness: float = 1.3
+    # the intervals after the first, second and third successful rating in a row
+    steps: tuple[int, ...] = (1, 5, 10)
+    # after the steps, 'perfect' grows the stability by the easiness, 'easy' by
+    # easiness - good_penalty, neither by less than min_easiness
+    good_penalty: float = 0.75
+    lapse_interval: int = 1
+    # the interval after the steps is the stability times this, fitted per chat by the optimizer
+    interval_factor: float = 1.0
+
+
+# good_penalty and interval_factor may also be arrays of one value per card, to schedule the
+# cards of many chats together with the parameters fitted for each
+PER_CARD = ('good_penalty', 'interval_factor')
+
+
+DEFAULT_PARAMS = SchedulerParams()
+
+
+class Deck(NamedTuple):
+    '''The scheduling state of many cards as parallel arrays.'''
+
+    repetitions: 'np.ndarray'
+    interval: 'np.ndarray'
+    easiness: 'np.ndarray'
+    stability: 'np.ndarray'
+
+    @classmethod
+    def of(cls, repetitions, interval, easiness=None, stability=None, params: SchedulerParams = DEFAULT_PARAMS) -> 'Deck':
+        '''Cards without easiness start at initial_easiness, without stability at their interval.'''
+
+        import numpy as np
+
+        repetitions = np.asarray(repetitions, dtype=np.int64)
+        interval = np.asarray(interval, dtype=np.int64)
+        easiness = (np.full(len(interval), params.initial_easiness) if easiness is None
+                    else np.asarray(easiness, dtype=np.float64))
+        stability = interval.astype(np.float64) if stability is None else np.asarray(stability, dtype=np.float64)
+        return cls(repetitions, interval, easiness, stability)
+
+
+def schedule(quality, deck: Deck, params: SchedulerParams = DEFAULT_PARAMS) -> Deck:
+    '''The state of every card of the deck after rating it with quality (0-5, one per card or for all).
+
+    'forgot' (below 3) starts the card over, 'hard' (3) keeps its interval,
+    'easy' and 'perfect' take the next of the fixed steps and after them grow
+    the stability by the easiness of the card. The easiness follows SM-2 after
+    every rating and never drops below min_easiness.'''
+
+    # imported on the first rating, not with the web app
+    import numpy as np
+
+    quality = np.broadcast_to(np.asarray(quality, dtype=np.int64), deck.interval.shape)
+    lapsed = quality < 3
+    passed = quality > 3
+
+    repetitions = np.where(passed, deck.repetitions + 1, deck.repetitions)
+    repetitions[lapsed] = 0
+
+    steps = np.asarray(params.steps, dtype=np.float64)
+    stepping = passed & (repetitions <= len(steps))
+    growing = passed & ~stepping
+    growth = np.where(quality == 5, deck.easiness,
+                      np.maximum(params.min_easiness, deck.easiness - params.good_penalty))
+
+    stability = deck.stability.copy()
+    stability[stepping] = steps[repetitions[stepping] - 1]
+    stability[growing] *= growth[growing]
+    stability[lapsed] = params.lapse_interval
+
+    due_after = np.where(growing, stability * params.interval_factor, stability)
+    interval = np.where(passed | lapsed, np.maximum(1, due_after.astype(np.int64)), deck.interval)
+
+    miss = 5 - quality
+    easiness = np.maximum(params.min_easiness, deck.easiness + 0.1 - miss * (0.08 + miss * 0.02))
+    return Deck(repetitions, interval, easiness, stability)
+
+
+def forecast(due_in, deck: Deck, days: int, bucket: str = 'day', quality: int | None = 4,
+             params: SchedulerParams = DEFAULT_PARAMS, max_rounds: int = 100) -> 'np.ndarray':
+    '''How many cards come due in each hour or day of the next days.
+
+    due_in is the number of minutes until each card is due, overdue cards count
+    in the first bucket. With a quality every card due within the horizon is
+    rated with it and counted again when it comes back; None counts each card
+    once, as it is due now.'''
+
+    import numpy as np
+
+    width = BUCKETS[bucket]
+    horizon = days * 24 * 60
+    counts = np.zeros(horizon // width, dtype=np.int64)
+
+    due_in = np.maximum(np.asarray(due_in, dtype=np.float64), 0.0)
+    for _ in range(max_rounds):
+        due = due_in < horizon
+        if not due.any():
+            break
+        due_in = due_in[due]
+        deck = Deck(*(column[due] for column in deck))
+        params = params._replace(**{name: getattr(params, name)[due] for name in PER_CARD
+                                    if np.ndim(getattr(params, name))})
+        counts += np.bincount((due_in // width).astype(np.int64), minlength=len(counts))
+        if quality is None:
+            break
+        deck = schedule(quality, deck, params)
+        due_in = due_in + deck.interval
+    return counts
+
+
+async def due_forecast(db: AsyncSession, chat_id: int | None, days: int = 7, bucket: str = 'day',
+                       quality: int | None = 4, params: SchedulerParams = DEFAULT_PARAMS,
+                       max_cards: int | None = None) -> dict:
+    '''The forecast of the cards of one chat, or of all chats, in both directions, at most
+    max_cards of each, the soonest due. Every card is scheduled with the good_penalty and
+    interval_factor fitted for its chat, those of params without.'''
+
+    import numpy as np
+
+    now = datetime.now(timezone.utc)
+    word_crud = WordsCRUD(db)
+    columns = [[], [], [], [], [], [], []]
+    truncated = False
+    for model in (Word, WordRevers):
+        rows = await word_crud.get_schedule_columns(model, now, now + timedelta(days=days), chat_id, max_cards)
+        truncated |= max_cards is not None and len(rows) >= max_cards
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+
+    due_in, repetitions, interval, easiness, stability, *fitted = columns
+    # None, the chat has not been fitted yet, becomes NaN
+    fitted = {name: np.asarray(values, dtype=np.float64) for name, values in zip(PER_CARD, fitted)}
+    params = params._replace(**{name: np.where(np.isnan(values), getattr(params, name), values)
+                                for name, values in fitted.items()})
+    deck = Deck.of(repetitions, interval, easiness, stability, params)
+    counts = forecast(due_in, deck, days, bucket, quality, params)
+    logger.debug('due forecast for %s: %i cards over %i days', chat_id or 'all chats', len(interval), days)
+
+    width = timedelta(minutes=BUCKETS[bucket])
+    return {
+        'chat_id': chat_id,
+        'bucket': bucket,
+        'days': days,
+        'quality': quality,
+        'cards': len(interval),
+        'truncated': truncated,
+        'buckets': [{'start': (now + width * i).isoformat(), 'due': int(count)} for i, count in enumerate(counts)],
+    }
+
+
+def main():
+    from app.data.db_init import async_session_factory, dispose_engines
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chat-id', type=int, default=None, help='all chats by default')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--bucket', choices=sorted(BUCKETS), default='day')
+    parser.add_argument('--quality', type=int, default=4, help='-1 counts every card once')
+    args = parser.parse_args()
+
+    async def forecast_all():
+        try:
+            async with async_session_factory() as db:
+                return await due_forecast(db, args.chat_id, args.days, args.bucket,
+                                          None if args.quality < 0 else args.quality)
+        finally:
+            await dispose_engines()
+
+    result = asyncio.run(forecast_all())
+    print(f"{result['cards']} cards due within {args.days} days")
+    for row in result['buckets']:
+        print(f"{row['start']}  {row['due']:>10}")
+
+
+if __name__ == '__main__':
+    main()
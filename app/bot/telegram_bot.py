@@ -8,11 +8,21 @@ from app.bot.ai.open_ai import AIClient
 from app.telegram_utils.utils import update_bd
 from app.bot.pdf import PDF
 from app.bot.youtube_parsing.youtube_parsing import YouTubeParsing
+import contextlib
+import copy
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from httpx import AsyncClient
 from app.telegram_utils.bottom_funcs import send_keyboard
 from app.telegram_utils.bottoms import lang_bottoms
+from app.task_supervisor import TaskSupervisor
+from app.data.db_init import async_session_factory
+from app.data.unit_of_work import unit_of_work
+from app.data.user_crud import copy_user
+from typing import TYPE_CHECKING, AsyncIterator, Callable
+
+if TYPE_CHECKING:
+    from app.container import ServiceContainer
 
 logger = logging.getLogger(__name__)
 
@@ -30,18 +40,37 @@ class SingletonMeta(type):
 class Services:
     '''Dependencies for TelegramBot'''
 
-    def __init__(self, db: AsyncSession, client: AsyncClient):
+    def __init__(self, db: AsyncSession, client: AsyncClient, container: 'ServiceContainer | None' = None):
         self.db = db
         self.client = client
+
+        if container is not None:
+            self.ai_client = container.ai_client
+            self.pronunciation_obj = container.pronunciation_obj
+            self.pdf_obj = container.pdf_obj
+            self.parsing_obj = container.parsing_obj
+            self.supervisor = container.supervisor
+        else:
+            self.ai_client = AIClient(self.client)
+            self.pronunciation_obj = Pronunciation(self.client)
+            self.pdf_obj = PDF(self.client, send_message)
+            self.parsing_obj = YouTubeParsing()
+            self.supervisor = TaskSupervisor()
+
         self.word_crud = WordsCRUD(self.db)
-        self.ai_client = AIClient(self.client)
-        self.pronunciation_obj = Pronunciation(self.client)
         self.review_obj = SpacedReview(
             self.word_crud, self.pronunciation_obj,
             self.db, self.client,
         )
-        self.pdf_obj = PDF(self.client, send_message)
-        self.parsing_obj = YouTubeParsing()
+
+    def with_session(self, db: AsyncSession) -> 'Services':
+        '''The same services on another database session.'''
+
+        services = copy.copy(self)
+        services.db = db
+        services.word_crud = WordsCRUD(db)
+        services.review_obj = SpacedReview(services.word_crud, services.pronunciation_obj, db, services.client)
+        return services
 
 
 class TelegramBot:
@@ -51,6 +80,26 @@ class TelegramBot:
         self.services = services
 
 
+    @contextlib.asynccontextmanager
+    async def own_session(self, user_state: User,
+                          session_factory: Callable[[], AsyncSession] | None = None,
+                          ) -> AsyncIterator[tuple['TelegramBot', User]]:
+        '''The bot and a copy of the user on a database session of their own, committed
+        once when the block ends. For the tasks an update spawns: they may still run while
+        the update's session is committing, or after it has been closed.'''
+
+        async with (session_factory or async_session_factory)() as db:
+            async with unit_of_work(db):
+                yield TelegramBot(self.services.with_session(db)), copy_user(db, user_state)
+
+
+    async def detached(self, method: Callable, user_state: User, **kwargs):
+        '''Calls a method of the bot in own_session, for a task spawned by an update.'''
+
+        async with self.own_session(user_state) as (bot, user):
+            return await method(bot, user_state=user, **kwargs)
+
+
     @send_action()
     async def send_message(self, text: str, chat_id: int, user_state: User):
         await send_message(chat_id=chat_id, text=text, user_state=user_state, client=self.services.client)
@@ -95,12 +144,10 @@ class TelegramBot:
     async def save_word(self, chat_id: int, user_state: User):
         word = user_state.last_word
 
-        if await self.services.word_crud.check_exists(word, chat_id, user_state) is not None:
+        if not await self.services.word_crud.save_word(word, chat_id, user_state):
             await  self.send_message('This word is already on the list', chat_id, user_state)
             return {'details':f'word {word} already exists'}
 
-        await self.services.word_crud.add_word(word, chat_id, user_state)
-
         await self.send_message(text=f'The word {word} has been saved.', chat_id=chat_id, user_state=user_state)
 
 
@@ -122,7 +169,7 @@ class TelegramBot:
 
 
     @except_timeout(5)
-    @send_action(1, 'upload_document')
+    @send_action('upload_document')
     async def send_words_list(self, chat_id: int, user_state: User):
         words = await self.services.word_crud.get_words_for_pdf(chat_id=chat_id, user_states=user_state)
 
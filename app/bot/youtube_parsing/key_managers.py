@@ -1,5 +1,4 @@
 from typing import Callable, Any, Union, Awaitable
-from googleapiclient.errors import HttpError
 import inspect
 import time
 # import asyncio
@@ -13,10 +12,18 @@ logger = logging.getLogger(__name__)
 class Key:
     def __init__(self, key: str, service_factory: Callable[[str], Any]):
         self.key = key
-        self.service = service_factory(key)
+        self.service_factory = service_factory
+        self._service = None
         self.used_units = 0
         self.active = True
 
+    @property
+    def service(self) -> Any:
+        '''The API client is built on first use, building it loads the discovery document.'''
+        if self._service is None:
+            self._service = self.service_factory(self.key)
+        return self._service
+
 class KeyManager:
     '''This class is designed to work with YouTube API keys.
     It deactivates inactive keys and activates the next one in the list when the corresponding exception is thrown.'''
@@ -69,6 +76,8 @@ class KeyManager:
             units: int | Callable[[Any], int] = 0,
             backoff_max: int = 3
     ) -> Any:
+        from googleapiclient.errors import HttpError
+
         attempt = 0
 
         while True:
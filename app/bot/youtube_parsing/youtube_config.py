@@ -1,7 +1,4 @@
 import os
-from googleapiclient.discovery import build
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import GenericProxyConfig
 
 youtube_keys = [
         os.getenv('YOU_TUBE_KEY'),
@@ -29,9 +26,14 @@ proxies = [
 
 
 def youtube_factory(api_key: str):
+    from googleapiclient.discovery import build
+
     return build('youtube', 'v3', developerKey=api_key)
 
 def proxy_factory(proxy_config):
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api.proxies import GenericProxyConfig
+
     ytt_api = YouTubeTranscriptApi(
         proxy_config=GenericProxyConfig(
             http_url=proxy_config,
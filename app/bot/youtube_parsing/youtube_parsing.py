@@ -7,9 +7,6 @@ from app.bot.youtube_parsing.youtube_config import proxy_factory, youtube_factor
 import logging
 from app.data.cache.redis_crud import *
 from app.decorators import log_calls, except_timeout, send_action, sync_log_calls
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import GenericProxyConfig
-from youtube_transcript_api.proxies import WebshareProxyConfig
 from app.data.models import User
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.telegram_utils.utils import send_message, update_bd
@@ -135,6 +132,8 @@ class YouTubeParsing:
     def fetch_transcript(self, video_id: str, lang_code: str) -> dict:
         '''Function that extracts subtitles from each video.'''
 
+        from youtube_transcript_api import YouTubeTranscriptApi
+
         def task(proxy_url: str):
 
             # api = YouTubeTranscriptApi(
@@ -244,7 +243,7 @@ class YouTubeParsing:
             return link
 
 
-    @send_action(0, 'upload_video')
+    @send_action('upload_video')
     async def send_result(self, chat_id: int, user_state: User, db: AsyncSession, client: AsyncClient):
 
         word = user_state.last_word
@@ -2,13 +2,16 @@ from app.celery.celery_app import celery_app
 import asyncio
 import httpx
 import logging
-from app.bot.telegram_bot import TelegramBot, Services
 from app.data.db_init import async_session_factory
+from app.data.config import settings
 
 logger = logging.getLogger(__name__)
 
 
 async def _run_tts(chat_id: int, word: str, lang: str):
+    # the bot graph is heavy, a worker only needs it once a task arrives
+    from app.bot.telegram_bot import TelegramBot, Services
+
     async with async_session_factory() as db:
         async with httpx.AsyncClient() as client:
             bot = TelegramBot(Services(db=db, client=client))
@@ -17,6 +20,8 @@ async def _run_tts(chat_id: int, word: str, lang: str):
 
 
 async def _run_youtube(chat_id: int, word: str, lang_code: str, seen_videos: list):
+    from app.bot.telegram_bot import TelegramBot, Services
+
     async with async_session_factory() as db:
         async with httpx.AsyncClient() as client:
             bot = TelegramBot(Services(db=db, client=client))
@@ -35,3 +40,14 @@ def tts_task(self, chat_id: int, word: str, lang: str):
 def youtube_parsing_task(self, chat_id: int, word: str, lang_code: str, seen_videos: list):
     logger.info('starting youtube task')
     asyncio.run(_run_youtube(chat_id=chat_id, word=word, lang_code=lang_code, seen_videos=seen_videos))
+
+async def _run_scheduler_fit():
+    from app.bot.spaced_review.optimizer import run
+
+    fits = await run(async_session_factory, settings.REVIEW_TARGET_RETENTION, settings.SCHEDULER_FIT_MIN_REVIEWS)
+    logger.info('scheduler parameters fitted for %i chats', len(fits))
+
+@celery_app.task(bind=True)
+def scheduler_fit_task(self):
+    logger.info('starting scheduler fit task')
+    asyncio.run(_run_scheduler_fit())
@@ -1,31 +1,29 @@
 import os
-import requests
 from dotenv import load_dotenv
-from app.web.webhook import WEBHOOK_URL
+from app.data.config import settings
 
 load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 
-set_webhook_url = f'https://api.telegram.org/bot{BOT_TOKEN}/setWebhook'
-response = requests.post(set_webhook_url, data={'url': WEBHOOK_URL})
+set_webhook_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/setWebhook'
 
-if response.json().get('ok'):
-    print('Success!')
-else:
-    print('Error:', response.json())
+webhook_info_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/getWebhookInfo'
 
-check_url = f'https://api.telegram.org/bot{BOT_TOKEN}/getWebhookInfo'
-print(requests.get(check_url).json())
+send_msg_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendMessage'
 
-send_msg_url = f'https://api.telegram.org/bot{BOT_TOKEN}/sendMessage'
+bottom_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/editMessageReplyMarkup'
 
-bottom_url = f'https://api.telegram.org/bot{BOT_TOKEN}/editMessageReplyMarkup'
+edit_message_text_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/editMessageText'
 
-send_action_url = f'https://api.telegram.org/bot{BOT_TOKEN}/sendChatAction'
+send_action_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendChatAction'
 
-send_document_url = f'https://api.telegram.org/bot{BOT_TOKEN}/sendDocument'
+send_document_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendDocument'
 
-answer_callback_url = f'https://api.telegram.org/bot{BOT_TOKEN}/answerCallbackQuery'
+answer_callback_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/answerCallbackQuery'
 
-send_voice_url = f'https://api.telegram.org/bot{BOT_TOKEN}/sendVoice'
\ No newline at end of file
+send_voice_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/sendVoice'
+
+get_updates_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/getUpdates'
+
+delete_webhook_url = f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/deleteWebhook'
\ No newline at end of file
@@ -0,0 +1,74 @@
+import logging
+from app.http_pool import HTTPClientPool
+from app.bot.ai.open_ai import AIClient
+from app.bot.pronunciation import Pronunciation
+from app.bot.pdf import PDF
+from app.bot.youtube_parsing.youtube_parsing import YouTubeParsing
+from app.telegram_utils.utils import send_message
+from app.web.update_queue import UpdateQueue
+from app.web.chat_scheduler import ChatScheduler
+from app.web.dedup import UpdateDeduplicator
+from app.task_supervisor import TaskSupervisor
+from app.telegram_utils.chat_actions import chat_actions
+from app.web.webhook_reply import flush_hook
+from app.data.cache.redis_crud import redis_claim_update, redis_release_update
+from app.data.cache.user_state_cache import user_state_cache, install_write_through
+from app.data.cache.chat_state import chat_state_store
+from app.bot.spaced_review.review_buffer import review_buffer
+from app.bot.spaced_review.review_pages import review_pager
+from app.bot.spaced_review.review_latency import review_latency
+from app.data.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    '''Process-wide services that are built once in the application lifespan.
+
+    Only stateless and expensive objects live here, everything that depends on
+    a database session is still created per update by Services.'''
+
+    def __init__(self, http_pool: HTTPClientPool):
+        self.http_pool = http_pool
+        self.client = http_pool.client
+        if settings.WEBHOOK_INLINE_REPLY:
+            self.client.event_hooks['request'].append(flush_hook(self.client))
+        self.supervisor = TaskSupervisor({
+            'explain': settings.TASK_LIMIT_EXPLAIN,
+            'pdf': settings.TASK_LIMIT_PDF,
+            'youtube': settings.TASK_LIMIT_YOUTUBE,
+            'pronunciation': settings.TASK_LIMIT_PRONUNCIATION,
+            'tts_warm': settings.TASK_LIMIT_TTS_WARM,
+            'review_page': settings.TASK_LIMIT_REVIEW_PAGE,
+        })
+        self.ai_client = AIClient(self.client)
+        self.pronunciation_obj = Pronunciation(self.client, self.supervisor)
+        self.pdf_obj = PDF(self.client, send_message)
+        self.parsing_obj = YouTubeParsing()
+        self.chat_scheduler = ChatScheduler(max_concurrency=settings.UPDATE_WORKERS,
+                                            max_pending=settings.UPDATE_QUEUE_SIZE)
+        self.chat_actions = chat_actions
+        self.user_state_cache = user_state_cache
+        # the cache is only read while the commits of this process write through it
+        self.uninstall_write_through = (install_write_through(user_state_cache)
+                                        if settings.USER_STATE_CACHE else None)
+        self.chat_state_store = chat_state_store
+        self.review_buffer = review_buffer
+        self.review_pager = review_pager
+        review_pager.supervisor = self.supervisor
+        self.review_latency = review_latency
+        self.update_queue: UpdateQueue | None = None
+        self.dedup = UpdateDeduplicator(
+            maxsize=settings.DEDUP_CACHE_SIZE,
+            ttl=settings.DEDUP_TTL,
+            claim=redis_claim_update if settings.DEDUP_REDIS else None,
+            release=redis_release_update if settings.DEDUP_REDIS else None,
+        )
+        logger.info('service container has been built')
+
+    async def aclose(self):
+        if self.uninstall_write_through is not None:
+            self.uninstall_write_through()
+            await self.user_state_cache.write_pending()
+        await self.http_pool.aclose()
+        logger.info('service container has been closed')
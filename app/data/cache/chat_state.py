@@ -0,0 +1,103 @@
+import logging
+from typing import Awaitable, Callable
+from app.data.models import User
+from app.data.config import settings
+from app.data.cache.redis_crud import redis_get_chat_state, redis_set_chat_state
+
+logger = logging.getLogger(__name__)
+
+# attribute of User -> (field of the hash, type)
+CHAT_STATE_FIELDS = {
+    'message_id': ('m', int),
+    'curr_command': ('c', str),
+    'review_index': ('r', int),
+    'invalid_reply_count': ('i', int),
+}
+
+
+class ChatStateStore:
+    '''The conversation fields of a user (message_id, curr_command, review_index,
+    invalid_reply_count) in a small hash per chat with a TTL.
+
+    They change with almost every message and are useless after the conversation,
+    so they stay out of the users table. Only the fields that changed since the
+    load are written back.'''
+
+    def __init__(self, ttl: int = 7 * 24 * 3600,
+                 load: Callable[[int], Awaitable[dict]] | None = None,
+                 save: Callable[[int, dict, list, int], Awaitable[None]] | None = None):
+        self.ttl = ttl
+        self._load = load
+        self._save = save
+
+        self.loads = 0
+        self.saves = 0
+        self.skipped = 0
+        self.errors = 0
+
+    async def load(self, user: User, db=None) -> User:
+        '''Sets the conversation fields of the user; with a session the user is saved
+        by save_all once the update is handled.'''
+
+        values = {}
+        if self._load is not None:
+            try:
+                values = await self._load(user.chat_id)
+                self.loads += 1
+            except Exception:
+                self.errors += 1
+                logger.exception('could not load the chat state of %s', user.chat_id)
+
+        for name, (field, kind) in CHAT_STATE_FIELDS.items():
+            value = values.get(field)
+            setattr(user, name, kind(value) if value is not None else getattr(User, name))
+        user._chat_state_saved = self._snapshot(user)
+
+        if db is not None:
+            db.info.setdefault('chat_states', {})[user.chat_id] = user
+        return user
+
+    async def save(self, user: User):
+        '''Writes the fields that changed since the last load or save.'''
+
+        saved = getattr(user, '_chat_state_saved', {})
+        current = self._snapshot(user)
+        changed = {CHAT_STATE_FIELDS[name][0]: value for name, value in current.items()
+                   if value is not None and saved.get(name) != value}
+        removed = [CHAT_STATE_FIELDS[name][0] for name, value in current.items()
+                   if value is None and saved.get(name) is not None]
+        if not changed and not removed:
+            self.skipped += 1
+            return
+
+        if self._save is not None:
+            try:
+                await self._save(user.chat_id, changed, removed, self.ttl)
+            except Exception:
+                self.errors += 1
+                logger.exception('could not save the chat state of %s', user.chat_id)
+                return
+        self.saves += 1
+        user._chat_state_saved = current
+
+    async def save_all(self, db):
+        '''Saves the users loaded for this session.'''
+
+        for user in db.info.pop('chat_states', {}).values():
+            await self.save(user)
+
+    @staticmethod
+    def _snapshot(user: User) -> dict:
+        return {name: getattr(user, name) for name in CHAT_STATE_FIELDS}
+
+    def stats(self) -> dict:
+        return {
+            'ttl': self.ttl,
+            'loads': self.loads,
+            'saves': self.saves,
+            'skipped': self.skipped,
+            'errors': self.errors,
+        }
+
+
+chat_state_store = ChatStateStore(ttl=settings.CHAT_STATE_TTL, load=redis_get_chat_state, save=redis_set_chat_state)
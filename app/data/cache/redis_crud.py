@@ -1,4 +1,5 @@
-from app.data.cache.redis_init import r
+from redis.exceptions import WatchError
+from app.data.cache.redis_init import r, ar
 import json
 
 
@@ -17,3 +18,140 @@ def redis_set_hash(chat_id: int, word: str, lang: str, field: str, data: str|byt
     if field == 'explanation':
         data = json.dumps(data)
     r.hset(key, field, data)
+
+
+def _voice_key(word: str, lang: str, voice: str) -> str:
+    return f'voice:{voice}:{lang}:{word}'
+
+
+def redis_get_voice_file_id(word: str, lang: str, voice: str) -> tuple[str, int] | None:
+    '''Returns the Telegram file_id of an uploaded pronunciation and its size in bytes.'''
+    result = r.hmget(_voice_key(word, lang, voice), 'file_id', 'size')
+    if not result or not result[0]:
+        return None
+    file_id, size = result
+    return file_id.decode() if isinstance(file_id, bytes) else file_id, int(size or 0)
+
+
+def redis_set_voice_file_id(word: str, lang: str, voice: str, file_id: str, size: int, ttl: int):
+    key = _voice_key(word, lang, voice)
+    r.hset(key, mapping={'file_id': file_id, 'size': size})
+    r.expire(key, ttl)
+
+
+def redis_delete_voice_file_id(word: str, lang: str, voice: str):
+    r.delete(_voice_key(word, lang, voice))
+
+
+async def redis_claim_update(update_id: int, ttl: int) -> bool:
+    '''Marks an update as seen, returns False if some worker has already claimed it.'''
+    return bool(await ar.set(f'update:{update_id}', 1, nx=True, ex=ttl))
+
+
+async def redis_release_update(update_id: int):
+    await ar.delete(f'update:{update_id}')
+
+
+USER_STATE_CHANNEL = 'user_state:invalidate'
+
+
+async def redis_get_user_state(chat_id: int) -> dict | None:
+    result = await ar.get(f'user_state:{chat_id}')
+    return json.loads(result) if result else None
+
+
+async def redis_set_user_state(chat_id: int, fields: dict, ttl: int, only_new: bool = False):
+    await ar.set(f'user_state:{chat_id}', json.dumps(fields), ex=ttl, nx=only_new)
+
+
+async def redis_delete_user_state(chat_id: int):
+    await ar.delete(f'user_state:{chat_id}')
+
+
+async def redis_publish_user_state(chat_id: int, origin: str):
+    '''Tells the other workers to drop their local copy of the chat's state.'''
+    await ar.publish(USER_STATE_CHANNEL, f'{origin}:{chat_id}')
+
+
+def redis_subscribe_user_state(callback):
+    '''Calls callback(chat_id, origin) for every invalidation, from a background thread.
+    Returns the thread, stop() ends it.'''
+
+    def handler(message):
+        origin, _, chat_id = message['data'].decode().rpartition(':')
+        callback(int(chat_id), origin)
+
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{USER_STATE_CHANNEL: handler})
+    return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+async def redis_get_chat_state(chat_id: int) -> dict:
+    return {key.decode(): value.decode() for key, value in (await ar.hgetall(f'chat:{chat_id}')).items()}
+
+
+async def redis_set_chat_state(chat_id: int, changed: dict, removed: list, ttl: int):
+    key = f'chat:{chat_id}'
+    pipe = ar.pipeline(transaction=False)
+    if changed:
+        pipe.hset(key, mapping=changed)
+    if removed:
+        pipe.hdel(key, *removed)
+    pipe.expire(key, ttl)
+    await pipe.execute()
+
+
+REVIEW_SESSIONS_KEY = 'review_sessions'
+
+
+async def redis_get_review_session(chat_id: int) -> dict | None:
+    return await ar.hgetall(f'review:{chat_id}') or None
+
+
+def _queue_review_session(pipe, chat_id: int, fields: dict, touched: float, ttl: int):
+    key = f'review:{chat_id}'
+    pipe.delete(key)
+    pipe.hset(key, mapping=fields)
+    pipe.expire(key, ttl)
+    if 'res' in fields:
+        pipe.zadd(REVIEW_SESSIONS_KEY, {chat_id: touched})
+    else:
+        pipe.zrem(REVIEW_SESSIONS_KEY, chat_id)
+
+
+async def redis_set_review_session(chat_id: int, fields: dict, touched: float, ttl: int):
+    '''Replaces the session hash. Sessions with unwritten results are indexed by
+    the time they were touched, for the sweeper.'''
+
+    pipe = ar.pipeline(transaction=True)
+    _queue_review_session(pipe, chat_id, fields, touched, ttl)
+    await pipe.execute()
+
+
+async def redis_replace_review_session(chat_id: int, fields: dict, touched: float, ttl: int) -> bool:
+    '''Replaces the session hash only if it was not saved again since it was loaded,
+    that is its touched time is still fields['t']. Returns False if it was.'''
+
+    key = f'review:{chat_id}'
+    async with ar.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            if await pipe.hget(key, 't') != fields['t']:
+                return False
+            pipe.multi()
+            _queue_review_session(pipe, chat_id, fields, touched, ttl)
+            await pipe.execute()
+        except WatchError:
+            return False
+    return True
+
+
+async def redis_delete_review_session(chat_id: int):
+    pipe = ar.pipeline(transaction=False)
+    pipe.delete(f'review:{chat_id}')
+    pipe.zrem(REVIEW_SESSIONS_KEY, chat_id)
+    await pipe.execute()
+
+
+async def redis_idle_review_sessions(before: float) -> list[int]:
+    return [int(chat_id) for chat_id in await ar.zrangebyscore(REVIEW_SESSIONS_KEY, '-inf', before)]
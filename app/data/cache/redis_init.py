@@ -1,5 +1,22 @@
+import logging
 import redis
+import redis.asyncio
 
+logger = logging.getLogger(__name__)
+
+# the clients connect lazily, on the first command; the async one is for the
+# calls made while handling an update, they must not block the event loop
 r = redis.Redis(host='localhost', port=6379, db=0)
+ar = redis.asyncio.Redis(host='localhost', port=6379, db=0)
+
+
+def ping_redis() -> bool:
+    '''Checks the Redis connection, called from the startup hooks.'''
+    try:
+        result = r.ping()
+    except redis.RedisError as e:
+        logger.error('redis is not available: %s', e)
+        return False
 
-print(r.ping())
\ No newline at end of file
+    logger.info('redis ping: %s', result)
+    return bool(result)
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.data.models import User
+from app.data.config import settings
+from app.data.cache.redis_crud import (redis_get_user_state, redis_set_user_state, redis_delete_user_state,
+                                       redis_publish_user_state, redis_subscribe_user_state)
+
+logger = logging.getLogger(__name__)
+
+USER_STATE_FIELDS = tuple(column.key for column in User.__table__.columns)
+
+
+class UserStateCache:
+    '''Users rows by chat_id: an in-process LRU with a short TTL in front of a shared
+    store (Redis) in front of Postgres.
+
+    Entries are written through after every commit that changes a user. Other
+    workers are told to drop their local copy, the TTL bounds how long a lost
+    invalidation can keep a stale copy alive.'''
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 5.0, shared_ttl: int = 3600,
+                 load: Callable[[int], Awaitable[dict | None]] | None = None,
+                 store: Callable[[int, dict, int, bool], Awaitable[None]] | None = None,
+                 delete: Callable[[int], Awaitable[None]] | None = None,
+                 publish: Callable[[int, str], Awaitable[None]] | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared_ttl = shared_ttl
+        self.load = load
+        self.store = store
+        self.delete = delete
+        self.publish = publish
+        self.origin = uuid.uuid4().hex
+        self.local: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        # set by install_write_through, without it commits would not reach the cache
+        self.installed = False
+        # committed states not yet in the shared store, None drops it
+        self.pending: dict[int, dict | None] = {}
+        self.writer: asyncio.Task | None = None
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+
+    async def get(self, chat_id: int) -> dict | None:
+        '''Returns a copy of the cached columns, None if the database has to be asked.'''
+
+        entry = self.local.get(chat_id)
+        if entry is not None:
+            expires, fields = entry
+            if expires > time.monotonic():
+                self.local.move_to_end(chat_id)
+                self.local_hits += 1
+                return dict(fields)
+            del self.local[chat_id]
+
+        if self.load is not None:
+            try:
+                fields = await self.load(chat_id)
+            except Exception:
+                fields = None
+                self.shared_errors += 1
+                logger.exception('could not read the state of chat %s from the shared cache', chat_id)
+            if fields is not None:
+                self.shared_hits += 1
+                self._remember(chat_id, fields)
+                return dict(fields)
+
+        self.misses += 1
+        return None
+
+    async def put(self, fields: dict, committed: bool = True):
+        '''Stores a user row. A committed row replaces the shared copy and the other
+        workers drop theirs; a row just read from the database is only added to the
+        shared store when it has none, so it never replaces a newer commit.'''
+
+        chat_id = fields['chat_id']
+        self._remember(chat_id, dict(fields))
+        if committed:
+            self.writes += 1
+        await self._store(chat_id, fields, committed)
+
+    def commit(self, changed: dict[int, dict | None]):
+        '''Takes the users of a commit, None for those whose columns were not all loaded.
+        Called from the session events, so the local copies change at once and the
+        shared store is written by a background writer, in the order of the commits.'''
+
+        for chat_id, fields in changed.items():
+            if fields is not None:
+                self._remember(chat_id, dict(fields))
+                self.writes += 1
+            else:
+                self.invalidate(chat_id)
+            self.pending.pop(chat_id, None)
+            self.pending[chat_id] = fields
+
+        if self.pending and (self.writer is None or self.writer.done()):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # no event loop, write_pending writes them
+                return
+            self.writer = loop.create_task(self._write_pending(), name='user-state-writer')
+
+    async def write_pending(self):
+        '''Waits until the committed states are in the shared store.'''
+
+        while self.pending or (self.writer is not None and not self.writer.done()):
+            if self.writer is not None and not self.writer.done():
+                await self.writer
+            else:
+                await self._write_pending()
+
+    async def _write_pending(self):
+        while self.pending:
+            chat_id = next(iter(self.pending))
+            fields = self.pending.pop(chat_id)
+            if fields is not None:
+                await self._store(chat_id, fields, committed=True)
+            else:
+                await self._delete_shared(chat_id)
+
+    async def _store(self, chat_id: int, fields: dict, committed: bool):
+        try:
+            if self.store is not None:
+                await self.store(chat_id, fields, self.shared_ttl, not committed)
+            if committed and self.publish is not None:
+                await self.publish(chat_id, self.origin)
+        except Exception:
+            self.shared_errors += 1
+            logger.exception('could not store the state of chat %s in the shared cache', chat_id)
+            if committed:
+                await self.forget(chat_id)
+
+    def invalidate(self, chat_id: int):
+        '''Drops the local copy only.'''
+
+        self.local.pop(chat_id, None)
+        self.invalidations += 1
+
+    async def forget(self, chat_id: int):
+        '''Drops the local and the shared copy, the next lookup reads the database.'''
+
+        self.invalidate(chat_id)
+        await self._delete_shared(chat_id)
+
+    async def _delete_shared(self, chat_id: int):
+        if self.delete is not None:
+            try:
+                await self.delete(chat_id)
+            except Exception:
+                self.shared_errors += 1
+                logger.exception('could not drop the state of chat %s from the shared cache', chat_id)
+
+    def on_message(self, chat_id: int, origin: str):
+        '''Handles an invalidation published by some worker, our own are ignored.'''
+
+        if origin != self.origin:
+            self.invalidate(chat_id)
+
+    def _remember(self, chat_id: int, fields: dict):
+        self.local[chat_id] = (time.monotonic() + self.ttl, fields)
+        self.local.move_to_end(chat_id)
+        if len(self.local) > self.maxsize:
+            self.local.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            'size': len(self.local),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'shared': self.load is not None,
+            'installed': self.installed,
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.local_hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            'writes': self.writes,
+            'pending': len(self.pending),
+            'invalidations': self.invalidations,
+            'shared_errors': self.shared_errors,
+        }
+
+
+def user_state(user: User) -> dict | None:
+    '''The cached columns of a user, None if some of them are not loaded.'''
+
+    loaded = inspect(user).dict
+    if any(field not in loaded for field in USER_STATE_FIELDS):
+        return None
+    return {field: loaded[field] for field in USER_STATE_FIELDS}
+
+
+def attach_user(db, fields: dict) -> User:
+    '''Puts a cached user into the session as if it had been loaded, without a SELECT.
+    Changes to it are flushed as an UPDATE of the changed columns.'''
+
+    existing = db.identity_map.get(inspect(User).identity_key_from_primary_key((fields['id'],)))
+    if existing is not None:
+        return existing
+
+    user = User(**fields)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def install_write_through(cache: UserStateCache, session_class=Session) -> Callable[[], None]:
+    '''Updates the cache after every commit that inserted or changed a user.
+    Called from the application lifespan, returns the function that removes the listeners.'''
+
+    info_key = f'changed_users:{cache.origin}'
+
+    def collect_users(session, flush_context):
+        changed = session.info.setdefault(info_key, {})
+        for obj in (*session.new, *session.dirty):
+            if isinstance(obj, User) and (chat_id := inspect(obj).dict.get('chat_id')) is not None:
+                # the flushed values, the session may expire them on commit
+                changed[chat_id] = user_state(obj)
+
+    def write_through(session):
+        changed = session.info.pop(info_key, None)
+        if changed:
+            cache.commit(changed)
+
+    def discard(session):
+        session.info.pop(info_key, None)
+
+    listeners = (('after_flush', collect_users), ('after_commit', write_through), ('after_rollback', discard))
+    for name, listener in listeners:
+        event.listen(session_class, name, listener)
+    cache.installed = True
+
+    def uninstall():
+        for name, listener in listeners:
+            event.remove(session_class, name, listener)
+        cache.installed = False
+
+    return uninstall
+
+
+user_state_cache = UserStateCache(
+    maxsize=settings.USER_STATE_CACHE_SIZE,
+    ttl=settings.USER_STATE_CACHE_TTL,
+    shared_ttl=settings.USER_STATE_REDIS_TTL,
+    load=redis_get_user_state if settings.USER_STATE_REDIS else None,
+    store=redis_set_user_state if settings.USER_STATE_REDIS else None,
+    delete=redis_delete_user_state if settings.USER_STATE_REDIS else None,
+    publish=redis_publish_user_state if settings.USER_STATE_REDIS else None,
+)
+
+
+def listen_for_invalidations(cache: UserStateCache, loop: asyncio.AbstractEventLoop):
+    '''Subscribes to the invalidations of the other workers, returns the listener thread
+    or None if Redis is not available (then local copies live until their TTL).'''
+
+    def on_message(chat_id: int, origin: str):
+        loop.call_soon_threadsafe(cache.on_message, chat_id, origin)
+
+    try:
+        return redis_subscribe_user_state(on_message)
+    except Exception:
+        logger.exception('could not subscribe to user state invalidations')
+        return None
@@ -10,6 +10,67 @@ class Settings(BaseSettings):
     DB_PASS: str = '12345'
     DB_NAME: str = 'lango_bot'
 
+    TELEGRAM_API_URL: str = 'https://api.telegram.org'
+    SET_WEBHOOK_ON_STARTUP: bool = True
+
+    HTTP2: bool = True
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_MAX_KEEPALIVE: int = 20
+    TELEGRAM_MAX_CONNECTIONS: int = 100
+    AI_MAX_CONNECTIONS: int = 20
+
+    TELEGRAM_RATE_LIMIT: bool = True
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    TELEGRAM_CHAT_RATE: float = 1.0
+    TELEGRAM_CHAT_BURST: float = 3.0
+    TELEGRAM_MAX_RETRIES: int = 3
+    CHAT_ACTION_INTERVAL: float = 5.0
+
+    VOICE_FILE_ID_TTL: int = 30 * 24 * 3600
+
+    UPDATE_MODE: str = 'inline'
+    UPDATE_QUEUE_SIZE: int = 1000
+    UPDATE_WORKERS: int = 16
+    UPDATE_DRAIN_TIMEOUT: float = 25.0
+    WEBHOOK_INLINE_REPLY: bool = True
+
+    REVIEW_UI: str = 'messages'
+    REVIEW_FLUSH_EVERY: int = 10
+    REVIEW_FLUSH_IDLE: float = 300.0
+    REVIEW_SWEEP_INTERVAL: float = 60.0
+    REVIEW_SESSION_TTL: int = 24 * 3600
+    REVIEW_SESSION_REDIS: bool = True
+    REVIEW_PAGE_SIZE: int = 20
+    REVIEW_PREFETCH_AHEAD: int = 5
+    REVIEW_WARM_AHEAD: int = 2
+    REVIEW_CARD_LATENCY_TARGET: float = 0.5
+    REVIEW_FORECAST_MAX_CARDS: int = 10000
+    REVIEW_TARGET_RETENTION: float = 0.9
+    SCHEDULER_FIT_MIN_REVIEWS: int = 200
+
+    TASK_LIMIT_EXPLAIN: int = 32
+    TASK_LIMIT_PDF: int = 4
+    TASK_LIMIT_YOUTUBE: int = 4
+    TASK_LIMIT_PRONUNCIATION: int = 16
+    TASK_LIMIT_TTS_WARM: int = 4
+    TASK_LIMIT_REVIEW_PAGE: int = 16
+
+    DEDUP_CACHE_SIZE: int = 10000
+    DEDUP_TTL: int = 86400
+    DEDUP_REDIS: bool = False
+
+    USER_STATE_CACHE: bool = True
+    USER_STATE_CACHE_SIZE: int = 10000
+    USER_STATE_CACHE_TTL: float = 5.0
+    USER_STATE_REDIS: bool = True
+    USER_STATE_REDIS_TTL: int = 3600
+    CHAT_STATE_TTL: int = 7 * 24 * 3600
+
+    POLLING_BATCH_SIZE: int = 100
+    POLLING_TIMEOUT: int = 30
+    POLLING_OFFSET_FILE: str = os.path.join(ROOT_DIR, '..', '.polling_offset')
+
     @property
     def DATABASE_URL_asyncpg(self):
         return f'postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
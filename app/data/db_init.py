@@ -1,28 +1,58 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from functools import cache
+from sqlalchemy import create_engine, Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker, Session
 from app.data.config import settings
 from app.data.class_base import Base
 
-sync_engine = create_engine(
-    url=settings.DATABASE_URL_psycopg,
-    echo=True,
-    pool_size=5,
-    max_overflow=2,
-)
 
-async_engine = create_async_engine(
-    url=settings.DATABASE_URL_asyncpg,
-    echo=True,
-    pool_size=5,
-    max_overflow=2,
-)
+@cache
+def get_sync_engine() -> Engine:
+    return create_engine(
+        url=settings.DATABASE_URL_psycopg,
+        echo=True,
+        pool_size=5,
+        max_overflow=2,
+    )
 
-session_factory = sessionmaker(sync_engine, expire_on_commit=False)
 
-async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+@cache
+def get_async_engine() -> AsyncEngine:
+    return create_async_engine(
+        url=settings.DATABASE_URL_asyncpg,
+        echo=True,
+        pool_size=5,
+        max_overflow=2,
+    )
 
-async def db_setup():
-    async with sync_engine.connect() as session:
-        await session.run_sync(Base.metadata.create_all(sync_engine))
 
+@cache
+def _sync_sessionmaker() -> sessionmaker:
+    return sessionmaker(get_sync_engine(), expire_on_commit=False)
+
+
+@cache
+def _async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+
+def session_factory() -> Session:
+    '''Opens a sync session, the engine is created on the first call.'''
+    return _sync_sessionmaker()()
+
+
+def async_session_factory() -> AsyncSession:
+    '''Opens an async session, the engine is created on the first call.'''
+    return _async_sessionmaker()()
+
+
+async def dispose_engines():
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_sync_engine.cache_info().currsize:
+        get_sync_engine().dispose()
+
+
+async def db_setup():
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
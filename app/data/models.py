@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, DeclarativeBase, mapped_column, relationship
-from sqlalchemy import Text, String, DateTime, ForeignKey
+from sqlalchemy import Text, String, DateTime, ForeignKey, Index, BigInteger, SmallInteger
 from time import time
 from typing import Annotated
 from datetime import datetime, timezone
@@ -14,6 +14,10 @@ time = Annotated[datetime, mapped_column(DateTime(timezone=True), default=lambda
 
 class Word(Base):
     __tablename__ = 'words'
+    __table_args__ = (
+        Index('ix_words_chat_language_review_time', 'chat_id', 'language', 'review_time'),
+        Index('uq_words_chat_language_word', 'chat_id', 'language', 'word', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     chat_id: Mapped[int]
@@ -26,12 +30,19 @@ class Word(Base):
     interval: Mapped[int] = mapped_column(default=1)
     quality:  Mapped[int] = mapped_column(default=0)
     repetitions: Mapped[int] = mapped_column(default=0)
+    easiness: Mapped[float] = mapped_column(default=2.5)
+    stability: Mapped[float] = mapped_column(default=1.0)
 
     user: Mapped['User'] = relationship(back_populates='words')
 
 
 class WordRevers(Base):
     __tablename__ = 'revers_words'
+    __table_args__ = (
+        Index('ix_revers_words_chat_language_review_time', 'chat_id', 'language', 'review_time'),
+        # synonyms share a translation, a reverse card is unique with the word it translates
+        Index('uq_revers_words_chat_language_word_translate', 'chat_id', 'language', 'word', 'translate', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     chat_id: Mapped[int]
@@ -43,6 +54,8 @@ class WordRevers(Base):
     interval: Mapped[int] = mapped_column(default=1)
     quality: Mapped[int] = mapped_column(default=0)
     repetitions: Mapped[int] = mapped_column(default=0)
+    easiness: Mapped[float] = mapped_column(default=2.5)
+    stability: Mapped[float] = mapped_column(default=1.0)
 
 
 class User(Base):
@@ -55,12 +68,16 @@ class User(Base):
     lang_code: Mapped[str] = mapped_column(default='')
     last_word: Mapped[str] = mapped_column(default='')
     last_translate: Mapped[str] = mapped_column(default='')
-    review_index: Mapped[int] = mapped_column(default=0)
-    message_id: Mapped[int] = mapped_column(nullable=True)
-    curr_command: Mapped[str] = mapped_column(nullable=True)
-    invalid_reply_count: Mapped[int] = mapped_column(nullable=True)
 
-    words: Mapped[List['Word']] = relationship(back_populates='user', lazy='selectin')
+    # conversation fields that change with every message, they are kept in a Redis
+    # hash per chat (app.data.cache.chat_state) instead of the table
+    review_index = 0
+    message_id = None
+    curr_command = None
+    invalid_reply_count = None
+
+    # the vocabulary is loaded only on request (UserCRUD.get_all_words), never with the user's state
+    words: Mapped[List['Word']] = relationship(back_populates='user', lazy='raise')
 
     def to_dict(self):
         return {
@@ -71,4 +88,38 @@ class User(Base):
             'last_word': self.last_word,
             'last_translate': self.last_translate,
             'review_index': self.review_index,
-        }
\ No newline at end of file
+        }
+
+class ReviewLog(Base):
+    '''Every rating of a card, appended in batches with the review results, never updated.
+    easiness, stability and repetitions are the state of the card before the rating.'''
+
+    __tablename__ = 'review_log'
+    __table_args__ = (
+        Index('uq_review_log_card_reviewed_at', 'word_id', 'reverse', 'reviewed_at', unique=True),
+        Index('ix_review_log_chat', 'chat_id'),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    chat_id: Mapped[int]
+    word_id: Mapped[int]
+    reverse: Mapped[bool]
+    reviewed_at: Mapped[time] = mapped_column(DateTime(timezone=True))
+    rating: Mapped[int] = mapped_column(SmallInteger)
+    # minutes since the previous rating of the card
+    elapsed: Mapped[float]
+    repetitions: Mapped[int]
+    easiness: Mapped[float]
+    stability: Mapped[float]
+
+
+class SchedulerParameters(Base):
+    '''The scheduler parameters fitted to the review log of a chat.'''
+
+    __tablename__ = 'scheduler_params'
+
+    chat_id: Mapped[int] = mapped_column(primary_key=True)
+    good_penalty: Mapped[float]
+    interval_factor: Mapped[float]
+    reviews: Mapped[int]
+    fitted_at: Mapped[time] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
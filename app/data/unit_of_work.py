@@ -0,0 +1,89 @@
+import contextlib
+import inspect
+import logging
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+class UnitOfWork:
+    '''The changes made to one session while handling an update, committed once at the end.'''
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.active = True
+        self.deferred = 0
+        self.hooks = []
+
+
+_current: ContextVar[UnitOfWork | None] = ContextVar('unit_of_work', default=None)
+
+stats = {'units': 0, 'commits': 0, 'deferred': 0, 'direct_commits': 0, 'rollbacks': 0, 'hooks': 0}
+
+
+async def _run_hooks(hooks: list):
+    # the changes are committed already, a failed hook must not fail the update
+    for callback, args in hooks:
+        stats['hooks'] += 1
+        try:
+            result = callback(*args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception('after commit hook %s failed', getattr(callback, '__qualname__', callback))
+
+
+@contextlib.asynccontextmanager
+async def unit_of_work(db: AsyncSession) -> AsyncIterator[UnitOfWork]:
+    '''Defers the commits made through `commit_or_defer` on this session until the block
+    ends, then commits once; rolls back if the block raises.
+
+    Tasks started inside the block inherit it, once it ends their writes commit directly.
+    The hooks registered with `after_commit` run once the commit has succeeded and are
+    dropped on rollback.'''
+
+    uow = UnitOfWork(db)
+    token = _current.set(uow)
+    stats['units'] += 1
+    try:
+        yield uow
+        uow.active = False
+        if uow.deferred:
+            await db.commit()
+            stats['commits'] += 1
+    except Exception:
+        uow.active = False
+        await db.rollback()
+        stats['rollbacks'] += 1
+        raise
+    finally:
+        uow.active = False
+        _current.reset(token)
+    await _run_hooks(uow.hooks)
+
+
+async def commit_or_defer(db: AsyncSession) -> bool:
+    '''Commits the session unless an active unit of work on it will, returns True if deferred.'''
+
+    uow = _current.get()
+    if uow is not None and uow.active and uow.db is db:
+        uow.deferred += 1
+        stats['deferred'] += 1
+        return True
+
+    await db.commit()
+    stats['direct_commits'] += 1
+    return False
+
+
+async def after_commit(db: AsyncSession, callback: Callable, *args):
+    '''Calls callback(*args), awaited if it returns an awaitable, once the commit deferred by
+    an active unit of work on the session has succeeded, or right away without one.'''
+
+    uow = _current.get()
+    if uow is not None and uow.active and uow.db is db:
+        uow.hooks.append((callback, args))
+        return
+    await _run_hooks([(callback, args)])
@@ -5,10 +5,24 @@ from app.data.models import User, Word
 import logging
 from app.decorators import log_calls
 from app.dependencies import session_dep
+from app.data.unit_of_work import commit_or_defer
+from app.data.cache.user_state_cache import USER_STATE_FIELDS, user_state_cache, user_state, attach_user
+from app.data.cache.chat_state import CHAT_STATE_FIELDS, chat_state_store
 
 logger = logging.getLogger(__name__)
 
 
+def copy_user(db: AsyncSession, user: User) -> User:
+    '''The user with its conversation fields in another session, without a SELECT. For the
+    tasks an update spawns, which must not share its session.'''
+
+    copy = attach_user(db, {field: getattr(user, field) for field in USER_STATE_FIELDS})
+    for name in CHAT_STATE_FIELDS:
+        setattr(copy, name, getattr(user, name))
+    copy._chat_state_saved = dict(getattr(user, '_chat_state_saved', {}))
+    return copy
+
+
 class UserCRUD:
     '''A class that implements interaction with the database, namely, writing and reading data associated with users.'''
 
@@ -32,14 +46,18 @@ class UserCRUD:
 
 
     async def check_exists(self, chat_id):
+        if user_state_cache.installed and (fields := await user_state_cache.get(chat_id)) is not None:
+            return await chat_state_store.load(attach_user(self.db, fields), self.db)
+
         user = await self.get_user(chat_id)
 
         if user is None:
+            # cached by the write-through once the update commits
             user = await self.create_user(chat_id)
+        elif user_state_cache.installed and (fields := user_state(user)) is not None:
+            await user_state_cache.put(fields, committed=False)
 
-        await self.db.refresh(user)
-
-        return user
+        return await chat_state_store.load(user, self.db)
 
 
     async def create_user(self, chat_id: int):
@@ -50,7 +68,6 @@ class UserCRUD:
             lang_code='',
             last_word='',
             last_translate='',
-            review_index=0,
         )
 
         logger.debug('session: %s', self.db)
@@ -58,8 +75,9 @@ class UserCRUD:
         logger.debug('database update, new user: %s', new_user.chat_id)
 
         try:
-            await self.db.commit()
-            await self.db.refresh(new_user)
+            # the id is needed right away for the user's words, the commit may wait
+            await self.db.flush()
+            await commit_or_defer(self.db)
         except Exception as e:
             logger.exception('failed to create new user')
             raise
@@ -88,7 +106,13 @@ class UserCRUD:
 
     @classmethod
     async def update_bd(cls, obj: list[User | Word] | User, bd=session_dep):
-        bd.add(obj)
-        await bd.commit()
-        await bd.refresh(obj)
+        objs = obj if isinstance(obj, list) else [obj]
+        if isinstance(obj, list):
+            bd.add_all(obj)
+        else:
+            bd.add(obj)
+        await commit_or_defer(bd)
+        for user in objs:
+            if isinstance(user, User):
+                await chat_state_store.save(user)
         return {'details': 'database has been successfully updated'}
\ No newline at end of file
@@ -1,9 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi.responses import JSONResponse
-from app.data.models import Word, User, WordRevers
+from app.data.models import Word, User, WordRevers, SchedulerParameters
 from datetime import datetime, timezone
 from app.decorators import log_calls
+from app.data.unit_of_work import commit_or_defer
 import logging
 from app.telegram_utils.utils import send_message
 from httpx import AsyncClient
@@ -17,41 +19,58 @@ class WordsCRUD:
         self.db = db
 
 
-    async def add_word(self, word: str, chat_id: int, user_states: User):
-        new_word = Word(
+    async def save_word(self, word: str, chat_id: int, user_states: User) -> bool:
+        '''Saves the word in both directions with one statement, returns False if it was already saved.
+        The reverse card is inserted from the row the word insert returned, so only with a new word. The
+        unique indexes on (chat_id, language, word) and, for the reverse card, the translated word too,
+        decide, so concurrent saves can not duplicate it.'''
+
+        # the defaults are spelled out, the reverse card copies them from the returned row
+        state = ('created_at', 'review_time', 'interval', 'quality', 'repetitions', 'easiness', 'stability')
+        new_word = pg_insert(Word).values(
             chat_id=chat_id,
             user_id=user_states.id,
             word=word,
             translate=user_states.last_translate,
             language=user_states.lang_code,
-        )
-        new_reverse_word = WordRevers(
-            chat_id=chat_id,
-            word=user_states.last_translate,
-            translate=word,
-            language=user_states.lang_code,
-        )
-
-        logger.debug('adding new word to database: %s', new_word.word)
-        self.db.add_all([new_word, new_reverse_word])
+            created_at=func.now(), review_time=func.now(),
+            interval=1, quality=0, repetitions=0, easiness=2.5, stability=1.0,
+        ).on_conflict_do_nothing(
+            index_elements=[Word.chat_id, Word.language, Word.word],
+        ).returning(
+            Word.id, Word.chat_id, Word.word, Word.translate, Word.language,
+            *(getattr(Word, name) for name in state),
+        ).cte('new_word')
+
+        new_reverse_word = pg_insert(WordRevers).from_select(
+            ['chat_id', 'word', 'translate', 'language', *state],
+            select(
+                new_word.c.chat_id, new_word.c.translate, new_word.c.word, new_word.c.language,
+                *(new_word.c[name] for name in state),
+            ),
+        ).on_conflict_do_nothing(
+            index_elements=[WordRevers.chat_id, WordRevers.language, WordRevers.word, WordRevers.translate],
+        ).returning(WordRevers.id).cte('new_reverse_word')
 
         try:
-            await self.db.commit()
-            await self.db.refresh(new_word)
-            await self.db.refresh(new_reverse_word)
-            logger.info(
-                'database update, new word: %s, chat_id: %s',
-                new_word.word, new_word.chat_id
+            res = await self.db.execute(
+                select(
+                    select(new_word.c.id).scalar_subquery(),
+                    select(new_reverse_word.c.id).scalar_subquery(),
+                )
             )
-        except Exception as e:
-            logger.exception('failed to add word %s (chat_id=%i)', new_word.word, new_word.chat_id)
+            word_id, _ = res.one()
+            await commit_or_defer(self.db)
+        except Exception:
+            logger.exception('failed to save word %s (chat_id=%i)', word, chat_id)
             raise
 
-        return JSONResponse(
-            {
-                'details': 'word has been successfully added'
-            }
-        )
+        if word_id is None:
+            logger.info('word already saved: %s, chat_id: %s', word, chat_id)
+            return False
+
+        logger.info('database update, new word: %s, chat_id: %s', word, chat_id)
+        return True
 
 
     @log_calls
@@ -113,6 +132,64 @@ class WordsCRUD:
 
         return words
 
+    async def get_due_page(self, model: type[Word] | type[WordRevers], chat_id: int, language: str,
+                           due_before: datetime, after: tuple[datetime, int] | None, limit: int,
+                           with_params: bool = False) -> list:
+        '''A page of the words due at due_before, most overdue first, as plain rows.
+        Keyset paging on (review_time, id) reads each page as one index range
+        however far into the words the session is. with_params adds the fitted
+        good_penalty and interval_factor of the chat to every row, None if it has none.'''
+
+        query = select(model.id, model.word, model.translate, model.repetitions, model.interval, model.review_time,
+                       model.easiness, model.stability).where(
+            model.chat_id == chat_id,
+            model.language == language,
+            model.review_time <= due_before,
+        )
+        if with_params:
+            query = query.add_columns(
+                SchedulerParameters.good_penalty, SchedulerParameters.interval_factor,
+            ).outerjoin(SchedulerParameters, SchedulerParameters.chat_id == model.chat_id)
+        if after is not None:
+            query = query.where(tuple_(model.review_time, model.id) > tuple_(*after))
+
+        res = await self.db.execute(query.order_by(model.review_time, model.id).limit(limit))
+        rows = res.all()
+        logger.debug('review page for chat_id=%s, lang=%s: %i words', chat_id, language, len(rows))
+        return rows
+
+    async def get_schedule_columns(self, model: type[Word] | type[WordRevers], now: datetime, due_before: datetime,
+                                   chat_id: int | None = None, limit: int | None = None) -> list:
+        '''Minutes until due, repetitions, interval, easiness, stability and the fitted
+        good_penalty and interval_factor of the chat (None if it has none) of the words due
+        before due_before, of one chat or of all chats, the `limit` soonest due, as plain rows.'''
+
+        query = select(
+            (func.extract('epoch', model.review_time) - now.timestamp()) / 60,
+            model.repetitions, model.interval, model.easiness, model.stability,
+            SchedulerParameters.good_penalty, SchedulerParameters.interval_factor,
+        ).outerjoin(
+            SchedulerParameters, SchedulerParameters.chat_id == model.chat_id,
+        ).where(model.review_time < due_before)
+        if chat_id is not None:
+            query = query.where(model.chat_id == chat_id)
+
+        res = await self.db.execute(query.order_by(model.review_time).limit(limit))
+        rows = res.all()
+        logger.debug('schedule columns of %s for chat_id=%s: %i words', model.__tablename__, chat_id, len(rows))
+        return rows
+
+    async def get_review_words(self, model: type[Word] | type[WordRevers], ids) -> dict:
+        '''The columns a review needs of the given words by id, as plain rows
+        that are not tracked by the session.'''
+
+        res = await self.db.execute(
+            select(model.id, model.word, model.translate, model.repetitions, model.interval, model.review_time,
+                       model.easiness, model.stability)
+            .where(model.id.in_(set(ids)))
+        )
+        return {row.id: row for row in res}
+
     async def get_one_word(self, chat_id: int, user_states: User):
         try:
             res = await self.db.execute(
@@ -142,7 +219,7 @@ class WordsCRUD:
             )
             logger.debug('database access for deleted word: %s, chat_id: %s, lang: %s', word, chat_id, user_states.lang_code)
 
-            await self.db.commit()
+            await commit_or_defer(self.db)
         except Exception as e:
             logger.exception('failed to delete word %s', word)
             raise
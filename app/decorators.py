@@ -3,7 +3,8 @@ import functools
 import time
 import asyncio
 import inspect
-from app.config import BOT_TOKEN, send_action_url
+from app.config import BOT_TOKEN
+from app.telegram_utils.chat_actions import chat_actions
 from typing import TYPE_CHECKING
 
 logger = logging.getLogger(__name__)
@@ -22,7 +23,7 @@ def _resolve_http_client(target_obj, kwargs):
     if services is not None:
         return getattr(services, 'client', None)
 
-    return None
+    return getattr(target_obj, 'client', None)
 
 
 def _resolve_arg(func, args, kwargs, name):
@@ -106,8 +107,8 @@ def except_timeout(timeout: float):
 
 
 
-def send_action(seconds: float=0, action: str='typing'):
-    '''A decorator that sends a specific action animation to the user during the execution of functions.'''
+def send_action(action: str='typing'):
+    '''A decorator that shows a specific action animation to the user while the function runs.'''
 
     def decorator(func):
         async def wrapper(self, *args, **kwargs):
@@ -120,15 +121,8 @@ def send_action(seconds: float=0, action: str='typing'):
                 logger.error('http client is not available for send_action in %s', func.__name__)
                 raise RuntimeError('http client is required for send_action')
 
-            await client.post(url=send_action_url, json={
-                'chat_id': chat_id,
-                'action': action,
-            })
-            await asyncio.sleep(seconds)
-
-            res = await func(self, *args, **kwargs)
-
-            return res
+            async with chat_actions.show(chat_id, action, client):
+                return await func(self, *args, **kwargs)
 
         return wrapper
 
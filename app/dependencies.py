@@ -1,7 +1,8 @@
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.data.db_init import async_session_factory
-from fastapi import Depends
+from app.container import ServiceContainer
+from fastapi import Depends, Request
 from typing import Annotated
 
 async def get_session():
@@ -10,8 +11,12 @@ async def get_session():
 
 session_dep = Annotated[AsyncSession, Depends(get_session)]
 
-async def get_httpx_client():
-    async with httpx.AsyncClient() as client:
-        yield client
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+container_dep = Annotated[ServiceContainer, Depends(get_container)]
+
+def get_httpx_client(container: container_dep) -> httpx.AsyncClient:
+    return container.client
 
 httpx_client_dep = Annotated[httpx.AsyncClient, Depends(get_httpx_client)]
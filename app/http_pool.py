@@ -0,0 +1,147 @@
+import logging
+import httpx
+from app.data.config import settings
+from app.rate_limiter import TelegramRateLimiter, RateLimitedTransport
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_HOST = settings.TELEGRAM_API_URL
+AI_HOST = 'https://api.aitunnel.ru'
+
+
+def _http2_available() -> bool:
+    try:
+        import h2
+    except ImportError:
+        return False
+    return True
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    '''A response body that reports when it is closed.'''
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        if self.on_close is not None:
+            self.on_close()
+            self.on_close = None
+        await self.stream.aclose()
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    '''Counts the requests of a pool and those in flight, from sending the request
+    until its response is closed.'''
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    def _done(self):
+        self.in_flight -= 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self.in_flight -= 1
+            self.errors += 1
+            raise
+        response.stream = _TrackedStream(response.stream, self._done)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class HTTPClientPool:
+    '''A process-wide outbound HTTP client with a separate keep-alive connection pool
+    for every upstream host (Telegram and the AI tunnel). Google TTS goes through
+    gTTS and its own HTTP stack, it is not pooled here.'''
+
+    def __init__(self,
+                 http2: bool = settings.HTTP2,
+                 timeout: float = settings.HTTP_TIMEOUT,
+                 keepalive_expiry: float = settings.HTTP_KEEPALIVE_EXPIRY,
+                 max_keepalive: int = settings.HTTP_MAX_KEEPALIVE,
+                 rate_limit: bool = settings.TELEGRAM_RATE_LIMIT,
+                 ):
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.warning('h2 is not installed, outbound requests fall back to HTTP/1.1')
+
+        self.hosts = {
+            'telegram': (TELEGRAM_HOST, settings.TELEGRAM_MAX_CONNECTIONS),
+            'ai': (AI_HOST, settings.AI_MAX_CONNECTIONS),
+        }
+        self.transports = {
+            name: CountingTransport(httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=min(max_keepalive, max_connections),
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            ))
+            for name, (_, max_connections) in self.hosts.items()
+        }
+        # requests to hosts without a pool of their own
+        self.default_requests = 0
+
+        mounts = {url: self.transports[name] for name, (url, _) in self.hosts.items()}
+        self.rate_limiter: TelegramRateLimiter | None = None
+        if rate_limit:
+            self.rate_limiter = TelegramRateLimiter(
+                global_rate=settings.TELEGRAM_GLOBAL_RATE,
+                chat_rate=settings.TELEGRAM_CHAT_RATE,
+                chat_burst=settings.TELEGRAM_CHAT_BURST,
+            )
+            mounts[TELEGRAM_HOST] = RateLimitedTransport(
+                self.transports['telegram'], self.rate_limiter, settings.TELEGRAM_MAX_RETRIES,
+            )
+
+        self.client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=timeout,
+            mounts=mounts,
+            event_hooks={'request': [self._count_request]},
+        )
+
+    def route(self, host: str) -> str:
+        for name, (url, _) in self.hosts.items():
+            if httpx.URL(url).host == host:
+                return name
+        return 'default'
+
+    async def _count_request(self, request: httpx.Request):
+        if self.route(request.url.host) == 'default':
+            self.default_requests += 1
+
+    def stats(self) -> dict:
+        '''Connection usage of every per-host pool.'''
+
+        result = {}
+        for name, transport in self.transports.items():
+            result[name] = {
+                'in_flight': transport.in_flight,
+                'max_connections': self.hosts[name][1],
+                'requests': transport.requests,
+                'errors': transport.errors,
+            }
+        result['default'] = {'requests': self.default_requests}
+        result['http2'] = self.http2
+
+        return result
+
+    async def aclose(self):
+        await self.client.aclose()
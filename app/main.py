@@ -1,7 +1,65 @@
+import asyncio
+import functools
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.container import ServiceContainer
+from app.http_pool import HTTPClientPool
+from app.data.config import settings
+from app.web.update_queue import UpdateQueue
+from app.web.update_handler import process_update, update_chat_id
+from app.web.webhook import set_webhook
+from app.data.cache.redis_init import ping_redis
+from app.data.db_init import dispose_engines, async_session_factory
+from app.data.cache.user_state_cache import listen_for_invalidations
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = ServiceContainer(HTTPClientPool())
+
+    await asyncio.to_thread(ping_redis)
+    if settings.SET_WEBHOOK_ON_STARTUP:
+        await set_webhook(container.client)
+
+    invalidations = None
+    if settings.USER_STATE_CACHE and settings.USER_STATE_REDIS:
+        invalidations = await asyncio.to_thread(listen_for_invalidations, container.user_state_cache,
+                                                asyncio.get_running_loop())
+
+    if settings.UPDATE_MODE == 'queue':
+        container.update_queue = UpdateQueue(
+            functools.partial(process_update, container=container),
+            maxsize=settings.UPDATE_QUEUE_SIZE,
+            workers=settings.UPDATE_WORKERS,
+            scheduler=container.chat_scheduler,
+            chat_id_of=update_chat_id,
+        )
+        container.update_queue.start()
+
+    review_sweeper = asyncio.create_task(
+        container.review_buffer.run_sweeper(async_session_factory, settings.REVIEW_SWEEP_INTERVAL),
+        name='review-buffer-sweeper',
+    )
+
+    app.state.container = container
+    yield
+
+    if container.update_queue is not None:
+        await container.update_queue.drain(settings.UPDATE_DRAIN_TIMEOUT)
+    await container.chat_scheduler.drain(settings.UPDATE_DRAIN_TIMEOUT)
+    await container.supervisor.shutdown(settings.UPDATE_DRAIN_TIMEOUT)
+    review_sweeper.cancel()
+    await container.review_buffer.sweep(async_session_factory, idle_for=0)
+    await container.aclose()
+    if invalidations is not None:
+        invalidations.stop()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 from app.web.webhook_router import webhook_router
+from app.web.metrics_router import metrics_router
 
 app.include_router(webhook_router)
+app.include_router(metrics_router)
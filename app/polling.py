@@ -0,0 +1,58 @@
+import asyncio
+import functools
+import logging
+import signal
+from app.container import ServiceContainer
+from app.http_pool import HTTPClientPool
+from app.data.config import settings
+from app.config import get_updates_url, delete_webhook_url
+from app.web.polling import PollingRunner, OffsetStore
+from app.web.update_handler import process_update, update_chat_id
+from app.data.db_init import async_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+async def run_polling():
+    '''Runs the bot with getUpdates instead of the webhook, no public endpoint is needed.'''
+
+    container = ServiceContainer(HTTPClientPool())
+    runner = PollingRunner(
+        container.client,
+        functools.partial(process_update, container=container),
+        container.chat_scheduler,
+        update_chat_id,
+        get_updates_url,
+        delete_webhook_url,
+        dedup=container.dedup,
+        offset_store=OffsetStore(settings.POLLING_OFFSET_FILE),
+        batch_size=settings.POLLING_BATCH_SIZE,
+        timeout=settings.POLLING_TIMEOUT,
+    )
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, runner.stop)
+
+    review_sweeper = asyncio.create_task(
+        container.review_buffer.run_sweeper(async_session_factory, settings.REVIEW_SWEEP_INTERVAL),
+        name='review-buffer-sweeper',
+    )
+
+    try:
+        await runner.run()
+    finally:
+        await container.chat_scheduler.drain(settings.UPDATE_DRAIN_TIMEOUT)
+        await container.supervisor.shutdown(settings.UPDATE_DRAIN_TIMEOUT)
+        review_sweeper.cancel()
+        await container.review_buffer.sweep(async_session_factory, idle_for=0)
+        await container.aclose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_polling())
+
+
+if __name__ == '__main__':
+    main()
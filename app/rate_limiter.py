@@ -0,0 +1,233 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from enum import IntEnum
+from urllib.parse import parse_qs
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    '''Lower values are sent first when the global budget is exhausted.'''
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    LOW = 2
+
+
+_priority: ContextVar[Priority] = ContextVar('outbound_priority', default=Priority.INTERACTIVE)
+
+
+@contextlib.contextmanager
+def outbound_priority(priority: Priority):
+    '''Sets the priority of Bot API calls made in this context, tasks created inside inherit it.'''
+
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        '''Seconds until a token is available, 0 if one can be taken now.'''
+
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.burst and self.blocked_until <= now
+
+
+class TelegramRateLimiter:
+    '''Token buckets for the Bot API limits: one global bucket and one per chat.
+
+    Callers waiting for the global bucket are served by priority, so interactive
+    replies overtake background sends. A 429 blocks the chat (or every chat when
+    it carries no chat_id) for retry_after seconds.'''
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 max_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chats = max_chats
+        self.chat_buckets: dict[int, TokenBucket] = {}
+
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.pump: asyncio.Task | None = None
+
+        self.granted = Counter()
+        self.throttled = Counter()
+        self.total_wait = 0.0
+        self.rate_limited = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.max_chats:
+                self._evict_idle()
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _evict_idle(self):
+        for chat_id in [chat_id for chat_id, bucket in self.chat_buckets.items() if bucket.idle()]:
+            del self.chat_buckets[chat_id]
+
+    async def acquire(self, chat_id: int | None, priority: Priority = Priority.INTERACTIVE, per_chat: bool = True):
+        '''Waits until a request to the chat fits into both limits.'''
+
+        started = time.monotonic()
+
+        if chat_id is not None and per_chat:
+            bucket = self._chat_bucket(chat_id)
+            while (delay := bucket.delay()) > 0:
+                self.throttled['chat'] += 1
+                await asyncio.sleep(delay)
+            bucket.take()
+
+        if self.waiters or self.global_bucket.delay() > 0:
+            self.throttled['global'] += 1
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (priority, next(self.sequence), future))
+            if self.pump is None or self.pump.done():
+                self.pump = asyncio.create_task(self._pump(), name='telegram-rate-limiter')
+            await future
+        else:
+            self.global_bucket.take()
+
+        self.granted[priority.name.lower()] += 1
+        self.total_wait += time.monotonic() - started
+
+    async def _pump(self):
+        while self.waiters:
+            delay = self.global_bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            _, _, future = heapq.heappop(self.waiters)
+            if future.done():
+                continue
+            self.global_bucket.take()
+            future.set_result(None)
+
+    def retry_after(self, chat_id: int | None, seconds: float):
+        self.rate_limited += 1
+        if chat_id is None:
+            self.global_bucket.block(seconds)
+        else:
+            self._chat_bucket(chat_id).block(seconds)
+        logger.warning('telegram rate limit hit for chat %s, retry after %s seconds', chat_id, seconds)
+
+    def stats(self) -> dict:
+        granted = sum(self.granted.values())
+        return {
+            'queued': len(self.waiters),
+            'chats': len(self.chat_buckets),
+            'granted': dict(self.granted),
+            'throttled': dict(self.throttled),
+            'rate_limited': self.rate_limited,
+            'avg_wait_ms': round(self.total_wait / granted * 1000, 3) if granted else 0.0,
+        }
+
+
+_MULTIPART_CHAT_ID = re.compile(rb'name="chat_id"\r\n\r\n(-?\d+)\r\n')
+
+
+def request_chat_id(request: httpx.Request) -> int | None:
+    '''Finds chat_id in a JSON, urlencoded or multipart Bot API request body.'''
+
+    body = request.content
+    if not body:
+        return None
+
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith('application/json'):
+            value = json.loads(body).get('chat_id')
+        elif content_type.startswith('application/x-www-form-urlencoded'):
+            value = parse_qs(body.decode()).get('chat_id', [None])[0]
+        elif content_type.startswith('multipart/form-data'):
+            match = _MULTIPART_CHAT_ID.search(body)
+            value = match.group(1) if match else None
+        else:
+            return None
+        return int(value) if value is not None else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    '''Wraps the Telegram transport: throttles every call that targets a chat and
+    retries the ones answered with 429 after the time Telegram asks for.'''
+
+    UNMETERED_PER_CHAT = {'sendChatAction'}
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: TelegramRateLimiter, max_retries: int = 3):
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # buffer the body so it can be inspected and resent on retry
+        await request.aread()
+        chat_id = request_chat_id(request)
+        if chat_id is None:
+            return await self.transport.handle_async_request(request)
+
+        method = request.url.path.rsplit('/', 1)[-1]
+        per_chat = method not in self.UNMETERED_PER_CHAT
+        priority = Priority.LOW if not per_chat else _priority.get()
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(chat_id, priority, per_chat)
+            response = await self.transport.handle_async_request(request)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+            await response.aread()
+            try:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+            except ValueError:
+                retry_after = 1.0
+            await response.aclose()
+            self.limiter.retry_after(chat_id, retry_after)
+
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import inspect
+import logging
+from collections import Counter
+from typing import Any, Coroutine
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    '''Owns the background tasks started by the handlers.
+
+    Every task belongs to a kind (explain, pdf, youtube, pronunciation, tts_warm,
+    review_page) with its own concurrency budget; tasks over the budget wait for a
+    slot. The supervisor keeps a reference to every task, logs and counts failures
+    and cancels what is left on shutdown.'''
+
+    def __init__(self, limits: dict[str, int] | None = None, default_limit: int = 8):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+        self.tasks: set[asyncio.Task] = set()
+        self.accepting = True
+
+        self.queued = Counter()
+        self.running = Counter()
+        self.started = Counter()
+        self.completed = Counter()
+        self.failed = Counter()
+        self.cancelled = Counter()
+        self.rejected = Counter()
+        self.last_errors: dict[str, str] = {}
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        semaphore = self.semaphores.get(kind)
+        if semaphore is None:
+            semaphore = self.semaphores[kind] = asyncio.Semaphore(self.limits.get(kind, self.default_limit))
+        return semaphore
+
+    def spawn(self, kind: str, coro: Coroutine[Any, Any, Any], name: str | None = None) -> asyncio.Task | None:
+        '''Starts a supervised task, returns None once the supervisor is shutting down.'''
+
+        if not self.accepting:
+            coro.close()
+            self.rejected[kind] += 1
+            logger.warning('%s task rejected, the supervisor is shutting down', kind)
+            return None
+
+        self.queued[kind] += 1
+        task = asyncio.create_task(self._run(kind, coro), name=name or f'{kind}-task')
+        self.tasks.add(task)
+        task.add_done_callback(functools.partial(self._done, kind, coro))
+        return task
+
+    def _done(self, kind: str, coro: Coroutine[Any, Any, Any], task: asyncio.Task):
+        self.tasks.discard(task)
+        if inspect.getcoroutinestate(coro) == inspect.CORO_CREATED:
+            # cancelled before its first step, _run never started
+            coro.close()
+            self.queued[kind] -= 1
+            self.cancelled[kind] += 1
+
+    async def _run(self, kind: str, coro: Coroutine[Any, Any, Any]):
+        semaphore = self._semaphore(kind)
+        try:
+            try:
+                await semaphore.acquire()
+            finally:
+                self.queued[kind] -= 1
+
+            self.running[kind] += 1
+            self.started[kind] += 1
+            try:
+                result = await coro
+            finally:
+                self.running[kind] -= 1
+                semaphore.release()
+        except asyncio.CancelledError:
+            self.cancelled[kind] += 1
+            raise
+        except Exception as e:
+            self.failed[kind] += 1
+            self.last_errors[kind] = repr(e)
+            logger.exception('%s task failed', kind)
+            return None
+        finally:
+            coro.close()
+
+        self.completed[kind] += 1
+        return result
+
+    async def shutdown(self, timeout: float = 25.0):
+        '''Stops accepting tasks, waits for the running ones and cancels the rest.'''
+
+        self.accepting = False
+        if self.tasks:
+            _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning('%i background tasks cancelled on shutdown', len(pending))
+                await asyncio.gather(*pending, return_exceptions=True)
+        logger.info('task supervisor stopped')
+
+    def stats(self) -> dict:
+        kinds = sorted(set(self.limits) | set(self.started) | set(self.queued) | set(self.rejected))
+        return {
+            'active': len(self.tasks),
+            'kinds': {
+                kind: {
+                    'limit': self.limits.get(kind, self.default_limit),
+                    'queued': self.queued[kind],
+                    'running': self.running[kind],
+                    'started': self.started[kind],
+                    'completed': self.completed[kind],
+                    'failed': self.failed[kind],
+                    'cancelled': self.cancelled[kind],
+                    'rejected': self.rejected[kind],
+                    'last_error': self.last_errors.get(kind),
+                }
+                for kind in kinds
+            },
+        }
@@ -1,4 +1,5 @@
-from app.config import send_msg_url
+from app.config import send_msg_url, edit_message_text_url
+from app.web.webhook_reply import claim_reply
 from app.decorators import except_timeout
 from httpx import AsyncClient
 from app.telegram_utils.bottoms import explain_bottoms
@@ -32,4 +33,35 @@ async def send_inline_keyboard(chat_id: int, client: AsyncClient,  reply_to: int
         'reply_to_message_id': reply_to
     }
 
-    await client.post(send_msg_url, json=payload)
\ No newline at end of file
+    await client.post(send_msg_url, json=payload)
+
+
+async def send_card(chat_id: int, client: AsyncClient, text: str, bottoms) -> int | None:
+    '''Sends a message with an inline keyboard and returns its id, so it can be edited later.'''
+
+    payload = {
+        'chat_id': chat_id,
+        'text': text,
+        'reply_markup': {'inline_keyboard': bottoms},
+    }
+
+    resp = await client.post(send_msg_url, json=payload)
+    data = resp.json()
+    return data['result']['message_id'] if data.get('ok') else None
+
+
+async def edit_card(chat_id: int, message_id: int, client: AsyncClient, text: str, bottoms=None, inline_reply: bool = False):
+    '''Replaces the text of a sent message, the inline keyboard is removed when bottoms is None.'''
+
+    payload = {
+        'chat_id': chat_id,
+        'message_id': message_id,
+        'text': text,
+    }
+    if bottoms is not None:
+        payload['reply_markup'] = {'inline_keyboard': bottoms}
+
+    if inline_reply and claim_reply('editMessageText', payload):
+        return
+
+    await client.post(edit_message_text_url, json=payload)
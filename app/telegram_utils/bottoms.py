@@ -45,6 +45,12 @@ review_bottoms = [
                 [{'text':'finish repeating'}]
             ]
 
+review_inline_bottoms = [
+                [{'text': 'forgot', 'callback_data': 'review:forgot'}, {'text': 'hard', 'callback_data': 'review:hard'}],
+                [{'text': 'easy', 'callback_data': 'review:easy'}, {'text': 'perfect', 'callback_data': 'review:perfect'}],
+                [{'text': 'finish repeating', 'callback_data': 'review:finish repeating'}]
+            ]
+
 explain_bottoms = [
                 [{'text': 'Pronunciation', 'callback_data': 'pronounce'}, {'text': 'Video YouTube', 'callback_data': 'youtube'}],
 ]
@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+import logging
+from typing import AsyncIterator
+from httpx import AsyncClient
+from app.config import send_action_url
+from app.data.config import settings
+from app.rate_limiter import outbound_priority, Priority
+
+logger = logging.getLogger(__name__)
+
+
+class _Indicator:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.refs = 1
+
+
+class ChatActionService:
+    '''Shows a chat action ("typing", "upload_document", ...) while some work runs.
+
+    The indicator is sent from a background task, so the work does not wait for
+    sendChatAction, and is renewed every `interval` seconds until the last user of
+    the same (chat, action) pair is done. Nested users share one indicator.'''
+
+    def __init__(self, url: str = send_action_url, interval: float = 5.0):
+        self.url = url
+        self.interval = interval
+        self.indicators: dict[tuple[int, str], _Indicator] = {}
+
+        self.started = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.errors = 0
+
+    @contextlib.asynccontextmanager
+    async def show(self, chat_id: int, action: str, client: AsyncClient) -> AsyncIterator[None]:
+        key = (chat_id, action)
+        indicator = self.indicators.get(key)
+        if indicator is None:
+            task = asyncio.create_task(self._renew(chat_id, action, client), name=f'chat-action-{chat_id}-{action}')
+            indicator = self.indicators[key] = _Indicator(task)
+            self.started += 1
+        else:
+            indicator.refs += 1
+            self.coalesced += 1
+
+        try:
+            yield
+        finally:
+            indicator.refs -= 1
+            if indicator.refs == 0:
+                indicator.task.cancel()
+                if self.indicators.get(key) is indicator:
+                    del self.indicators[key]
+
+    async def _renew(self, chat_id: int, action: str, client: AsyncClient):
+        while True:
+            try:
+                with outbound_priority(Priority.LOW):
+                    await client.post(url=self.url, json={'chat_id': chat_id, 'action': action})
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.warning('could not send %s action to chat %s', action, chat_id, exc_info=True)
+            # Telegram shows an action for about 5 seconds
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            'active': len(self.indicators),
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'sent': self.sent,
+            'errors': self.errors,
+        }
+
+
+chat_actions = ChatActionService(interval=settings.CHAT_ACTION_INTERVAL)
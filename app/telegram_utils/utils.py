@@ -5,12 +5,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.telegram_utils.bottoms import LANGUAGES
 from app.data.models import User, Word
 from app.config import answer_callback_url
+from app.web.webhook_reply import claim_reply
+from app.data.unit_of_work import after_commit, commit_or_defer
+from app.data.cache.chat_state import chat_state_store
 
 logger = logging.getLogger(__name__)
 
 
 async def send_message(chat_id: int, text: str, user_state: User, client: httpx.AsyncClient,
-                       remove_keyboard: bool = False, reply_to_message_id: int = None):
+                       remove_keyboard: bool = False, reply_to_message_id: int = None, inline_reply: bool = False):
+    '''Sends a message and returns its id. With inline_reply the message may be returned
+    in the webhook response instead, then no id is known and None is returned.'''
     try:
         payload = {
             'chat_id':chat_id,
@@ -23,6 +28,9 @@ async def send_message(chat_id: int, text: str, user_state: User, client: httpx.
         if reply_to_message_id is not None:
             payload['reply_to_message_id'] = reply_to_message_id
 
+        if inline_reply and claim_reply('sendMessage', payload):
+            return None
+
         resp = await client.post(url=send_msg_url, json=payload)
 
         if not resp.json():
@@ -42,9 +50,18 @@ async def detect_same_language(word1: str, word2: str) -> bool:
 
 
 async def update_bd(obj: list[User|Word]|User, bd: AsyncSession):
-    bd.add(obj)
-    await bd.commit()
-    await bd.refresh(obj)
+    '''Stores the objects, the commit waits for the end of the current update if one is handled.
+    Sessions do not expire on commit, so the objects need no refresh. The conversation
+    fields of users go to their chat hash in Redis once the commit has succeeded.'''
+    objs = obj if isinstance(obj, list) else [obj]
+    if isinstance(obj, list):
+        bd.add_all(obj)
+    else:
+        bd.add(obj)
+    await commit_or_defer(bd)
+    for user in objs:
+        if isinstance(user, User):
+            await after_commit(bd, chat_state_store.save, user)
     return {'details':'database has been successfully updated'}
 
 
@@ -64,7 +81,7 @@ async def update_state_to_await(user_state: User, bd: AsyncSession):
 
 
 async def raise_invalid_command(chat_id: int, user_state: User, client: httpx.AsyncClient):
-        await send_message(chat_id, 'Invalid command.', user_state, client)
+        await send_message(chat_id, 'Invalid command.', user_state, client, inline_reply=True)
         user_state.state = 'ready'
 
 
@@ -46,6 +46,13 @@ _db_init_stub.async_session_factory = _dummy_async_session_factory
 _db_init_stub.session_factory = lambda *args, **kwargs: None
 _db_init_stub.sync_engine = SimpleNamespace()
 _db_init_stub.async_engine = SimpleNamespace()
+
+
+async def _dummy_dispose_engines():
+    return None
+
+
+_db_init_stub.dispose_engines = _dummy_dispose_engines
 sys.modules["app.data.db_init"] = _db_init_stub
 
 # app/celery package shadows dependency import in tests; provide a tiny stub.
@@ -1,8 +1,17 @@
+import pytest
 import pytest_asyncio
 import random
 from app.data.models import User, Word
 from app.data.user_crud import UserCRUD
 from app.data.word_crud import WordsCRUD
+from app.data.cache.user_state_cache import user_state_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_user_state_cache():
+    # every test starts with its own database, cached rows would leak between them
+    user_state_cache.local.clear()
+    yield
 
 
 @pytest_asyncio.fixture(scope='function')
@@ -1,6 +1,7 @@
 import pytest, pytest_asyncio
 from app.data.models import User, Word
 from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
 import random
 from app.data.user_crud import UserCRUD
 
@@ -54,3 +55,19 @@ class TestUserCRUD:
         assert user_from_db.id == user.id
         assert len(user_from_db.words) == 3
         assert set(w.word for w in user_from_db.words) == {"word0", "word1", "word2"}
+
+    async def test_get_user_does_not_load_words(self, test_session, test_user_crud):
+        chat_id = 333444
+
+        user = User(chat_id=chat_id)
+        test_session.add(user)
+        await test_session.commit()
+        test_session.add(Word(chat_id=chat_id, user_id=user.id, word='word', translate='test', language='en'))
+        await test_session.commit()
+        test_session.expunge_all()
+
+        db_user = await test_user_crud.check_exists(chat_id)
+
+        assert db_user.id == user.id
+        with pytest.raises(InvalidRequestError):
+            db_user.words
@@ -1,27 +1,12 @@
 import pytest
+from datetime import datetime, timedelta, timezone
 from fastapi.responses import JSONResponse
-from sqlalchemy import select
-from app.data.models import Word
+from sqlalchemy import delete, select
+from app.data.models import Word, WordRevers
 
 @pytest.mark.asyncio
 class TestWordsCRUD:
 
-    async def test_add_word(self, test_words_crud, user_for_words, test_session):
-
-        word = 'test-word'
-
-        response = await test_words_crud.add_word(word, user_for_words.chat_id, user_for_words)
-
-        assert isinstance(response, JSONResponse)
-        assert response.body == b'{"details":"word has been successfully added"}'
-
-        res = await test_session.execute(select(Word).where(Word.word == word))
-        word_db = res.scalar_one_or_none()
-
-        assert word_db is not None
-        assert word_db.word == word
-        assert word_db.chat_id == user_for_words.chat_id
-
     async def test_get_words(self, test_words_crud, test_session, user_for_words, test_word):
 
         words = await test_words_crud.get_words(user_for_words.chat_id, user_for_words)
@@ -50,3 +35,54 @@ class TestWordsCRUD:
         res = await test_session.execute(select(Word).where(Word.word == test_word.word))
         deleted = res.scalar_one_or_none()
         assert deleted is None
+
+    async def test_save_word_once(self, test_words_crud, test_session, user_for_words):
+
+        assert await test_words_crud.save_word('upsert', user_for_words.chat_id, user_for_words) is True
+        assert await test_words_crud.save_word('upsert', user_for_words.chat_id, user_for_words) is False
+
+        res = await test_session.execute(select(Word).where(Word.word == 'upsert'))
+        assert len(res.scalars().all()) == 1
+        res = await test_session.execute(select(WordRevers).where(WordRevers.translate == 'upsert'))
+        assert len(res.scalars().all()) == 1
+
+    async def test_save_synonyms(self, test_words_crud, test_session, user_for_words):
+
+        assert await test_words_crud.save_word('big', user_for_words.chat_id, user_for_words) is True
+        assert await test_words_crud.save_word('large', user_for_words.chat_id, user_for_words) is True
+
+        res = await test_session.execute(
+            select(WordRevers.translate).where(WordRevers.word == user_for_words.last_translate)
+        )
+        assert sorted(res.scalars().all()) == ['big', 'large']
+
+    async def test_already_saved_word_adds_no_reverse_card(self, test_words_crud, test_session, user_for_words):
+
+        assert await test_words_crud.save_word('kept', user_for_words.chat_id, user_for_words) is True
+        await test_session.execute(delete(WordRevers).where(WordRevers.translate == 'kept'))
+
+        assert await test_words_crud.save_word('kept', user_for_words.chat_id, user_for_words) is False
+
+        res = await test_session.execute(select(WordRevers).where(WordRevers.translate == 'kept'))
+        assert res.scalars().all() == []
+
+    async def test_get_review_words(self, test_words_crud, test_session, test_word):
+
+        rows = await test_words_crud.get_review_words(Word, [test_word.id, test_word.id + 1000])
+
+        assert list(rows) == [test_word.id]
+        assert rows[test_word.id].word == test_word.word
+        assert rows[test_word.id].repetitions == test_word.repetitions
+
+    async def test_get_schedule_columns(self, test_words_crud, test_session, test_word):
+        now = datetime.now(timezone.utc)
+
+        rows = await test_words_crud.get_schedule_columns(Word, now, now + timedelta(days=1), test_word.chat_id)
+
+        assert len(rows) == 1
+        due_in, repetitions, interval, easiness, stability, good_penalty, interval_factor = rows[0]
+        assert due_in <= 0
+        assert (repetitions, interval, easiness) == (test_word.repetitions, test_word.interval, 2.5)
+        assert (good_penalty, interval_factor) == (None, None)
+        assert len(await test_words_crud.get_schedule_columns(Word, now, now + timedelta(days=1))) >= 1
+        assert await test_words_crud.get_schedule_columns(Word, now, now + timedelta(days=1), -1) == []
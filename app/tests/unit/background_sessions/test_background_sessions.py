@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+import pytest
+from app.bot.telegram_bot import Services, TelegramBot
+from app.data.models import User
+from app.data.unit_of_work import commit_or_defer, unit_of_work
+from app.web.state_dispatcher import StateDispatcher
+
+
+class FakeSession:
+    def __init__(self):
+        self.identity_map = {}
+        self.added = []
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+        self.closed = False
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+        return False
+
+
+def make_bot(db) -> TelegramBot:
+    container = SimpleNamespace(ai_client=MagicMock(), pronunciation_obj=MagicMock(), pdf_obj=MagicMock(),
+                                parsing_obj=MagicMock(), supervisor=MagicMock())
+    return TelegramBot(Services(db, httpx.AsyncClient(), container))
+
+
+def make_user() -> User:
+    user = User(id=3, chat_id=7, state='await_response', native_lang='ru', lang_code='en', last_word='',
+                last_translate='')
+    user.message_id = 42
+    return user
+
+
+@pytest.mark.asyncio
+class TestOwnSession:
+
+    async def test_task_gets_its_own_session_and_user(self):
+        update_db, task_db = FakeSession(), FakeSession()
+        bot = make_bot(update_db)
+        user = make_user()
+
+        async with unit_of_work(update_db):
+            async with bot.own_session(user, session_factory=lambda: task_db) as (task_bot, task_user):
+                assert task_bot.services.db is task_db and task_bot.services.word_crud.db is task_db
+                assert task_bot.services.review_obj.db is task_db
+                assert task_user is not user and task_user in task_db.added
+                assert (task_user.id, task_user.state, task_user.message_id) == (3, 'await_response', 42)
+                task_user.state = 'ready'
+                assert await commit_or_defer(task_db) is True
+
+            # committed by its own unit of work, while the update's is still open
+            task_db.commit.assert_awaited_once()
+            assert task_db.closed
+
+        assert bot.services.db is update_db and user.state == 'await_response'
+        update_db.commit.assert_not_awaited()
+
+    async def test_explanation_runs_on_its_own_session(self, monkeypatch):
+        update_db, task_db = FakeSession(), FakeSession()
+        bot = make_bot(update_db)
+        user = make_user()
+        sessions = []
+        tts, youtube = MagicMock(), MagicMock()
+        monkeypatch.setattr('app.web.state_dispatcher.tts_task', SimpleNamespace(delay=tts))
+        monkeypatch.setattr('app.web.state_dispatcher.youtube_parsing_task', SimpleNamespace(delay=youtube))
+        monkeypatch.setattr('app.bot.telegram_bot.async_session_factory', lambda: task_db)
+
+        async def explain_word(self, *, chat_id, word, user_state, reply_to_id):
+            sessions.append(self.services.db)
+            user_state.last_word = word
+            await commit_or_defer(self.services.db)
+
+        monkeypatch.setattr(TelegramBot, 'explain_word', explain_word)
+
+        await StateDispatcher(bot, update_db).explain_and_prepare(user, 7, 'hello', 1)
+
+        assert sessions == [task_db]
+        task_db.commit.assert_awaited_once()
+        update_db.commit.assert_not_awaited()
+        tts.assert_called_once_with(chat_id=7, word='hello', lang='en')
+
+    async def test_spawned_bot_methods_run_on_their_own_session(self, monkeypatch):
+        update_db, task_db = FakeSession(), FakeSession()
+        bot = make_bot(update_db)
+        user = make_user()
+        calls = []
+        monkeypatch.setattr('app.bot.telegram_bot.async_session_factory', lambda: task_db)
+
+        async def send_words_list(self, chat_id, user_state):
+            calls.append((self.services.db, user_state))
+            user_state.state = 'ready'
+            await commit_or_defer(self.services.db)
+            return {'details': 'sent'}
+
+        monkeypatch.setattr(TelegramBot, 'send_words_list', send_words_list)
+
+        async with unit_of_work(update_db):
+            result = await bot.detached(TelegramBot.send_words_list, user, chat_id=7)
+
+        assert result == {'details': 'sent'}
+        (db, task_user), = calls
+        assert db is task_db and task_user is not user and task_user.chat_id == 7
+        task_db.commit.assert_awaited_once()
+        assert user.state == 'await_response'
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.decorators import send_action
+from app.telegram_utils.chat_actions import ChatActionService
+
+URL = 'https://api.telegram.org/botTOKEN/sendChatAction'
+
+
+@pytest.fixture
+def action_client():
+    sent = []
+
+    def handler(request):
+        sent.append(time.monotonic())
+        return httpx.Response(200, json={'ok': True, 'result': True})
+
+    return sent, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+class TestChatActionService:
+
+    async def test_work_does_not_wait_for_the_action(self):
+        service = ChatActionService(URL, interval=5)
+        release = asyncio.Event()
+
+        async def slow_handler(request):
+            await release.wait()
+            return httpx.Response(200, json={'ok': True})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(slow_handler)) as slow_client:
+            async with service.show(1, 'typing', slow_client):
+                await asyncio.sleep(0.01)
+
+        assert service.stats()['active'] == 0
+        assert service.stats()['sent'] == 0
+
+    async def test_action_is_renewed_while_work_runs(self, action_client):
+        sent, client = action_client
+        service = ChatActionService(URL, interval=0.02)
+
+        async with service.show(1, 'typing', client):
+            await asyncio.sleep(0.07)
+        count = len(sent)
+        await asyncio.sleep(0.05)
+
+        assert count >= 3
+        assert len(sent) == count
+
+    async def test_nested_actions_are_coalesced(self, action_client):
+        sent, client = action_client
+        service = ChatActionService(URL, interval=5)
+
+        async with service.show(1, 'typing', client):
+            async with service.show(1, 'typing', client):
+                await asyncio.sleep(0.01)
+            assert service.stats()['active'] == 1
+            await asyncio.sleep(0.01)
+
+        assert len(sent) == 1
+        assert service.stats()['coalesced'] == 1
+        assert service.stats()['active'] == 0
+
+    async def test_decorator_keeps_result(self, action_client):
+        sent, client = action_client
+
+        class Bot:
+            @send_action('upload_document')
+            async def work(self, chat_id: int, client: httpx.AsyncClient):
+                return chat_id * 2
+
+        assert await Bot().work(21, client=client) == 42
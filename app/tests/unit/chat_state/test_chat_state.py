@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from app.data.cache.chat_state import ChatStateStore
+from app.data.models import User
+from app.data.unit_of_work import unit_of_work
+from app.telegram_utils.utils import update_bd
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.writes = []
+
+    async def load(self, chat_id):
+        return dict(self.hashes.get(chat_id, {}))
+
+    async def save(self, chat_id, changed, removed, ttl):
+        self.writes.append((chat_id, changed, removed))
+        chat = self.hashes.setdefault(chat_id, {})
+        chat.update({field: str(value) for field, value in changed.items()})
+        for field in removed:
+            chat.pop(field, None)
+
+
+def make_store():
+    redis = FakeRedis()
+    return ChatStateStore(ttl=60, load=redis.load, save=redis.save), redis
+
+
+@pytest.mark.asyncio
+class TestChatStateStore:
+
+    async def test_defaults_for_a_new_chat(self):
+        store, _ = make_store()
+
+        user = await store.load(User(chat_id=1))
+
+        assert user.review_index == 0
+        assert user.message_id is None
+        assert user.curr_command is None
+
+    async def test_fields_survive_between_updates(self):
+        store, _ = make_store()
+        user = await store.load(User(chat_id=1))
+        user.message_id = 42
+        user.curr_command = '/repeating'
+        user.review_index = 3
+        await store.save(user)
+
+        user = await store.load(User(chat_id=1))
+
+        assert (user.message_id, user.curr_command, user.review_index) == (42, '/repeating', 3)
+
+    async def test_only_changed_fields_are_written(self):
+        store, redis = make_store()
+        user = await store.load(User(chat_id=1))
+        user.message_id = 42
+        await store.save(user)
+        await store.save(user)
+
+        user.review_index = 1
+        user.message_id = None
+        await store.save(user)
+
+        assert redis.writes == [(1, {'m': 42}, []), (1, {'r': 1}, ['m'])]
+        assert store.stats()['skipped'] == 1
+
+    async def test_users_of_a_session_are_saved_together(self):
+        store, redis = make_store()
+        db = SimpleNamespace(info={})
+        first, second = await store.load(User(chat_id=1), db), await store.load(User(chat_id=2), db)
+        first.message_id = second.message_id = 7
+
+        await store.save_all(db)
+
+        assert redis.hashes == {1: {'m': '7'}, 2: {'m': '7'}}
+        assert db.info == {}
+
+    async def test_redis_errors_keep_the_update_going(self):
+        async def broken(*args):
+            raise ConnectionError('redis is down')
+
+        store = ChatStateStore(load=broken, save=broken)
+        user = await store.load(User(chat_id=1))
+        user.message_id = 5
+        await store.save(user)
+
+        assert user.review_index == 0
+        assert store.stats()['errors'] == 2
+
+    async def test_update_writes_redis_only_after_the_commit(self, monkeypatch):
+        store, redis = make_store()
+        monkeypatch.setattr('app.telegram_utils.utils.chat_state_store', store)
+        db = SimpleNamespace(add=MagicMock(), commit=AsyncMock(), rollback=AsyncMock())
+        user = await store.load(User(chat_id=1))
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(db):
+                user.message_id = 42
+                await update_bd(user, db)
+                raise RuntimeError('the update failed')
+
+        assert redis.writes == []
+
+        async with unit_of_work(db):
+            await update_bd(user, db)
+            assert redis.writes == []
+
+        assert redis.writes == [(1, {'m': 42}, [])]
@@ -0,0 +1,57 @@
+import pytest
+from app.web.dedup import UpdateDeduplicator
+
+
+@pytest.mark.asyncio
+class TestUpdateDeduplicator:
+
+    async def test_repeated_update_is_dropped(self):
+        dedup = UpdateDeduplicator()
+
+        assert await dedup.check(1) is True
+        assert await dedup.check(1) is False
+        assert await dedup.check(2) is True
+        assert dedup.stats()['duplicates'] == 1
+        assert dedup.stats()['accepted'] == 2
+
+    async def test_cache_is_bounded(self):
+        dedup = UpdateDeduplicator(maxsize=3)
+
+        for update_id in range(10):
+            await dedup.check(update_id)
+
+        assert dedup.stats()['size'] == 3
+        assert await dedup.check(0) is True
+        assert await dedup.check(9) is False
+
+    async def test_shared_claim_catches_other_workers(self):
+        claimed = set()
+
+        async def claim(update_id, ttl):
+            if update_id in claimed:
+                return False
+            claimed.add(update_id)
+            return True
+
+        async def release(update_id):
+            claimed.discard(update_id)
+
+        first = UpdateDeduplicator(claim=claim, release=release)
+        second = UpdateDeduplicator(claim=claim, release=release)
+
+        assert await first.check(7) is True
+        assert await second.check(7) is False
+        assert second.stats()['shared_duplicates'] == 1
+
+        await first.forget(7)
+        assert await first.check(7) is True
+
+    async def test_shared_store_errors_fall_back_to_local_cache(self):
+        async def claim(update_id, ttl):
+            raise ConnectionError
+
+        dedup = UpdateDeduplicator(claim=claim)
+
+        assert await dedup.check(1) is True
+        assert await dedup.check(1) is False
+        assert dedup.stats()['shared_errors'] == 1
@@ -0,0 +1,66 @@
+import httpx
+import pytest
+from app.http_pool import CountingTransport, HTTPClientPool
+
+
+class FakeTransport(httpx.AsyncBaseTransport):
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    async def handle_async_request(self, request):
+        if self.fail:
+            raise httpx.ConnectError('down')
+        return httpx.Response(200, stream=httpx.ByteStream(b'{"ok": true}'))
+
+
+@pytest.mark.asyncio
+class TestHTTPClientPool:
+
+    async def test_hosts_are_routed_to_own_pools(self):
+        pool = HTTPClientPool(http2=False)
+
+        assert pool.route('api.telegram.org') == 'telegram'
+        assert pool.route('api.aitunnel.ru') == 'ai'
+        assert pool.route('translate.google.com') == 'default'
+        assert pool.route('example.com') == 'default'
+
+        await pool.aclose()
+
+    async def test_unpooled_requests_are_counted(self):
+        pool = HTTPClientPool(http2=False)
+
+        await pool._count_request(httpx.Request('POST', 'https://api.telegram.org/botTOKEN/sendMessage'))
+        await pool._count_request(httpx.Request('GET', 'https://example.com/'))
+
+        stats = pool.stats()
+
+        assert stats['default']['requests'] == 1
+        assert stats['telegram'] == {'in_flight': 0, 'max_connections': pool.hosts['telegram'][1],
+                                     'requests': 0, 'errors': 0}
+        assert stats['http2'] is False
+
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+class TestCountingTransport:
+
+    async def test_request_is_in_flight_until_the_response_is_closed(self):
+        transport = CountingTransport(FakeTransport())
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream('GET', 'https://api.telegram.org/') as response:
+                assert transport.in_flight == 1
+                await response.aread()
+
+            assert (transport.requests, transport.in_flight) == (1, 0)
+
+            await client.get('https://api.telegram.org/')
+            assert (transport.requests, transport.in_flight) == (2, 0)
+
+    async def test_failed_requests_are_not_left_in_flight(self):
+        transport = CountingTransport(FakeTransport(fail=True))
+        async with httpx.AsyncClient(transport=transport) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.get('https://api.telegram.org/')
+
+        assert (transport.requests, transport.in_flight, transport.errors) == (1, 0, 1)
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from app.bot.spaced_review.optimizer import ReviewHistory, fit, recall_probability, replay
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, Deck, schedule
+
+
+def simulate(memories: dict[int, float], cards: int = 300, reviews: int = 12, seed: int = 0) -> np.ndarray:
+    '''Review log rows of chats whose forgetting curve has the given memory, answering 'easy' or forgetting.'''
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for chat_id, memory in memories.items():
+        deck = Deck.of(np.zeros(cards), np.ones(cards))
+        now = np.zeros(cards)
+        word_ids = np.arange(cards) + chat_id * cards
+        for _ in range(reviews):
+            elapsed = deck.interval * rng.uniform(0.8, 1.5, cards)
+            now = now + elapsed * 60
+            recalled = rng.random(cards) < recall_probability(elapsed, deck.stability, memory)
+            rating = np.where(recalled, 4, 0)
+            rows.append(np.column_stack([
+                np.full(cards, chat_id), word_ids, np.zeros(cards), now, rating, elapsed,
+                deck.repetitions, deck.easiness, deck.stability,
+            ]))
+            deck = schedule(rating, deck)
+    return np.concatenate(rows)
+
+
+class TestReplay:
+
+    def test_matches_scheduling_card_by_card(self):
+        history = ReviewHistory.of(simulate({1: 1.0}, cards=50, reviews=6))
+        params = DEFAULT_PARAMS._replace(good_penalty=0.5)
+
+        before = replay(history, params)
+
+        for card in np.unique(history.card)[:10]:
+            rows = np.flatnonzero(history.card == card)
+            first = rows[0]
+            deck = Deck.of(history.repetitions[[first]], [max(1, int(history.stability[first]))],
+                           history.easiness[[first]], history.stability[[first]])
+            for row in rows:
+                assert before[row] == pytest.approx(deck.stability[0])
+                deck = schedule(history.rating[[row]], deck, params)
+
+    def test_logged_schedule_is_replayed_exactly(self):
+        history = ReviewHistory.of(simulate({1: 1.0}, cards=50, reviews=6))
+
+        assert replay(history) == pytest.approx(history.stability)
+
+    def test_empty(self):
+        assert len(replay(ReviewHistory.of(np.empty((0, 9))))) == 0
+
+
+class TestFit:
+
+    def test_memory_of_every_chat_is_recovered(self):
+        history = ReviewHistory.of(simulate({1: 0.5, 2: 1.0, 3: 2.0}, cards=2000))
+
+        fits = {f.chat_id: f for f in fit(history, retention=0.9, min_reviews=100)}
+
+        assert sorted(fits) == [1, 2, 3]
+        for chat_id, memory in ((1, 0.5), (2, 1.0), (3, 2.0)):
+            assert fits[chat_id].memory == pytest.approx(memory, rel=0.15)
+            assert fits[chat_id].good_penalty == DEFAULT_PARAMS.good_penalty
+            # the forgetting curve is at 90% after memory * stability
+            assert fits[chat_id].interval_factor == pytest.approx(fits[chat_id].memory)
+            assert fits[chat_id].reviews == 2000 * 12
+
+    def test_lower_retention_spaces_reviews_further(self):
+        history = ReviewHistory.of(simulate({1: 1.0}, cards=100, reviews=8))
+
+        strict, = fit(history, retention=0.9, min_reviews=0)
+        relaxed, = fit(history, retention=0.8, min_reviews=0)
+
+        assert relaxed.interval_factor > strict.interval_factor
+
+    def test_chats_with_few_reviews_are_left_out(self):
+        history = ReviewHistory.of(simulate({1: 1.0, 2: 1.0}, cards=10, reviews=3))
+
+        assert fit(history, min_reviews=31) == []
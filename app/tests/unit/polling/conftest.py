@@ -0,0 +1,43 @@
+import json
+import httpx
+import pytest
+
+
+class FakeBotAPI:
+    '''A tiny in-process Bot API that serves getUpdates the way Telegram does.'''
+
+    def __init__(self, updates: list[dict]):
+        self.updates = updates
+        self.calls: list[tuple[str, dict]] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit('/', 1)[-1]
+        params = dict(request.url.params)
+        self.calls.append((method, params))
+
+        if method == 'getUpdates':
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', 100))
+            # confirmed updates are forgotten, like on the real server
+            self.updates = [update for update in self.updates if update['update_id'] >= offset]
+            return httpx.Response(200, content=json.dumps({'ok': True, 'result': self.updates[:limit]}))
+
+        return httpx.Response(200, json={'ok': True, 'result': True})
+
+    def count(self, method: str) -> int:
+        return sum(1 for name, _ in self.calls if name == method)
+
+
+@pytest.fixture
+def raw_update():
+    def factory(update_id: int, chat_id: int = 999, text: str = 'hello') -> dict:
+        return {'update_id': update_id, 'message': {'message_id': update_id, 'chat': {'id': chat_id}, 'text': text}}
+    return factory
+
+
+@pytest.fixture
+def fake_bot_api():
+    def factory(updates: list[dict]):
+        api = FakeBotAPI(updates)
+        return api, httpx.AsyncClient(transport=httpx.MockTransport(api))
+    return factory
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.web.chat_scheduler import ChatScheduler
+from app.web.dedup import UpdateDeduplicator
+from app.web.polling import PollingRunner, OffsetStore
+
+API = 'https://bot.test/botTOKEN'
+
+
+def chat_id(update):
+    return update.message.chat.id
+
+
+@pytest.mark.asyncio
+class TestPollingRunner:
+
+    async def test_batches_are_processed_and_offset_persisted(self, fake_bot_api, raw_update, tmp_path):
+        api, client = fake_bot_api([raw_update(i, chat_id=i % 3) for i in range(10, 15)])
+        handled = []
+
+        async def handler(update):
+            handled.append(update.update_id)
+
+        store = OffsetStore(str(tmp_path / 'offset'))
+        runner = PollingRunner(client, handler, ChatScheduler(), chat_id, f'{API}/getUpdates',
+                               offset_store=store, batch_size=3, timeout=0)
+
+        assert await runner.poll_once() == 3
+        assert await runner.poll_once() == 2
+        assert await runner.poll_once() == 0
+
+        assert sorted(handled) == [10, 11, 12, 13, 14]
+        assert store.load() == 15
+        assert runner.stats()['batches'] == 2
+        assert api.calls[-1][1]['offset'] == '15'
+
+    async def test_updates_of_one_chat_keep_order(self, fake_bot_api, raw_update):
+        api, client = fake_bot_api([raw_update(i, chat_id=1 + i % 2) for i in range(12)])
+        handled = {1: [], 2: []}
+
+        async def handler(update):
+            await asyncio.sleep(0.001 * (update.update_id % 3))
+            handled[update.message.chat.id].append(update.update_id)
+
+        runner = PollingRunner(client, handler, ChatScheduler(), chat_id, f'{API}/getUpdates', timeout=0)
+        await runner.poll_once()
+
+        assert handled[1] == list(range(0, 12, 2))
+        assert handled[2] == list(range(1, 12, 2))
+
+    async def test_failures_and_duplicates_do_not_stop_the_batch(self, fake_bot_api, raw_update):
+        api, client = fake_bot_api([raw_update(1), raw_update(2), raw_update(3)])
+        dedup = UpdateDeduplicator()
+        await dedup.check(3)
+
+        async def handler(update):
+            if update.update_id == 1:
+                raise ValueError('boom')
+
+        runner = PollingRunner(client, handler, ChatScheduler(), chat_id, f'{API}/getUpdates', dedup=dedup, timeout=0)
+        await runner.poll_once()
+
+        stats = runner.stats()
+        assert stats['failed'] == 1
+        assert stats['processed'] == 1
+        assert stats['offset'] == 4
+
+    async def test_run_deletes_webhook_and_resumes_from_stored_offset(self, fake_bot_api, raw_update, tmp_path):
+        api, client = fake_bot_api([raw_update(5), raw_update(6)])
+        store = OffsetStore(str(tmp_path / 'offset'))
+        store.save(6)
+        handled = []
+
+        async def handler(update):
+            handled.append(update.update_id)
+            runner.stop()
+
+        runner = PollingRunner(client, handler, ChatScheduler(), chat_id, f'{API}/getUpdates', f'{API}/deleteWebhook',
+                               offset_store=store, timeout=0)
+        await asyncio.wait_for(runner.run(), 1)
+
+        assert api.count('deleteWebhook') == 1
+        assert handled == [6]
@@ -55,7 +55,7 @@ def pronunciation(mock_httpx_client, monkeypatch, send_voice_url):
 def mock_gtts(monkeypatch):
 
     mock_factory = MagicMock()
-    monkeypatch.setattr('app.bot.pronunciation.gTTS', mock_factory)
+    monkeypatch.setattr('gtts.gTTS', mock_factory)
 
     return mock_factory
 
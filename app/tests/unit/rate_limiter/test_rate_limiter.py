@@ -0,0 +1,97 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.rate_limiter import TelegramRateLimiter, RateLimitedTransport, Priority, outbound_priority, request_chat_id
+
+URL = 'https://api.telegram.org/botTOKEN'
+
+
+class TestRequestChatId:
+
+    def test_json_body(self):
+        request = httpx.Request('POST', f'{URL}/sendMessage', json={'chat_id': 42, 'text': 'hi'})
+        assert request_chat_id(request) == 42
+
+    def test_form_body(self):
+        request = httpx.Request('POST', f'{URL}/sendMessage', data={'chat_id': '-100', 'text': 'hi'})
+        assert request_chat_id(request) == -100
+
+    def test_multipart_body(self):
+        request = httpx.Request('POST', f'{URL}/sendVoice', data={'chat_id': '7'},
+                                files={'voice': ('voice.ogg', b'bytes', 'audio/ogg')})
+        request.read()
+        assert request_chat_id(request) == 7
+
+    def test_no_chat(self):
+        request = httpx.Request('POST', f'{URL}/answerCallbackQuery', json={'callback_query_id': '1'})
+        assert request_chat_id(request) is None
+
+
+@pytest.mark.asyncio
+class TestTelegramRateLimiter:
+
+    async def test_per_chat_limit(self):
+        limiter = TelegramRateLimiter(global_rate=1000, chat_rate=20, chat_burst=1)
+
+        start = time.monotonic()
+        await limiter.acquire(1)
+        await limiter.acquire(2)
+        assert time.monotonic() - start < 0.03
+
+        await limiter.acquire(1)
+        assert time.monotonic() - start >= 0.04
+        assert limiter.stats()['throttled']['chat'] == 1
+
+    async def test_interactive_goes_first(self):
+        limiter = TelegramRateLimiter(global_rate=20, chat_rate=1000, chat_burst=1000)
+        for chat_id in range(20):
+            await limiter.acquire(chat_id)
+
+        order = []
+
+        async def send(chat_id, priority):
+            await limiter.acquire(chat_id, priority)
+            order.append(priority)
+
+        background = [asyncio.create_task(send(100 + n, Priority.BACKGROUND)) for n in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(send(200, Priority.INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+        assert order[0] == Priority.INTERACTIVE
+
+
+@pytest.mark.asyncio
+class TestRateLimitedTransport:
+
+    async def test_429_is_retried_after_delay(self):
+        calls = []
+
+        def handler(request):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                return httpx.Response(429, json={'ok': False, 'parameters': {'retry_after': 0.05}})
+            return httpx.Response(200, json={'ok': True})
+
+        limiter = TelegramRateLimiter()
+        transport = RateLimitedTransport(httpx.MockTransport(handler), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post(f'{URL}/sendMessage', json={'chat_id': 1, 'text': 'hi'})
+
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert calls[1] - calls[0] >= 0.04
+        assert limiter.stats()['rate_limited'] == 1
+
+    async def test_priority_comes_from_context(self):
+        limiter = TelegramRateLimiter()
+        transport = RateLimitedTransport(httpx.MockTransport(lambda request: httpx.Response(200, json={'ok': True})), limiter)
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            with outbound_priority(Priority.BACKGROUND):
+                await client.post(f'{URL}/sendDocument', data={'chat_id': '1'}, files={'document': ('a.pdf', b'x')})
+            await client.post(f'{URL}/sendChatAction', json={'chat_id': 1, 'action': 'typing'})
+            await client.post(f'{URL}/answerCallbackQuery', json={'callback_query_id': '1'})
+
+        assert limiter.stats()['granted'] == {'background': 1, 'low': 1}
@@ -2,38 +2,13 @@ import pytest
 from unittest.mock import Mock, AsyncMock, MagicMock
 from app.bot.spaced_review.review import SpacedReview
 from app.data.models import User, Word
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS
 
 from app.tests.unit.review.conftest import sample_review_words
 
 
 class TestSpacedReview:
 
-    def test_calculate_interval_first_repetition(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        assert review.calculate_interval(repetitions=1, quality=5, last_interval=1) == 1
-
-    def test_calculate_interval_second_repetition(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        assert review.calculate_interval(repetitions=2, quality=4, last_interval=1) == 5
-
-    def test_calculate_interval_third_repetition(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        assert review.calculate_interval(repetitions=3, quality=5, last_interval=1) == 10
-
-    def test_calculate_interval_quality_4(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        interval = review.calculate_interval(repetitions=4, quality=4, last_interval=10)
-        assert interval == int(10 * review.EASINESS_4)  # 17
-
-    def test_calculate_interval_quality_5(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        interval = review.calculate_interval(repetitions=5, quality=5, last_interval=10)
-        assert interval == int(10 * review.EASINESS_5)  # 25
-
-    def test_calculate_interval_default(self):
-        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
-        assert review.calculate_interval(repetitions=4, quality=3, last_interval=10) == 10
-
     @pytest.mark.asyncio
     async def test_update_word_states_quality_below_3(self, spaced_review, sample_review_words, mock_now):
         word = sample_review_words[0]
@@ -67,32 +42,7 @@ class TestSpacedReview:
 
         assert word.repetitions == 4
 
-        assert word.interval == int(5 * spaced_review.EASINESS_4)
-
-    @pytest.mark.asyncio
-    async def test_get_review_words_no_words(self, spaced_review, mock_client, user_state, monkeypatch):
-        mock_send_message = AsyncMock()
-        monkeypatch.setattr('app.bot.review.send_message', mock_send_message)
-
-        result = await spaced_review.get_review_words(chat_id=123, user_state=user_state)
-
-        assert result is None
-
-        mock_send_message.assert_called_once_with(123, 'На данный момент слов на повторение нет.', mock_client)
-
-        assert user_state.state == 'ready'
-
-    @pytest.mark.asyncio
-    async def test_get_review_words_has_words(self, spaced_review, sample_words, monkeypatch):
-        spaced_review.word_crud.get_words.return_value = sample_words
-        mock_send_message = AsyncMock()
-        monkeypatch.setattr('app.bot.review.send_message', mock_send_message)
-
-        result = await spaced_review.get_review_words(chat_id=123, user_state=MagicMock())
-
-        assert result == sample_words
-
-        mock_send_message.assert_not_called()
+        assert word.interval == int(5 * (DEFAULT_PARAMS.initial_easiness - DEFAULT_PARAMS.good_penalty))
 
     @pytest.mark.asyncio
     async def test_check_word_quality_forgets_word(self, spaced_review, monkeypatch):
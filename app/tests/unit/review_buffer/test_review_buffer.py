@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+import pytest
+from app.bot.spaced_review.review_buffer import ReviewBuffer
+from app.bot.spaced_review.review_states import ReviewLogEntry, ReviewSession, ReviewSessionStore, ReviewWord
+from app.data.unit_of_work import after_commit, unit_of_work
+
+REVIEW_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeSession:
+    def __init__(self, fail: bool = False, blocked: asyncio.Event | None = None):
+        self.fail = fail
+        self.blocked = blocked
+        self.batches = []
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+
+    async def execute(self, statement, rows):
+        if self.fail:
+            raise ConnectionError('database is down')
+        if self.blocked is not None:
+            await self.blocked.wait()
+        self.batches.append((statement.table.name, rows))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def word(word_id: int, repetitions: int = 1):
+    return ReviewWord(word_id, f'word{word_id}', '', repetitions, 1, REVIEW_TIME)
+
+
+@pytest.mark.asyncio
+class TestReviewBuffer:
+
+    async def test_one_update_with_the_latest_results(self):
+        buffer = ReviewBuffer(ReviewSessionStore())
+        session = ReviewSession([10, 11])
+        buffer.add(session, word(10, repetitions=1))
+        buffer.add(session, word(11))
+        buffer.add(session, word(10, repetitions=2))
+        db = FakeSession()
+
+        assert await buffer.flush(1, session, db) == 2
+
+        assert db.batches == [
+            ('words', [{'id': 10, 'repetitions': 2, 'interval': 1, 'review_time': REVIEW_TIME,
+                        'easiness': 2.5, 'stability': 1.0},
+                       {'id': 11, 'repetitions': 1, 'interval': 1, 'review_time': REVIEW_TIME,
+                        'easiness': 2.5, 'stability': 1.0}]),
+        ]
+        db.commit.assert_awaited_once()
+
+    async def test_ratings_are_logged_with_the_results(self):
+        buffer = ReviewBuffer(ReviewSessionStore())
+        session = ReviewSession([10], reverse=True)
+        buffer.add(session, word(10), ReviewLogEntry(10, REVIEW_TIME, 0, 12.5, 4, 2.5, 17.5))
+        buffer.add(session, word(10), ReviewLogEntry(10, REVIEW_TIME, 4, 1.0, 0, 1.7, 1.0))
+        db = FakeSession()
+
+        await buffer.flush(7, session, db)
+
+        assert [table for table, _ in db.batches] == ['revers_words', 'review_log']
+        assert db.batches[1][1][0] == {'chat_id': 7, 'reverse': True, 'word_id': 10, 'reviewed_at': REVIEW_TIME,
+                                       'rating': 0, 'elapsed': 12.5, 'repetitions': 4, 'easiness': 2.5,
+                                       'stability': 17.5}
+        assert len(db.batches[1][1]) == 2
+        assert session.log == [] and buffer.stats()['logged'] == 2
+        assert session.results == {}
+
+    async def test_reverse_session_writes_the_reverse_table(self):
+        buffer = ReviewBuffer(ReviewSessionStore())
+        session = ReviewSession([20], reverse=True)
+        buffer.add(session, word(20))
+        db = FakeSession()
+
+        await buffer.flush(1, session, db)
+
+        assert db.batches[0][0] == 'revers_words'
+
+    async def test_flush_is_due_every_n_words(self):
+        buffer = ReviewBuffer(ReviewSessionStore(), flush_every=3)
+        session = ReviewSession(range(3))
+
+        assert [buffer.add(session, word(i)) for i in range(3)] == [False, False, True]
+
+    async def test_nothing_to_flush(self):
+        db = FakeSession()
+
+        assert await ReviewBuffer(ReviewSessionStore()).flush(1, ReviewSession([1]), db) == 0
+        assert db.batches == []
+
+    async def test_failed_flush_keeps_the_results(self):
+        buffer = ReviewBuffer(ReviewSessionStore())
+        session = ReviewSession([10])
+        buffer.add(session, word(10, repetitions=1))
+
+        with pytest.raises(ConnectionError):
+            await buffer.flush(1, session, FakeSession(fail=True))
+        buffer.add(session, word(10, repetitions=5))
+
+        db = FakeSession()
+        await buffer.flush(1, session, db)
+        assert db.batches[0][1][0]['repetitions'] == 5
+        assert buffer.stats()['errors'] == 1
+
+    async def test_results_are_kept_until_the_unit_of_work_commits(self):
+        store = ReviewSessionStore()
+        buffer = ReviewBuffer(store)
+        session = ReviewSession([10, 11])
+        buffer.add(session, word(10), ReviewLogEntry(10, REVIEW_TIME, 4, 1.0, 0, 2.5, 1.0))
+        db = FakeSession()
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(db):
+                await buffer.flush(1, session, db)
+                await store.put(1, session)
+                await after_commit(db, store.put, 1, session)
+                raise RuntimeError('the update failed after the flush')
+
+        db.commit.assert_not_awaited()
+        stored = await store.get(1)
+        assert list(stored.results) == [10] and len(stored.log) == 1
+        assert buffer.stats()['flushes'] == 0
+
+        async with unit_of_work(db):
+            await buffer.flush(1, session, db)
+            buffer.add(session, word(11))
+            assert session.results
+
+        db.commit.assert_awaited_once()
+        assert list(session.results) == [11] and session.log == []
+        assert buffer.stats()['flushes'] == 1 and buffer.stats()['logged'] == 1
+
+    async def test_sweeper_writes_abandoned_sessions(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr('app.bot.spaced_review.review_states.time.time', lambda: now[0])
+        store = ReviewSessionStore()
+        buffer = ReviewBuffer(store, idle_timeout=300)
+        for chat_id, touched in ((1, 1000.0), (2, 1200.0)):
+            now[0] = touched
+            session = ReviewSession([chat_id])
+            buffer.add(session, word(chat_id))
+            await store.put(chat_id, session)
+        await store.put(3, ReviewSession([3]))
+        db = FakeSession()
+
+        now[0] = 1350.0
+        assert await buffer.sweep(lambda: db) == 1
+        assert (await store.get(1)).results == {} and (await store.get(2)).results
+
+        assert await buffer.sweep(lambda: db, idle_for=0) == 1
+        assert await store.idle(0) == []
+        assert buffer.stats()['swept'] == 2
+
+    async def test_sweeper_survives_database_errors(self):
+        store = ReviewSessionStore()
+        buffer = ReviewBuffer(store)
+        session = ReviewSession([10])
+        buffer.add(session, word(10))
+        await store.put(1, session)
+        db = FakeSession(fail=True)
+
+        assert await buffer.sweep(lambda: db, idle_for=0) == 0
+        db.rollback.assert_awaited_once()
+        assert (await store.get(1)).results
+
+    async def test_rating_during_a_slow_sweep_is_kept(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr('app.bot.spaced_review.review_states.time.time', lambda: now[0])
+        store = ReviewSessionStore()
+        buffer = ReviewBuffer(store)
+        session = ReviewSession([10, 11])
+        buffer.add(session, word(10))
+        await store.put(1, session)
+        released = asyncio.Event()
+        db = FakeSession(blocked=released)
+
+        sweep = asyncio.create_task(buffer.sweep(lambda: db, idle_for=0))
+        await asyncio.sleep(0)
+        # the chat rates the next word while the sweeper is writing the first
+        now[0] += 1
+        rated = await store.get(1)
+        buffer.add(rated, word(11))
+        await store.put(1, rated)
+        released.set()
+
+        assert await sweep == 1
+        assert sorted((await store.get(1)).results) == [10, 11]
+        assert store.stats()['conflicts'] == 1
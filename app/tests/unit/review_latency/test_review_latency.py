@@ -0,0 +1,85 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.bot.spaced_review.review_latency import ReviewLatency
+from app.bot.spaced_review.review_pages import ReviewPager
+from app.bot.spaced_review.review_states import ReviewSessionStore
+from app.data.models import Word, User
+from app.tests.unit.review_ui.test_review_in_place import make_review
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    store = ReviewSessionStore()
+    monkeypatch.setattr('app.bot.spaced_review.review.review_sessions', store)
+    return store
+
+
+@pytest.fixture
+def pager(monkeypatch):
+    pager = ReviewPager(page_size=4)
+    monkeypatch.setattr('app.bot.spaced_review.review.review_pager', pager)
+    return pager
+
+
+class TestReviewLatency:
+
+    def test_percentiles_per_kind(self):
+        latency = ReviewLatency(target=0.5)
+        for ms in range(1, 101):
+            latency.observe(ms / 1000)
+        latency.observe(0.8, forgot=True)
+
+        stats = latency.stats()
+        assert stats['count'] == 101 and stats['over_target'] == 1
+        assert stats['rated']['p50_ms'] == 51.0
+        assert stats['rated']['p95_ms'] == 96.0
+        assert stats['forgot'] == {'count': 1, 'p50_ms': 800.0, 'p95_ms': 800.0, 'max_ms': 800.0}
+
+    def test_window_keeps_the_latest(self):
+        latency = ReviewLatency(window=2)
+        for seconds in (3.0, 0.1, 0.2):
+            latency.observe(seconds)
+
+        assert latency.stats()['rated']['max_ms'] == 200.0
+        assert latency.stats()['count'] == 3
+
+    def test_empty(self):
+        assert ReviewLatency().stats()['forgot']['p95_ms'] == 0.0
+
+
+@pytest.mark.asyncio
+class TestForgottenWordFeedback:
+
+    async def test_next_card_does_not_wait_for_the_voice(self, sessions, pager, monkeypatch):
+        events = []
+
+        def handler(request):
+            events.append(json.loads(request.content).get('text'))
+            return httpx.Response(200, json={'ok': True, 'result': {'message_id': 500}})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        latency = ReviewLatency()
+        monkeypatch.setattr('app.bot.spaced_review.review.review_latency', latency)
+        words = [Word(id=i, word=f'word{i}', translate=f'translation{i}', interval=1, repetitions=0) for i in range(3)]
+        review, pronunciation = make_review(client, words)
+
+        async def send_voice(**kwargs):
+            await asyncio.sleep(0.05)
+            events.append('voice')
+
+        pronunciation.send_voice = send_voice
+        user = User(chat_id=5, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=10)
+
+        await review.start_review(chat_id=5, user_state=user, text='/repeating', client=client, model_param='word')
+        warmed = [call.args[1] for call in pronunciation.warm.call_args_list]
+        assert warmed == ['word0', 'word1', 'word2']
+
+        await review.continue_review(chat_id=5, user_state=user, text='forgot', client=client,
+                                     reply_to_id=10, model_param='word')
+
+        assert events.index('word1') < events.index('voice')
+        assert 'Translation of a forgotten word: translation0' in events
+        assert user.review_index == 1 and user.message_id == 500
+        assert latency.stats()['forgot']['count'] == 1
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+import pytest
+from app.bot.spaced_review.review import SpacedReview
+from app.bot.spaced_review.review_states import ReviewLogEntry, ReviewResult, ReviewSession, ReviewWord
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS
+
+REVIEW_TIME = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+class TestLogEntry:
+
+    async def test_rating_returns_the_state_before_it(self):
+        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
+        # rated 10 minutes ago with an interval of 10 minutes, due now
+        word = ReviewWord(2, 'world', 'мир', 3, 10, datetime.now(timezone.utc), 2.4, 10.0)
+
+        entry = await review.update_word_states(quality=5, word=word)
+
+        assert (entry.word_id, entry.rating, entry.repetitions, entry.easiness, entry.stability) == (2, 5, 3, 2.4, 10.0)
+        assert entry.elapsed == pytest.approx(10, abs=0.1)
+        assert word.review_time == entry.reviewed_at + timedelta(minutes=word.interval)
+
+    async def test_deleted_word_is_not_logged(self):
+        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
+
+        assert await review.update_word_states(quality=4, word=ReviewWord(2, '', '', 0, 1, None)) is None
+
+    async def test_fitted_params_of_the_session_are_used(self):
+        review = SpacedReview(Mock(), Mock(), Mock(), Mock())
+        word = ReviewWord(2, 'world', 'мир', 5, 100, REVIEW_TIME, 2.5, 100.0)
+
+        await review.update_word_states(quality=5, word=word, params=DEFAULT_PARAMS._replace(interval_factor=0.5))
+
+        assert word.stability == 250.0 and word.interval == 125
+
+
+class TestSessionLog:
+
+    def test_round_trip(self):
+        params = DEFAULT_PARAMS._replace(good_penalty=0.5, interval_factor=1.25)
+        session = ReviewSession([1, 2], results={2: ReviewResult(3, 10, REVIEW_TIME, 2.36, 17.5)},
+                                log=[ReviewLogEntry(2, REVIEW_TIME, 3, 14.25, 2, 2.5, 10.0)], params=params)
+
+        decoded = ReviewSession.decode(session.encode())
+
+        assert decoded.log == session.log
+        assert decoded.params == params
+
+    def test_default_params_are_not_stored(self):
+        fields = ReviewSession([1]).encode()
+
+        assert 'sp' not in fields and 'log' not in fields
+        assert ReviewSession.decode(fields).params is DEFAULT_PARAMS
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.bot.spaced_review.review_pages import ReviewPager
+from app.bot.spaced_review.review_states import ReviewSession
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS
+
+DUE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+# two words share a review_time, the id decides their order
+ROWS = [SimpleNamespace(id=i, review_time=DUE + timedelta(minutes=i // 2)) for i in range(1, 11)]
+
+
+def page(after, limit):
+    return [row for row in ROWS if after is None or (row.review_time, row.id) > after][:limit]
+
+
+class FakeWordsCRUD:
+    def __init__(self, good_penalty=None, interval_factor=None):
+        self.reads = []
+        self.params = dict(good_penalty=good_penalty, interval_factor=interval_factor)
+
+    async def get_due_page(self, model, chat_id, language, due_before, after, limit, with_params=False):
+        self.reads.append(after)
+        rows = page(after, limit)
+        if with_params:
+            rows = [SimpleNamespace(**vars(row), **self.params) for row in rows]
+        return rows
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    '''Answers the page query of WordsCRUD from ROWS, reading the cursor from its parameters.'''
+
+    def __init__(self, reads: list):
+        self.reads = reads
+
+    async def execute(self, statement):
+        # the cursor binds as param_1 and param_2, the limit is the last param_N
+        params = statement.compile().params
+        after = (params['param_1'], params['param_2']) if 'param_2' in params else None
+        self.reads.append(after)
+        return FakeResult(page(after, params['param_3'] if 'param_3' in params else params['param_1']))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.mark.asyncio
+class TestReviewPager:
+
+    async def test_first_page_only(self):
+        crud = FakeWordsCRUD()
+        session, rows = await ReviewPager(page_size=4).start(crud, 1, 'en', reverse=False)
+
+        assert session.ids == (1, 2, 3, 4) and [row.id for row in rows] == [1, 2, 3, 4]
+        assert not session.done and session.after == (ROWS[3].review_time, 4)
+        assert crud.reads == [None]
+        assert session.params is DEFAULT_PARAMS
+
+    async def test_fitted_params_come_with_the_first_page(self):
+        crud = FakeWordsCRUD(good_penalty=0.5, interval_factor=1.25)
+        session, _ = await ReviewPager(page_size=4).start(crud, 1, 'en', reverse=False)
+
+        assert session.params == DEFAULT_PARAMS._replace(good_penalty=0.5, interval_factor=1.25)
+        assert crud.reads == [None]
+
+    async def test_pages_follow_the_keyset(self):
+        crud = FakeWordsCRUD()
+        pager = ReviewPager(page_size=4)
+        session, _ = await pager.start(crud, 1, 'en', reverse=False)
+
+        await pager.ensure(crud, 1, 'en', session, 3)
+        assert len(crud.reads) == 1
+
+        await pager.ensure(crud, 1, 'en', session, 9)
+        assert session.ids == tuple(range(1, 11))
+        assert session.done and pager.stats()['pages'] == 3
+
+    async def test_encoded_session_continues_where_it_stopped(self):
+        crud = FakeWordsCRUD()
+        pager = ReviewPager(page_size=3)
+        session, _ = await pager.start(crud, 1, 'en', reverse=False)
+
+        session = ReviewSession.decode(session.encode())
+        await pager.ensure(crud, 1, 'en', session, 3)
+
+        assert session.ids == (1, 2, 3, 4, 5, 6)
+
+    async def test_prefetched_page_is_taken(self):
+        reads = []
+        crud = FakeWordsCRUD()
+        pager = ReviewPager(page_size=4, prefetch_ahead=2, session_factory=lambda: FakeSession(reads))
+        session, _ = await pager.start(crud, 1, 'en', reverse=False)
+
+        pager.prefetch(1, 'en', session, 1)
+        assert pager.prefetches == {}
+        pager.prefetch(1, 'en', session, 2)
+        await asyncio.sleep(0)
+
+        await pager.ensure(crud, 1, 'en', session, 4)
+        assert session.ids == (1, 2, 3, 4, 5, 6, 7, 8)
+        assert crud.reads == [None] and len(reads) == 1
+        assert pager.stats()['prefetch_hits'] == 1
+        assert pager.supervisor.stats()['kinds']['review_page']['completed'] == 1
+
+    async def test_stale_prefetch_is_dropped(self):
+        crud = FakeWordsCRUD()
+        pager = ReviewPager(page_size=4, session_factory=lambda: FakeSession([]))
+        session, _ = await pager.start(crud, 1, 'en', reverse=False)
+        pager.prefetch(1, 'en', session, 3)
+
+        # another worker has loaded the next page meanwhile
+        session.ids += (5, 6, 7, 8)
+        session.after = (ROWS[7].review_time, 8)
+        await pager.ensure(crud, 1, 'en', session, 8)
+
+        assert session.ids == tuple(range(1, 11))
+        assert pager.stats()['prefetch_misses'] == 1
+        assert crud.reads[-1] == (ROWS[7].review_time, 8)
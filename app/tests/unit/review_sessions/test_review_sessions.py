@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+import pytest
+from app.bot.spaced_review.review_states import ReviewResult, ReviewSession, ReviewSessionStore
+
+REVIEW_TIME = datetime(2026, 1, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.touched = {}
+
+    async def load(self, chat_id):
+        return self.hashes.get(chat_id)
+
+    async def save(self, chat_id, fields, touched, ttl):
+        self.hashes[chat_id] = {key.encode(): value for key, value in fields.items()}
+        if 'res' in fields:
+            self.touched[chat_id] = touched
+        else:
+            self.touched.pop(chat_id, None)
+
+    async def replace(self, chat_id, fields, touched, ttl):
+        if self.hashes.get(chat_id, {}).get(b't') != fields['t']:
+            return False
+        await self.save(chat_id, fields, touched, ttl)
+        return True
+
+    async def delete(self, chat_id):
+        self.hashes.pop(chat_id, None)
+        self.touched.pop(chat_id, None)
+
+    async def idle(self, before):
+        return [chat_id for chat_id, touched in self.touched.items() if touched <= before]
+
+
+def store_with(redis: FakeRedis) -> ReviewSessionStore:
+    return ReviewSessionStore(load=redis.load, save=redis.save, delete=redis.delete, idle=redis.idle,
+                              replace=redis.replace)
+
+
+class TestReviewSession:
+
+    def test_round_trip(self):
+        session = ReviewSession([1, 2, 2**31 - 1], reverse=True, card_id=500,
+                                results={2: ReviewResult(3, 10, REVIEW_TIME, 2.36, 17.5)}, touched=1.5)
+
+        decoded = ReviewSession.decode(session.encode())
+
+        assert decoded.ids == (1, 2, 2**31 - 1)
+        assert decoded.reverse and decoded.card_id == 500 and decoded.touched == 1.5
+        assert decoded.results == {2: ReviewResult(3, 10, REVIEW_TIME, 2.36, 17.5)}
+
+    def test_encoding_is_compact(self):
+        fields = ReviewSession(range(100), results={i: ReviewResult(1, 1, REVIEW_TIME, 2.5, 1.0) for i in range(10)}).encode()
+
+        assert len(fields['ids']) == 400
+        assert len(fields['res']) == 360
+        assert 'card' not in ReviewSession([1]).encode()
+
+
+@pytest.mark.asyncio
+class TestReviewSessionStore:
+
+    async def test_shared_store_is_used_by_every_worker(self):
+        redis = FakeRedis()
+        first, second = store_with(redis), store_with(redis)
+        await first.put(7, ReviewSession([1, 2], card_id=10))
+
+        session = await second.get(7)
+        assert session.ids == (1, 2) and session.card_id == 10
+
+        await second.delete(7)
+        assert await first.get(7) is None
+        assert first.stats()['misses'] == 1
+
+    async def test_only_sessions_with_results_are_idle(self):
+        redis = FakeRedis()
+        store = store_with(redis)
+        await store.put(1, ReviewSession([1]))
+        await store.put(2, ReviewSession([2], results={2: ReviewResult(1, 1, REVIEW_TIME, 2.5, 1.0)}))
+
+        assert await store.idle(0) == [2]
+
+    async def test_session_saved_again_is_not_replaced(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr('app.bot.spaced_review.review_states.time.time', lambda: now[0])
+        for store in (store_with(FakeRedis()), ReviewSessionStore()):
+            await store.put(1, ReviewSession([1], card_id=10))
+            loaded, newer = await store.get(1), await store.get(1)
+            now[0] += 1
+            newer.card_id = 11
+            await store.put(1, newer)
+
+            loaded.card_id = 12
+            assert await store.replace(1, loaded) is False
+            assert (await store.get(1)).card_id == 11
+
+            newer.card_id = 13
+            assert await store.replace(1, newer) is True
+            current = await store.get(1)
+            assert current.card_id == 13 and current.touched == now[0]
+            assert store.stats()['conflicts'] == 1
+
+    async def test_local_sessions_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr('app.bot.spaced_review.review_states.time.time', lambda: now[0])
+        store = ReviewSessionStore(ttl=60)
+        await store.put(1, ReviewSession([1]))
+
+        now[0] += 61
+        assert await store.get(1) is None
+        assert store.local == {}
+
+    async def test_shared_errors_do_not_raise(self):
+        async def broken(*args):
+            raise ConnectionError('redis is down')
+
+        store = ReviewSessionStore(load=broken, save=broken, delete=broken, idle=broken, replace=broken)
+        await store.put(1, ReviewSession([1]))
+
+        assert await store.get(1) is None
+        assert await store.idle(0) == []
+        assert await store.replace(1, ReviewSession([1])) is False
+        await store.delete(1)
+        assert store.stats()['errors'] == 5
+
+    async def test_session_of_another_layout_is_dropped(self):
+        redis = FakeRedis()
+        store = store_with(redis)
+        await store.put(1, ReviewSession([1], results={1: ReviewResult(1, 1, REVIEW_TIME, 2.5, 1.0)}))
+        # results packed without easiness and stability
+        redis.hashes[1][b'res'] = redis.hashes[1][b'res'][:20]
+
+        assert await store.get(1) is None
+        assert store.stats()['errors'] == 1
@@ -0,0 +1,181 @@
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+import pytest
+from app.bot.spaced_review.review import SpacedReview
+from app.bot.spaced_review.review_pages import ReviewPager
+from app.bot.spaced_review.review_states import ReviewSessionStore
+from app.data.models import Word, User
+from app.data.unit_of_work import unit_of_work
+
+
+@pytest.fixture
+def edit_mode(monkeypatch):
+    monkeypatch.setattr('app.bot.spaced_review.review.settings.REVIEW_UI', 'edit')
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    store = ReviewSessionStore()
+    monkeypatch.setattr('app.bot.spaced_review.review.review_sessions', store)
+    return store
+
+
+@pytest.fixture
+def pager(monkeypatch):
+    # small pages, read when they are needed
+    pager = ReviewPager(page_size=4)
+    monkeypatch.setattr('app.bot.spaced_review.review.review_pager', pager)
+    return pager
+
+
+@pytest.fixture
+def telegram():
+    methods = Counter()
+    edits = []
+
+    def handler(request):
+        method = request.url.path.rsplit('/', 1)[-1]
+        methods[method] += 1
+        if method == 'editMessageText':
+            edits.append(json.loads(request.content))
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': 500}})
+
+    return methods, edits, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def make_review(client, words):
+    due = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [SimpleNamespace(id=word.id, word=word.word, translate=word.translate, repetitions=word.repetitions,
+                            interval=word.interval, review_time=due + timedelta(minutes=position),
+                            easiness=2.5, stability=float(word.interval), good_penalty=None, interval_factor=None)
+            for position, word in enumerate(words)]
+
+    async def get_due_page(model, chat_id, language, due_before, after, limit, with_params=False):
+        return [row for row in rows if after is None or (row.review_time, row.id) > after][:limit]
+
+    async def get_review_words(model, ids):
+        return {row.id: (row.id, row.word, row.translate, row.repetitions, row.interval, row.review_time,
+                         row.easiness, row.stability)
+                for row in rows if row.id in ids}
+
+    word_crud = SimpleNamespace(get_due_page=get_due_page, get_review_words=get_review_words)
+    db = SimpleNamespace(add=MagicMock(), commit=AsyncMock(), rollback=AsyncMock(), refresh=AsyncMock(),
+                         execute=AsyncMock())
+    pronunciation = SimpleNamespace(send_voice=AsyncMock(), warm=MagicMock())
+    return SpacedReview(word_crud, pronunciation, db, client), pronunciation
+
+
+@pytest.mark.asyncio
+class TestReviewInPlace:
+
+    async def test_session_sends_one_message_and_edits_it(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        words = [Word(id=i, word=f'word{i}', translate=f'translation{i}', interval=1, repetitions=0) for i in range(10)]
+        review, pronunciation = make_review(client, words)
+        user = User(chat_id=1, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=1)
+
+        await review.start_review(chat_id=1, user_state=user, text='/repeating', client=client, model_param='word')
+        assert (await sessions.get(1)).card_id == 500
+
+        for rating in ['forgot'] + ['easy'] * 9:
+            await review.continue_review(chat_id=1, user_state=user, text=rating, client=client,
+                                         reply_to_id=1, model_param='word')
+
+        assert methods['sendMessage'] == 1
+        assert methods['editMessageText'] == 10
+        assert edits[0]['message_id'] == 500
+        assert edits[0]['text'].startswith('Translation of a forgotten word: translation0')
+        assert edits[-1]['text'] == 'Repeating has been finished.'
+        assert 'reply_markup' not in edits[-1]
+        assert pronunciation.send_voice.await_count == 1
+        assert user.state == 'ready'
+        assert await sessions.get(1) is None and sessions.local == {}
+        assert pager.pages == 3
+
+    async def test_finish_button_ends_the_session(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        words = [Word(id=i, word='a', translate='b', interval=1, repetitions=0) for i in range(3)]
+        review, _ = make_review(client, words)
+        user = User(chat_id=2, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=1)
+
+        await review.start_review(chat_id=2, user_state=user, text='/repeating', client=client, model_param='word')
+        await review.continue_review(chat_id=2, user_state=user, text='finish repeating', client=client,
+                                     reply_to_id=1, model_param='word')
+
+        assert edits[-1]['text'] == 'Repeating has been finished.'
+        assert user.state == 'ready'
+
+    async def test_rolled_back_finish_keeps_the_results(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        words = [Word(id=i, word='a', translate='b', interval=1, repetitions=0) for i in range(3)]
+        review, _ = make_review(client, words)
+        user = User(chat_id=6, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=1)
+
+        await review.start_review(chat_id=6, user_state=user, text='/repeating', client=client, model_param='word')
+        await review.continue_review(chat_id=6, user_state=user, text='easy', client=client,
+                                     reply_to_id=1, model_param='word')
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(review.db):
+                await review.continue_review(chat_id=6, user_state=user, text='finish repeating', client=client,
+                                             reply_to_id=1, model_param='word')
+                raise RuntimeError('the update failed after the flush')
+
+        review.db.rollback.assert_awaited_once()
+        stored = await sessions.get(6)
+        assert list(stored.results) == [0] and len(stored.log) == 1
+
+        async with unit_of_work(review.db):
+            await review.continue_review(chat_id=6, user_state=user, text='finish repeating', client=client,
+                                         reply_to_id=1, model_param='word')
+            assert await sessions.get(6) is not None
+
+        assert await sessions.get(6) is None
+
+    async def test_card_is_sent_again_when_the_first_one_failed(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        words = [Word(id=i, word=f'word{i}', translate='b', interval=1, repetitions=0) for i in range(3)]
+        review, _ = make_review(client, words)
+        user = User(chat_id=5, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=77)
+
+        await review.start_review(chat_id=5, user_state=user, text='/repeating', client=client, model_param='word')
+        session = await sessions.get(5)
+        session.card_id = None
+        await sessions.put(5, session)
+        review.sessions.pop(5, None)
+
+        await review.continue_review(chat_id=5, user_state=user, text='easy', client=client,
+                                     reply_to_id=77, model_param='word')
+
+        # a new card instead of editing the user's own message
+        assert methods['sendMessage'] == 2 and edits == []
+        assert (await sessions.get(5)).card_id == 500
+
+        await review.continue_review(chat_id=5, user_state=user, text='easy', client=client,
+                                     reply_to_id=77, model_param='word')
+        assert edits[-1]['message_id'] == 500
+
+    async def test_expired_session_resets_the_state(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        review, _ = make_review(client, [])
+        user = User(chat_id=3, state='await_rating', curr_command='/repeating', lang_code='en', review_index=4, message_id=1)
+
+        result = await review.continue_review(chat_id=3, user_state=user, text='easy', client=client,
+                                              reply_to_id=1, model_param='word')
+
+        assert result == {'details': 'review session has expired'}
+        assert user.state == 'ready' and user.review_index == 0
+        assert methods['sendMessage'] == 1 and edits == []
+
+    async def test_nothing_to_repeat(self, edit_mode, sessions, pager, telegram):
+        methods, edits, client = telegram
+        review, _ = make_review(client, [])
+        user = User(chat_id=4, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=1)
+
+        await review.start_review(chat_id=4, user_state=user, text='/repeating', client=client, model_param='word')
+
+        assert user.state == 'ready'
+        assert methods['sendMessage'] == 1 and sessions.local == {}
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.data.word_crud import WordsCRUD
+from app.bot.telegram_bot import TelegramBot
+
+
+class RecordingSession:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+        self.commit = AsyncMock()
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(one=lambda: self.row)
+
+
+user_state = SimpleNamespace(id=7, last_translate='перевод', lang_code='en')
+
+
+@pytest.mark.asyncio
+class TestSaveWord:
+
+    async def test_both_directions_in_one_statement(self):
+        db = RecordingSession((1, 1))
+
+        assert await WordsCRUD(db).save_word('word', 1, user_state) is True
+
+        [statement] = db.statements
+        assert 'INSERT INTO words' in statement
+        assert 'INSERT INTO revers_words' in statement
+        assert 'ON CONFLICT (chat_id, language, word) DO NOTHING' in statement
+        assert 'ON CONFLICT (chat_id, language, word, translate) DO NOTHING' in statement
+        db.commit.assert_awaited_once()
+
+    async def test_reverse_card_is_inserted_from_the_new_word(self):
+        db = RecordingSession((1, 1))
+
+        await WordsCRUD(db).save_word('word', 1, user_state)
+
+        [statement] = db.statements
+        reverse = statement[statement.index('INSERT INTO revers_words'):]
+        # nothing to select when the word conflicted, so no reverse card either
+        assert 'SELECT new_word.chat_id AS chat_id, new_word.translate AS translate, new_word.word AS word' in reverse
+        assert 'FROM new_word ON CONFLICT' in reverse
+        assert 'VALUES' not in reverse
+
+    async def test_already_saved(self):
+        db = RecordingSession((None, None))
+
+        assert await WordsCRUD(db).save_word('word', 1, user_state) is False
+
+    async def test_bot_reports_already_saved(self):
+        bot = TelegramBot.__new__(TelegramBot)
+        bot.services = SimpleNamespace(word_crud=SimpleNamespace(save_word=AsyncMock(return_value=False)))
+        bot.send_message = AsyncMock()
+        user = SimpleNamespace(last_word='word')
+
+        result = await bot.save_word(chat_id=1, user_state=user)
+
+        assert result == {'details': 'word word already exists'}
+        bot.send_message.assert_awaited_once_with('This word is already on the list', 1, user)
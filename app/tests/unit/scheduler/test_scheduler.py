@@ -0,0 +1,139 @@
+import subprocess
+import sys
+import numpy as np
+import pytest
+from app.bot.spaced_review import scheduler
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, Deck, forecast, schedule
+
+
+def one_by_one(quality: int, repetitions: int, interval: int) -> tuple[int, int]:
+    '''The scheduling of a card with the initial easiness, one word at a time.'''
+
+    if quality < 3:
+        return 0, 1
+    if quality == 3:
+        return repetitions, interval
+    repetitions += 1
+    if repetitions <= 3:
+        return repetitions, (1, 5, 10)[repetitions - 1]
+    return repetitions, int(interval * (2.5 if quality == 5 else 1.75))
+
+
+class TestSchedule:
+
+    def test_matches_the_word_by_word_schedule(self):
+        rng = np.random.default_rng(0)
+        quality = rng.choice([0, 3, 4, 5], 1000)
+        deck = Deck.of(rng.integers(0, 8, 1000), rng.integers(1, 5000, 1000))
+
+        result = schedule(quality, deck)
+
+        expected = [one_by_one(*card) for card in zip(quality.tolist(), deck.repetitions.tolist(), deck.interval.tolist())]
+        assert list(zip(result.repetitions.tolist(), result.interval.tolist())) == expected
+
+    def test_easiness_follows_sm2_and_is_clamped(self):
+        deck = Deck.of([5] * 4, [100] * 4, [2.5, 2.5, 2.5, 1.35], [100.0] * 4)
+
+        result = schedule([5, 4, 3, 0], deck)
+
+        assert result.easiness == pytest.approx([2.6, 2.5, 2.36, DEFAULT_PARAMS.min_easiness])
+
+    def test_stability_keeps_the_fractions(self):
+        deck = Deck.of([4], [10])
+        for _ in range(3):
+            deck = schedule(4, deck)
+
+        assert deck.stability[0] == pytest.approx(10 * 1.75 ** 3)
+        assert deck.interval[0] == int(10 * 1.75 ** 3)
+
+    def test_lapse_starts_over(self):
+        result = schedule(0, Deck.of([6], [900], [2.0], [900.0]))
+
+        assert (result.repetitions[0], result.interval[0], result.stability[0]) == (0, 1, 1.0)
+
+    def test_input_is_not_changed(self):
+        deck = Deck.of([4, 0], [10, 1])
+
+        schedule([5, 0], deck)
+
+        assert deck.repetitions.tolist() == [4, 0] and deck.stability.tolist() == [10.0, 1.0]
+
+
+class TestForecast:
+
+    def test_cards_as_they_are_due(self):
+        deck = Deck.of([0] * 4, [1] * 4)
+
+        counts = forecast([-30, 10, 60 * 25, 60 * 24 * 3], deck, days=2, bucket='day', quality=None)
+
+        assert counts.tolist() == [2, 1]
+
+    def test_reviews_come_back(self):
+        # a new card answered 'easy' every time: due at 0, 1, 6, 16, 33, 63, 116, 209, ... minutes
+        counts = forecast([0], Deck.of([0], [1]), days=1, bucket='hour', quality=4)
+
+        assert counts[:4].tolist() == [5, 2, 0, 1]
+        assert counts.sum() == 11
+
+    def test_params_per_card(self):
+        deck = Deck.of([3, 3], [10, 10], [2.5, 2.5], [10.0, 10.0])
+        params = DEFAULT_PARAMS._replace(interval_factor=np.array([1.0, 0.25]))
+
+        counts = forecast([0, 0], deck, days=1, bucket='hour', quality=4, params=params)
+
+        for card, factor in enumerate((1.0, 0.25)):
+            alone = forecast([0], Deck(*(column[[card]] for column in deck)), days=1, bucket='hour', quality=4,
+                             params=DEFAULT_PARAMS._replace(interval_factor=factor))
+            counts = counts - alone
+        assert not counts.any()
+
+    def test_empty_deck(self):
+        counts = forecast([], Deck.of([], []), days=3, bucket='hour')
+
+        assert counts.tolist() == [0] * 72
+
+
+@pytest.mark.asyncio
+async def test_due_forecast_reads_both_directions(monkeypatch):
+    async def get_schedule_columns(self, model, now, due_before, chat_id, limit=None):
+        assert chat_id == 5
+        return [(-5.0, 0, 1, 2.5, 1.0, None, None), (60 * 30, 4, 100, 2.5, 100.0, None, None)][:limit]
+
+    monkeypatch.setattr(scheduler.WordsCRUD, 'get_schedule_columns', get_schedule_columns)
+
+    result = await scheduler.due_forecast(db=None, chat_id=5, days=2, quality=None)
+
+    assert result['cards'] == 4 and not result['truncated']
+    assert [bucket['due'] for bucket in result['buckets']] == [2, 2]
+
+    capped = await scheduler.due_forecast(db=None, chat_id=5, days=2, quality=None, max_cards=1)
+
+    assert capped['cards'] == 2 and capped['truncated']
+
+
+@pytest.mark.asyncio
+async def test_due_forecast_of_all_chats_uses_their_fitted_params(monkeypatch):
+    reads = []
+
+    async def get_schedule_columns(self, model, now, due_before, chat_id, limit=None):
+        reads.append(chat_id)
+        # two cards 'easy' for the third time, one of a chat fitted to review four times as often
+        return [(0.0, 3, 10, 2.5, 10.0, None, None), (0.0, 3, 10, 2.5, 10.0, 0.75, 0.25)]
+
+    monkeypatch.setattr(scheduler.WordsCRUD, 'get_schedule_columns', get_schedule_columns)
+
+    result = await scheduler.due_forecast(db=None, chat_id=None, days=1, bucket='hour', quality=4)
+
+    assert reads == [None, None] and result['cards'] == 4
+    deck = Deck.of([3], [10], [2.5], [10.0])
+    default = forecast([0.0], deck, days=1, bucket='hour', quality=4)
+    fitted = forecast([0.0], deck, days=1, bucket='hour', quality=4,
+                      params=DEFAULT_PARAMS._replace(interval_factor=0.25))
+    assert fitted.sum() > default.sum()
+    assert [bucket['due'] for bucket in result['buckets']] == (2 * (default + fitted)).tolist()
+
+
+def test_review_does_not_import_numpy():
+    code = 'import sys, app.bot.spaced_review.review; assert "numpy" not in sys.modules'
+
+    subprocess.run([sys.executable, '-c', code], check=True)
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.task_supervisor import TaskSupervisor
+
+
+@pytest.mark.asyncio
+class TestTaskSupervisor:
+
+    async def test_concurrency_is_limited_per_kind(self):
+        supervisor = TaskSupervisor({'pdf': 2})
+        release = asyncio.Event()
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            peak = max(peak, supervisor.running['pdf'])
+            await release.wait()
+
+        for _ in range(5):
+            supervisor.spawn('pdf', job())
+        await asyncio.sleep(0.01)
+
+        stats = supervisor.stats()['kinds']['pdf']
+        assert stats['running'] == 2
+        assert stats['queued'] == 3
+
+        release.set()
+        await supervisor.shutdown(timeout=1)
+
+        assert peak == 2
+        assert supervisor.stats()['kinds']['pdf']['completed'] == 5
+
+    async def test_exceptions_are_captured(self):
+        supervisor = TaskSupervisor()
+
+        async def broken():
+            raise ValueError('boom')
+
+        task = supervisor.spawn('explain', broken())
+        await task
+
+        stats = supervisor.stats()['kinds']['explain']
+        assert stats['failed'] == 1
+        assert 'boom' in stats['last_error']
+
+    async def test_tasks_are_referenced_until_done(self):
+        supervisor = TaskSupervisor()
+        release = asyncio.Event()
+
+        task = supervisor.spawn('youtube', release.wait())
+        assert task in supervisor.tasks
+
+        release.set()
+        await task
+        assert task not in supervisor.tasks
+
+    async def test_shutdown_cancels_unfinished_tasks(self):
+        supervisor = TaskSupervisor({'pronunciation': 1})
+
+        supervisor.spawn('pronunciation', asyncio.sleep(10))
+        supervisor.spawn('pronunciation', asyncio.sleep(10))
+        await asyncio.sleep(0)
+
+        await supervisor.shutdown(timeout=0.01)
+
+        stats = supervisor.stats()
+        assert stats['active'] == 0
+        assert stats['kinds']['pronunciation']['cancelled'] == 2
+        assert stats['kinds']['pronunciation']['queued'] == 0
+        assert supervisor.spawn('pronunciation', asyncio.sleep(0)) is None
+
+    async def test_task_cancelled_before_it_starts(self):
+        supervisor = TaskSupervisor()
+
+        async def job():
+            return 1
+
+        coro = job()
+        task = supervisor.spawn('review_page', coro)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        stats = supervisor.stats()['kinds']['review_page']
+        assert (stats['queued'], stats['cancelled'], stats['started']) == (0, 1, 0)
+        assert coro.cr_frame is None
+        assert supervisor.tasks == set()
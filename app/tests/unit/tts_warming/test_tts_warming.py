@@ -0,0 +1,67 @@
+import time
+import httpx
+import pytest
+from app.bot.pronunciation import Pronunciation
+
+MP3 = b'ID3' + b'\x00' * 997
+
+
+@pytest.fixture
+def voice_store(monkeypatch):
+    tts = {}
+    synthesized = []
+
+    monkeypatch.setattr('app.bot.pronunciation.redis_get_voice_file_id', lambda word, lang, voice: None)
+    monkeypatch.setattr('app.bot.pronunciation.redis_set_voice_file_id', lambda *args, **kwargs: None)
+    monkeypatch.setattr('app.bot.pronunciation.redis_get_hash',
+                        lambda chat_id, word, lang, field: tts.get((word, lang)))
+    monkeypatch.setattr('app.bot.pronunciation.redis_set_hash',
+                        lambda chat_id, word, lang, field, data: tts.__setitem__((word, lang), data))
+
+    def synthesize(self, tmp_path, word, lang):
+        time.sleep(0.05)
+        synthesized.append(word)
+        with open(tmp_path, 'wb') as f:
+            f.write(MP3)
+
+    monkeypatch.setattr(Pronunciation, 'synthesize', synthesize)
+    return tts, synthesized
+
+
+@pytest.fixture
+def client():
+    def handler(request):
+        return httpx.Response(200, json={'ok': True, 'result': {'voice': {'file_id': 'voice-1'}}})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+class TestTTSWarming:
+
+    async def test_one_synthesis_per_word(self, voice_store, client):
+        tts, synthesized = voice_store
+        pronunciation = Pronunciation(client)
+
+        first = pronunciation.warm(1, 'hello', 'en')
+        assert pronunciation.warm(1, 'hello', 'en') is first
+        assert pronunciation.warm(1, '', 'en') is None
+        await first
+
+        assert tts[('hello', 'en')] == MP3
+        assert synthesized == ['hello']
+        assert pronunciation.warming == {}
+        assert pronunciation.supervisor.stats()['kinds']['tts_warm']['completed'] == 1
+
+    async def test_send_voice_waits_for_warming_instead_of_polling(self, voice_store, client):
+        tts, synthesized = voice_store
+        pronunciation = Pronunciation(client)
+
+        start = time.monotonic()
+        pronunciation.warm(1, 'hello', 'en')
+        await pronunciation.send_voice(chat_id=1, word='hello', lang='en', reply_to=10, user_state=None)
+
+        # polling would add at least one 0.2 s step on top of the synthesis
+        assert time.monotonic() - start < 0.2
+        stats = pronunciation.voice_cache_stats()
+        assert stats['uploads'] == 1 and stats['warm_waits'] == 1
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from app.data.unit_of_work import after_commit, unit_of_work, commit_or_defer
+from app.telegram_utils.utils import update_bd, update_state_to_await
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.refreshes = 0
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def add_all(self, objs):
+        self.added.extend(objs)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def refresh(self, obj):
+        self.refreshes += 1
+
+
+class State:
+    state = ''
+
+
+@pytest.mark.asyncio
+class TestUnitOfWork:
+
+    async def test_state_changes_are_committed_once(self):
+        db = FakeSession()
+        user = State()
+
+        async with unit_of_work(db):
+            await update_state_to_await(user, db)
+            user.state = 'ready'
+            await update_bd(user, db)
+            await update_bd([user, State()], db)
+            assert db.commits == 0
+
+        assert db.commits == 1
+        assert db.refreshes == 0
+        assert len(db.added) == 4
+
+    async def test_commits_directly_without_a_unit_of_work(self):
+        db = FakeSession()
+
+        await update_bd(State(), db)
+        await update_bd(State(), db)
+
+        assert db.commits == 2
+        assert db.refreshes == 0
+
+    async def test_nothing_to_commit(self):
+        db = FakeSession()
+
+        async with unit_of_work(db):
+            pass
+
+        assert db.commits == 0
+
+    async def test_rolls_back_on_error(self):
+        db = FakeSession()
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(db):
+                await update_bd(State(), db)
+                raise RuntimeError('handler failed')
+
+        assert db.commits == 0
+        assert db.rollbacks == 1
+
+    async def test_other_sessions_are_not_deferred(self):
+        db, other = FakeSession(), FakeSession()
+
+        async with unit_of_work(db):
+            assert await commit_or_defer(other) is False
+
+        assert other.commits == 1
+        assert db.commits == 0
+
+    async def test_task_outliving_the_unit_commits_itself(self):
+        db = FakeSession()
+        release = asyncio.Event()
+
+        async def background():
+            await release.wait()
+            return await commit_or_defer(db)
+
+        async with unit_of_work(db):
+            task = asyncio.create_task(background())
+            await update_bd(State(), db)
+
+        assert db.commits == 1
+        release.set()
+        assert await task is False
+        assert db.commits == 2
+
+    async def test_hooks_run_after_the_commit(self):
+        db = FakeSession()
+        calls = []
+
+        async def hook(name):
+            calls.append((name, db.commits))
+
+        async with unit_of_work(db):
+            await update_bd(State(), db)
+            await after_commit(db, hook, 'async')
+            await after_commit(db, calls.append, ('sync', db.commits))
+            assert calls == []
+
+        assert calls == [('async', 1), ('sync', 0)]
+
+    async def test_hooks_are_dropped_on_rollback(self):
+        db = FakeSession()
+        calls = []
+
+        with pytest.raises(RuntimeError):
+            async with unit_of_work(db):
+                await update_bd(State(), db)
+                await after_commit(db, calls.append, 'hook')
+                raise RuntimeError('handler failed')
+
+        assert calls == []
+
+    async def test_hook_runs_right_away_without_a_unit_of_work(self):
+        calls = []
+
+        await after_commit(FakeSession(), calls.append, 'hook')
+
+        assert calls == ['hook']
+
+    async def test_failed_hook_does_not_fail_the_update(self):
+        db = FakeSession()
+        calls = []
+
+        def broken():
+            raise ConnectionError('redis is down')
+
+        async with unit_of_work(db):
+            await update_bd(State(), db)
+            await after_commit(db, broken)
+            await after_commit(db, calls.append, 'next')
+
+        assert db.commits == 1 and calls == ['next']
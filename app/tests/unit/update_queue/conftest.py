@@ -0,0 +1,12 @@
+import pytest
+from app.schemas.request_schemas import Update
+
+
+@pytest.fixture
+def make_update():
+    def factory(update_id: int, chat_id: int = 999, text: str = 'hello') -> Update:
+        return Update.model_validate({
+            'update_id': update_id,
+            'message': {'message_id': update_id, 'chat': {'id': chat_id}, 'text': text},
+        })
+    return factory
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from app.web.chat_scheduler import ChatScheduler
+from app.web.update_queue import UpdateQueue
+
+
+@pytest.mark.asyncio
+class TestChatScheduler:
+
+    async def test_jobs_of_one_chat_run_in_order(self):
+        scheduler = ChatScheduler(max_concurrency=8)
+        handled = []
+
+        def job(n):
+            async def run():
+                # later jobs finish faster, so a parallel run would reorder them
+                await asyncio.sleep((5 - n) * 0.002)
+                handled.append(n)
+            return run
+
+        futures = [await scheduler.submit(1, job(n)) for n in range(5)]
+        await asyncio.gather(*futures)
+
+        assert handled == [0, 1, 2, 3, 4]
+
+    async def test_different_chats_run_in_parallel(self):
+        scheduler = ChatScheduler(max_concurrency=8)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def blocking():
+            started.set()
+            await release.wait()
+
+        async def quick():
+            return 'done'
+
+        blocked = await scheduler.submit(1, blocking)
+        await started.wait()
+
+        assert await asyncio.wait_for(scheduler.run(2, quick), 1) == 'done'
+        release.set()
+        await blocked
+
+    async def test_idle_mailboxes_are_evicted(self):
+        scheduler = ChatScheduler()
+
+        async def job():
+            return None
+
+        for chat_id in range(100):
+            await scheduler.run(chat_id, job)
+        await scheduler.drain(timeout=1)
+
+        stats = scheduler.stats()
+        assert stats['mailboxes'] == 0
+        assert stats['completed'] == 100
+
+    async def test_run_raises_job_exception(self):
+        scheduler = ChatScheduler()
+
+        async def broken():
+            raise ValueError('boom')
+
+        async def fine():
+            return 42
+
+        with pytest.raises(ValueError):
+            await scheduler.run(1, broken)
+        assert await scheduler.run(1, fine) == 42
+        assert scheduler.stats()['failed'] == 1
+
+    async def test_queue_keeps_per_chat_order(self, make_update):
+        handled = {1: [], 2: []}
+
+        async def handler(update):
+            await asyncio.sleep(0.001 * (update.update_id % 3))
+            handled[update.message.chat.id].append(update.update_id)
+
+        queue = UpdateQueue(handler, maxsize=100, workers=4, scheduler=ChatScheduler(max_concurrency=4),
+                            chat_id_of=lambda update: update.message.chat.id)
+        queue.start()
+
+        for i in range(20):
+            assert queue.put(make_update(i, chat_id=1 + i % 2))
+
+        await queue.drain(timeout=2)
+
+        assert handled[1] == list(range(0, 20, 2))
+        assert handled[2] == list(range(1, 20, 2))
+        assert queue.stats()['processed'] == 20
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from app.web.update_queue import UpdateQueue
+
+
+@pytest.mark.asyncio
+class TestUpdateQueue:
+
+    async def test_updates_are_processed_by_workers(self, make_update):
+        handled = []
+
+        async def handler(update):
+            handled.append(update.update_id)
+
+        queue = UpdateQueue(handler, maxsize=10, workers=2)
+        queue.start()
+
+        for i in range(5):
+            assert queue.put(make_update(i)) is True
+
+        await queue.drain(timeout=1)
+
+        assert sorted(handled) == [0, 1, 2, 3, 4]
+        assert queue.stats()['processed'] == 5
+
+    async def test_full_queue_rejects_updates(self, make_update):
+        release = asyncio.Event()
+
+        async def handler(update):
+            await release.wait()
+
+        queue = UpdateQueue(handler, maxsize=1, workers=1)
+        queue.start()
+
+        assert queue.put(make_update(1)) is True
+        await asyncio.sleep(0)
+        assert queue.put(make_update(2)) is True
+        assert queue.put(make_update(3)) is False
+        assert queue.stats()['rejected'] == 1
+
+        release.set()
+        await queue.drain(timeout=1)
+
+    async def test_failed_handler_does_not_stop_worker(self, make_update):
+        async def handler(update):
+            if update.update_id == 1:
+                raise RuntimeError('boom')
+
+        queue = UpdateQueue(handler, maxsize=10, workers=1)
+        queue.start()
+        queue.put(make_update(1))
+        queue.put(make_update(2))
+
+        await queue.drain(timeout=1)
+
+        stats = queue.stats()
+        assert stats['failed'] == 1
+        assert stats['processed'] == 1
+
+    async def test_draining_queue_rejects_new_updates(self, make_update):
+        async def handler(update):
+            pass
+
+        queue = UpdateQueue(handler)
+        queue.start()
+        await queue.drain(timeout=1)
+
+        assert queue.put(make_update(1)) is False
@@ -0,0 +1,235 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from app.data.class_base import Base
+from app.data.models import User
+from app.data.cache import user_state_cache as cache_module
+from app.data.cache.user_state_cache import UserStateCache, attach_user, install_write_through, user_state
+
+
+class SharedStore:
+    '''Redis stand-in shared by the caches of several workers.'''
+
+    def __init__(self):
+        self.data = {}
+        self.caches = []
+
+    async def load(self, chat_id):
+        return self.data.get(chat_id)
+
+    async def store(self, chat_id, fields, ttl, only_new):
+        if not only_new or chat_id not in self.data:
+            self.data[chat_id] = dict(fields)
+
+    async def delete(self, chat_id):
+        self.data.pop(chat_id, None)
+
+    async def publish(self, chat_id, origin):
+        for cache in self.caches:
+            cache.on_message(chat_id, origin)
+
+    def worker(self, **kwargs) -> UserStateCache:
+        cache = UserStateCache(load=self.load, store=self.store, delete=self.delete, publish=self.publish, **kwargs)
+        self.caches.append(cache)
+        return cache
+
+
+def fields(chat_id=1, **changes):
+    row = {'id': chat_id, 'chat_id': chat_id, 'state': 'ready', 'native_lang': 'ru', 'lang_code': 'en',
+           'last_word': '', 'last_translate': ''}
+    row.update(changes)
+    return row
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(**fields()))
+        db.commit()
+    return engine
+
+
+@pytest.mark.asyncio
+class TestUserStateCache:
+
+    async def test_local_then_shared_then_database(self):
+        store = SharedStore()
+        cache = store.worker()
+
+        assert await cache.get(1) is None
+        store.data[1] = fields()
+        assert (await cache.get(1))['state'] == 'ready'
+        assert (await cache.get(1))['state'] == 'ready'
+
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['shared_hits'] == 1
+        assert cache.stats()['local_hits'] == 1
+
+    async def test_returns_copies(self):
+        cache = UserStateCache()
+        await cache.put(fields())
+
+        copy = await cache.get(1)
+        copy['state'] = 'changed'
+
+        assert (await cache.get(1))['state'] == 'ready'
+
+    async def test_local_copies_expire(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+        cache = UserStateCache(ttl=5.0)
+        await cache.put(fields())
+
+        now[0] += 6
+        assert await cache.get(1) is None
+
+    async def test_lru_is_bounded(self):
+        cache = UserStateCache(maxsize=2)
+        for chat_id in (1, 2, 3):
+            await cache.put(fields(chat_id))
+
+        assert list(cache.local) == [2, 3]
+
+    async def test_commit_invalidates_other_workers(self):
+        store = SharedStore()
+        first, second = store.worker(), store.worker()
+        await first.put(fields())
+        assert (await second.get(1))['state'] == 'ready'
+
+        await first.put(fields(state='await_response'))
+
+        assert 1 not in second.local
+        assert (await second.get(1))['state'] == 'await_response'
+        assert first.stats()['invalidations'] == 0
+
+    async def test_a_read_never_replaces_a_newer_commit(self):
+        store = SharedStore()
+        first, second = store.worker(), store.worker()
+        await first.put(fields(state='await_response'))
+
+        await second.put(fields(state='ready'), committed=False)
+
+        assert store.data[1]['state'] == 'await_response'
+
+    async def test_shared_store_errors_fall_back_to_the_database(self):
+        async def broken(*args):
+            raise ConnectionError('redis is down')
+
+        cache = UserStateCache(load=broken, store=broken, publish=broken)
+
+        await cache.put(fields())
+        assert 1 not in cache.local
+        assert await cache.get(1) is None
+        assert cache.stats()['shared_errors'] == 2
+
+
+class TestWriteThrough:
+
+    def test_attached_user_is_updated_without_a_select(self, engine):
+        statements = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        with Session(engine) as db:
+            user = attach_user(db, fields())
+            assert attach_user(db, fields()) is user
+            user.state = 'await_response'
+            db.commit()
+
+        assert statements == ['UPDATE users SET state=? WHERE users.id = ?']
+
+    @pytest.mark.asyncio
+    async def test_commit_writes_the_new_state_through(self, engine):
+        store = SharedStore()
+        cache = store.worker()
+
+        class WorkerSession(Session):
+            pass
+
+        install_write_through(cache, WorkerSession)
+
+        with WorkerSession(engine) as db:
+            user = attach_user(db, fields())
+            user.last_word = 'word'
+            db.commit()
+
+            db.add(User(**fields(2)))
+            db.commit()
+
+        # the local copy at once, the shared store from the background writer
+        assert cache.local[1][1]['last_word'] == 'word'
+        assert cache.stats()['pending'] == 2 and store.data == {}
+        await cache.write_pending()
+
+        assert (await cache.get(1))['last_word'] == 'word'
+        assert store.data[2]['chat_id'] == 2
+        assert cache.stats()['pending'] == 0
+
+    @pytest.mark.asyncio
+    async def test_only_the_last_commit_of_a_chat_is_written(self, engine):
+        store = SharedStore()
+        cache = store.worker()
+        writes = []
+        store_one = cache.store
+
+        async def recording(chat_id, fields, ttl, only_new):
+            writes.append(fields['state'])
+            await store_one(chat_id, fields, ttl, only_new)
+
+        cache.store = recording
+
+        class WorkerSession(Session):
+            pass
+
+        install_write_through(cache, WorkerSession)
+
+        with WorkerSession(engine) as db:
+            user = attach_user(db, fields())
+            for state in ('await_response', 'await_rating', 'ready'):
+                user.state = state
+                db.commit()
+
+        await cache.write_pending()
+        assert writes == ['ready']
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_changes_are_not_cached(self, engine):
+        cache = UserStateCache()
+
+        class WorkerSession(Session):
+            pass
+
+        install_write_through(cache, WorkerSession)
+
+        with WorkerSession(engine) as db:
+            user = attach_user(db, fields())
+            user.state = 'await_response'
+            db.flush()
+            db.rollback()
+            db.commit()
+
+        assert await cache.get(1) is None
+
+    def test_uninstalled_cache_sees_no_commits(self, engine):
+        cache = UserStateCache()
+
+        class WorkerSession(Session):
+            pass
+
+        uninstall = install_write_through(cache, WorkerSession)
+        assert cache.installed
+        uninstall()
+
+        with WorkerSession(engine) as db:
+            attach_user(db, fields()).state = 'await_response'
+            db.commit()
+
+        assert not cache.installed and cache.local == {} and cache.pending == {}
+
+    def test_state_needs_every_column(self, engine):
+        with Session(engine) as db:
+            user = db.get(User, 1)
+            assert user_state(user)['chat_id'] == 1
+            db.expire(user, ['state'])
+            assert user_state(user) is None
@@ -0,0 +1,95 @@
+import json
+import httpx
+import pytest
+from app.bot.pronunciation import Pronunciation
+
+MP3 = b'ID3' + b'\x00' * 997
+
+
+@pytest.fixture
+def voice_store(monkeypatch):
+    file_ids = {}
+    tts = {}
+
+    monkeypatch.setattr('app.bot.pronunciation.redis_get_voice_file_id',
+                        lambda word, lang, voice: file_ids.get((word, lang)))
+    monkeypatch.setattr('app.bot.pronunciation.redis_set_voice_file_id',
+                        lambda word, lang, voice, file_id, size, ttl: file_ids.__setitem__((word, lang), (file_id, size)))
+    monkeypatch.setattr('app.bot.pronunciation.redis_delete_voice_file_id',
+                        lambda word, lang, voice: file_ids.pop((word, lang), None))
+    monkeypatch.setattr('app.bot.pronunciation.redis_get_hash',
+                        lambda chat_id, word, lang, field: tts.get((word, lang)))
+    return file_ids, tts
+
+
+@pytest.fixture
+def telegram():
+    calls = []
+    valid_ids = {'voice-1'}
+
+    def handler(request):
+        if request.headers['content-type'].startswith('multipart/form-data'):
+            calls.append('upload')
+            return httpx.Response(200, json={'ok': True, 'result': {'voice': {'file_id': 'voice-1'}}})
+
+        file_id = json.loads(request.content)['voice']
+        calls.append(file_id)
+        if file_id == 'flood':
+            return httpx.Response(429, json={'ok': False, 'error_code': 429,
+                                             'description': 'Too Many Requests: retry after 5'})
+        if file_id == 'orphan':
+            return httpx.Response(400, json={'ok': False, 'description': 'Bad Request: message to be replied not found'})
+        if file_id in valid_ids:
+            return httpx.Response(200, json={'ok': True, 'result': {'voice': {'file_id': file_id}}})
+        return httpx.Response(400, json={'ok': False, 'description': 'Bad Request: wrong file identifier'})
+
+    return calls, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+class TestVoiceFileIdCache:
+
+    async def test_second_send_reuses_file_id(self, voice_store, telegram):
+        file_ids, tts = voice_store
+        calls, client = telegram
+        tts[('hello', 'en')] = MP3
+        pronunciation = Pronunciation(client)
+
+        await pronunciation.send_voice(chat_id=1, word='hello', lang='en', reply_to=10, user_state=None)
+        await pronunciation.send_voice(chat_id=2, word='hello', lang='en', reply_to=11, user_state=None)
+
+        assert calls == ['upload', 'voice-1']
+        stats = pronunciation.voice_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['bytes_saved'] == len(MP3)
+
+    async def test_stale_file_id_falls_back_to_upload(self, voice_store, telegram):
+        file_ids, tts = voice_store
+        calls, client = telegram
+        file_ids[('hello', 'en')] = ('expired', len(MP3))
+        tts[('hello', 'en')] = MP3
+        pronunciation = Pronunciation(client)
+
+        await pronunciation.send_voice(chat_id=1, word='hello', lang='en', reply_to=10, user_state=None)
+
+        assert calls == ['expired', 'upload']
+        assert file_ids[('hello', 'en')] == ('voice-1', len(MP3))
+        assert pronunciation.voice_cache_stats()['stale'] == 1
+
+    @pytest.mark.parametrize('file_id', ['flood', 'orphan'])
+    async def test_other_failures_keep_file_id(self, voice_store, telegram, file_id):
+        file_ids, tts = voice_store
+        calls, client = telegram
+        file_ids[('hello', 'en')] = (file_id, len(MP3))
+        tts[('hello', 'en')] = MP3
+        pronunciation = Pronunciation(client)
+
+        result = await pronunciation.send_voice(chat_id=1, word='hello', lang='en', reply_to=10, user_state=None)
+
+        assert result == {'detail': 'failed to send voice message'}
+        assert calls == [file_id]
+        assert file_ids[('hello', 'en')] == (file_id, len(MP3))
+        stats = pronunciation.voice_cache_stats()
+        assert stats['stale'] == 0
+        assert stats['failed'] == 1
@@ -0,0 +1,66 @@
+import json
+import httpx
+import pytest
+from app.telegram_utils.utils import send_message
+from app.web.webhook_reply import webhook_reply_slot, claim_reply, flush_hook
+
+
+@pytest.fixture
+def telegram_client():
+    sent = []
+
+    def handler(request):
+        sent.append((request.url.path.rsplit('/', 1)[-1], json.loads(request.content)))
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': len(sent)}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.event_hooks['request'].append(flush_hook(client))
+    return sent, client
+
+
+class TestReplySlot:
+
+    def test_only_one_call_fits_into_the_slot(self):
+        with webhook_reply_slot() as reply:
+            assert claim_reply('sendMessage', {'chat_id': 1, 'text': 'a'}) is True
+            assert claim_reply('sendMessage', {'chat_id': 1, 'text': 'b'}) is False
+
+        assert reply.payload == {'method': 'sendMessage', 'chat_id': 1, 'text': 'a'}
+
+    def test_no_slot_outside_of_a_webhook(self):
+        assert claim_reply('sendMessage', {'chat_id': 1}) is False
+
+        with webhook_reply_slot() as reply:
+            pass
+        assert reply.open is False
+
+
+@pytest.mark.asyncio
+class TestInlineReply:
+
+    async def test_inline_message_is_not_sent(self, telegram_client):
+        sent, client = telegram_client
+
+        with webhook_reply_slot() as reply:
+            result = await send_message(1, 'Invalid command.', None, client, inline_reply=True)
+
+        assert result is None
+        assert sent == []
+        assert reply.payload['method'] == 'sendMessage'
+        assert reply.payload['text'] == 'Invalid command.'
+
+    async def test_later_call_flushes_the_stored_reply_first(self, telegram_client):
+        sent, client = telegram_client
+
+        with webhook_reply_slot() as reply:
+            await send_message(1, 'first', None, client, inline_reply=True)
+            await send_message(1, 'second', None, client)
+
+        assert [payload['text'] for _, payload in sent] == ['first', 'second']
+        assert reply.payload is None
+
+    async def test_without_slot_message_is_sent(self, telegram_client):
+        sent, client = telegram_client
+
+        assert await send_message(1, 'hi', None, client, inline_reply=True) == 1
+        assert sent[0][0] == 'sendMessage'
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class ChatScheduler:
+    '''Runs jobs of one chat strictly one after another (a mailbox per chat_id),
+    while jobs of different chats run in parallel.
+
+    A mailbox exists only while its chat has pending work, so memory is bounded by
+    the number of chats that are active right now, not by all chats ever seen.'''
+
+    def __init__(self, max_concurrency: int = 16, max_pending: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.mailboxes: dict[int, deque[tuple[Job, asyncio.Future]]] = {}
+        self.drainers: set[asyncio.Task] = set()
+        self._running = asyncio.Semaphore(max_concurrency)
+        self._pending = asyncio.Semaphore(max_pending)
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.peak_mailboxes = 0
+
+    async def submit(self, chat_id: int, job: Job) -> asyncio.Future:
+        '''Puts a job into the chat mailbox and returns a future with its result.
+        Waits only when max_pending jobs are already scheduled.'''
+
+        await self._pending.acquire()
+        future = asyncio.get_running_loop().create_future()
+
+        mailbox = self.mailboxes.get(chat_id)
+        if mailbox is None:
+            mailbox = self.mailboxes[chat_id] = deque()
+            self.peak_mailboxes = max(self.peak_mailboxes, len(self.mailboxes))
+            task = asyncio.create_task(self._drain(chat_id, mailbox), name=f'chat-mailbox-{chat_id}')
+            self.drainers.add(task)
+            task.add_done_callback(self.drainers.discard)
+
+        mailbox.append((job, future))
+        self.submitted += 1
+        return future
+
+    async def run(self, chat_id: int, job: Job) -> Any:
+        '''Schedules a job and waits for its result.'''
+
+        return await (await self.submit(chat_id, job))
+
+    async def _drain(self, chat_id: int, mailbox: deque):
+        try:
+            while mailbox:
+                job, future = mailbox.popleft()
+                try:
+                    async with self._running:
+                        self.running += 1
+                        try:
+                            result = await job()
+                        finally:
+                            self.running -= 1
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as e:
+                    self.failed += 1
+                    logger.exception('job for chat %s failed', chat_id)
+                    if not future.done():
+                        future.set_exception(e)
+                        # already logged, nobody has to await the future in fire-and-forget callers
+                        future.exception()
+                finally:
+                    self._pending.release()
+        finally:
+            self.mailboxes.pop(chat_id, None)
+
+    async def drain(self, timeout: float | None = None):
+        '''Waits until every mailbox is empty.'''
+
+        if self.drainers:
+            await asyncio.wait(set(self.drainers), timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            'mailboxes': len(self.mailboxes),
+            'peak_mailboxes': self.peak_mailboxes,
+            'pending': sum(len(mailbox) for mailbox in self.mailboxes.values()),
+            'running': self.running,
+            'max_concurrency': self.max_concurrency,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
@@ -7,7 +7,7 @@ from fastapi.responses import JSONResponse
 from app.telegram_utils.start_funcs import StartFuncs
 from app.telegram_utils.utils import raise_invalid_command
 from httpx import AsyncClient
-import asyncio
+from app.rate_limiter import outbound_priority, Priority
 
 class CommandDispatcher:
     '''A class that implements the processing of commands received from the user.'''
@@ -15,6 +15,7 @@ class CommandDispatcher:
     def __init__(self, bot: TelegramBot, services: Services, user_crud: UserCRUD, client: AsyncClient):
         self.bot = bot
         self.review_obj = services.review_obj
+        self.supervisor = services.supervisor
         self.user_crud = user_crud
         self.client = client
         self.commands = {
@@ -66,7 +67,8 @@ class CommandDispatcher:
 
     async def handle_words_list(self, user_states: User, chat_id: int, text: str, client: AsyncClient, db: AsyncSession, msg_id: int):
         await update_state_to_await(user_states, db)
-        asyncio.create_task(self.bot.send_words_list(chat_id=chat_id, user_state=user_states))
+        with outbound_priority(Priority.BACKGROUND):
+            self.supervisor.spawn('pdf', self.bot.detached(TelegramBot.send_words_list, user_states, chat_id=chat_id))
         return JSONResponse(
             {
                 'success': True, 'details': 'words_list has been successfully sent'
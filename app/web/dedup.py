@@ -0,0 +1,76 @@
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    '''Drops Telegram updates whose update_id has already been seen.
+
+    A bounded LRU catches retries that reach the same process, an optional shared
+    claim (Redis SET NX with a TTL) catches retries that land on another worker.
+    If the shared store is unavailable the local answer is used.'''
+
+    def __init__(self, maxsize: int = 10000, ttl: int = 86400,
+                 claim: Callable[[int, int], Awaitable[bool]] | None = None,
+                 release: Callable[[int], Awaitable[None]] | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.claim = claim
+        self.release = release
+        self.seen: OrderedDict[int, None] = OrderedDict()
+
+        self.accepted = 0
+        self.duplicates = 0
+        self.shared_duplicates = 0
+        self.shared_errors = 0
+
+    async def check(self, update_id: int) -> bool:
+        '''Returns True the first time an update_id is seen and False for every repeat.'''
+
+        if update_id in self.seen:
+            self.seen.move_to_end(update_id)
+            self.duplicates += 1
+            logger.info('duplicate update %s dropped', update_id)
+            return False
+
+        self.seen[update_id] = None
+        if len(self.seen) > self.maxsize:
+            self.seen.popitem(last=False)
+
+        if self.claim is not None:
+            try:
+                if not await self.claim(update_id, self.ttl):
+                    self.duplicates += 1
+                    self.shared_duplicates += 1
+                    logger.info('duplicate update %s dropped, claimed by another worker', update_id)
+                    return False
+            except Exception:
+                self.shared_errors += 1
+                logger.exception('could not claim update %s, relying on the local cache', update_id)
+
+        self.accepted += 1
+        return True
+
+    async def forget(self, update_id: int):
+        '''Lets a failed update be processed again when Telegram retries it.'''
+
+        self.seen.pop(update_id, None)
+        if self.release is not None:
+            try:
+                await self.release(update_id)
+            except Exception:
+                self.shared_errors += 1
+                logger.exception('could not release update %s', update_id)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self.seen),
+            'maxsize': self.maxsize,
+            'shared': self.claim is not None,
+            'accepted': self.accepted,
+            'duplicates': self.duplicates,
+            'shared_duplicates': self.shared_duplicates,
+            'shared_errors': self.shared_errors,
+        }
@@ -0,0 +1,79 @@
+from typing import Literal
+from fastapi import APIRouter, Query, status
+from app.dependencies import container_dep, session_dep
+from app.bot.spaced_review.scheduler import due_forecast
+from app.web.webhook_reply import replies
+from app.data.unit_of_work import stats as unit_of_work_stats
+from app.data.config import settings
+
+metrics_router = APIRouter(prefix='/metrics', tags=['Metrics'])
+
+@metrics_router.get('/http', status_code=status.HTTP_200_OK)
+async def http_pool_metrics(container: container_dep):
+    return container.http_pool.stats()
+
+@metrics_router.get('/updates', status_code=status.HTTP_200_OK)
+async def update_queue_metrics(container: container_dep):
+    if container.update_queue is None:
+        return {'mode': 'inline'}
+    return {'mode': 'queue', **container.update_queue.stats()}
+
+@metrics_router.get('/chats', status_code=status.HTTP_200_OK)
+async def chat_scheduler_metrics(container: container_dep):
+    return container.chat_scheduler.stats()
+
+@metrics_router.get('/dedup', status_code=status.HTTP_200_OK)
+async def dedup_metrics(container: container_dep):
+    return container.dedup.stats()
+
+@metrics_router.get('/tasks', status_code=status.HTTP_200_OK)
+async def task_supervisor_metrics(container: container_dep):
+    return container.supervisor.stats()
+
+@metrics_router.get('/rate_limit', status_code=status.HTTP_200_OK)
+async def rate_limit_metrics(container: container_dep):
+    limiter = container.http_pool.rate_limiter
+    if limiter is None:
+        return {'enabled': False}
+    return {'enabled': True, **limiter.stats()}
+
+@metrics_router.get('/chat_actions', status_code=status.HTTP_200_OK)
+async def chat_action_metrics(container: container_dep):
+    return container.chat_actions.stats()
+
+@metrics_router.get('/voice', status_code=status.HTTP_200_OK)
+async def voice_cache_metrics(container: container_dep):
+    return container.pronunciation_obj.voice_cache_stats()
+
+@metrics_router.get('/webhook_replies', status_code=status.HTTP_200_OK)
+async def webhook_reply_metrics():
+    return replies
+
+@metrics_router.get('/unit_of_work', status_code=status.HTTP_200_OK)
+async def unit_of_work_metrics():
+    return unit_of_work_stats
+
+@metrics_router.get('/user_state', status_code=status.HTTP_200_OK)
+async def user_state_cache_metrics(container: container_dep):
+    return container.user_state_cache.stats()
+
+@metrics_router.get('/chat_state', status_code=status.HTTP_200_OK)
+async def chat_state_metrics(container: container_dep):
+    return container.chat_state_store.stats()
+
+@metrics_router.get('/review_buffer', status_code=status.HTTP_200_OK)
+async def review_buffer_metrics(container: container_dep):
+    return container.review_buffer.stats()
+
+@metrics_router.get('/review_pages', status_code=status.HTTP_200_OK)
+async def review_pages_metrics(container: container_dep):
+    return container.review_pager.stats()
+
+@metrics_router.get('/review_latency', status_code=status.HTTP_200_OK)
+async def review_latency_metrics(container: container_dep):
+    return container.review_latency.stats()
+
+@metrics_router.get('/review_forecast', status_code=status.HTTP_200_OK)
+async def review_forecast(db: session_dep, chat_id: int, days: int = Query(7, ge=1, le=365),
+                          bucket: Literal['hour', 'day'] = 'day', quality: int | None = Query(4, ge=0, le=5)):
+    return await due_forecast(db, chat_id, days, bucket, quality, max_cards=settings.REVIEW_FORECAST_MAX_CARDS)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable
+import httpx
+from pydantic import ValidationError
+from app.schemas.request_schemas import Update
+from app.web.chat_scheduler import ChatScheduler
+from app.web.dedup import UpdateDeduplicator
+
+logger = logging.getLogger(__name__)
+
+
+class OffsetStore:
+    '''Keeps the next getUpdates offset in a file, so a restart does not refetch confirmed updates.'''
+
+    def __init__(self, path: str | None):
+        self.path = path
+
+    def load(self) -> int | None:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as file:
+                return int(file.read().strip())
+        except (OSError, ValueError):
+            logger.exception('could not read polling offset from %s', self.path)
+            return None
+
+    def save(self, offset: int):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            file.write(str(offset))
+        os.replace(tmp_path, self.path)
+
+
+class PollingRunner:
+    '''Long-polls getUpdates and processes every batch under per-chat ordering.
+
+    One HTTP round trip brings up to batch_size updates. Updates of different chats
+    in a batch run concurrently, the offset is advanced and persisted only after
+    the whole batch has been handled.'''
+
+    def __init__(self, client: httpx.AsyncClient, handler: Callable[[Update], Awaitable],
+                 scheduler: ChatScheduler, chat_id_of: Callable[[Update], int | None],
+                 get_updates_url: str, delete_webhook_url: str | None = None,
+                 dedup: UpdateDeduplicator | None = None, offset_store: OffsetStore | None = None,
+                 batch_size: int = 100, timeout: int = 30, retry_delay: float = 1.0):
+        self.client = client
+        self.handler = handler
+        self.scheduler = scheduler
+        self.chat_id_of = chat_id_of
+        self.get_updates_url = get_updates_url
+        self.delete_webhook_url = delete_webhook_url
+        self.dedup = dedup
+        self.offset_store = offset_store or OffsetStore(None)
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.offset: int | None = None
+        self.stopped = asyncio.Event()
+
+        self.batches = 0
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.errors = 0
+
+    async def get_updates(self) -> list[dict]:
+        params = {'limit': self.batch_size, 'timeout': self.timeout}
+        if self.offset is not None:
+            params['offset'] = self.offset
+
+        response = await self.client.get(self.get_updates_url, params=params, timeout=self.timeout + 10)
+        data = response.json()
+        if not data.get('ok'):
+            raise RuntimeError(f'getUpdates failed: {data}')
+        return data['result']
+
+    async def process_batch(self, raw_updates: list[dict]):
+        futures = []
+        for raw in raw_updates:
+            try:
+                update = Update.model_validate(raw)
+            except ValidationError:
+                logger.warning('skipping invalid update %s', raw.get('update_id'))
+                continue
+
+            if self.dedup is not None and not await self.dedup.check(update.update_id):
+                continue
+
+            chat_id = self.chat_id_of(update)
+            if chat_id is None:
+                futures.append(asyncio.ensure_future(self.handler(update)))
+            else:
+                futures.append(await self.scheduler.submit(chat_id, lambda update=update: self.handler(update)))
+
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, BaseException):
+                self.failed += 1
+                logger.error('failed to handle polled update: %r', result)
+            else:
+                self.processed += 1
+
+    async def poll_once(self) -> int:
+        '''Fetches and processes one batch, returns the number of updates in it.'''
+
+        fetch = asyncio.ensure_future(self.get_updates())
+        stop = asyncio.ensure_future(self.stopped.wait())
+        # a pending long poll must not delay shutdown by up to `timeout` seconds
+        await asyncio.wait({fetch, stop}, return_when=asyncio.FIRST_COMPLETED)
+        stop.cancel()
+        if not fetch.done():
+            fetch.cancel()
+            return 0
+
+        raw_updates = fetch.result()
+        if not raw_updates:
+            return 0
+
+        self.batches += 1
+        self.received += len(raw_updates)
+        await self.process_batch(raw_updates)
+
+        self.offset = max(raw['update_id'] for raw in raw_updates) + 1
+        self.offset_store.save(self.offset)
+        return len(raw_updates)
+
+    async def run(self):
+        if self.delete_webhook_url:
+            # getUpdates is refused while a webhook is set
+            await self.client.post(self.delete_webhook_url, data={'drop_pending_updates': 'false'})
+
+        self.offset = self.offset_store.load()
+        logger.info('polling started from offset %s', self.offset)
+
+        while not self.stopped.is_set():
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.exception('polling failed, retrying in %s seconds', self.retry_delay)
+                try:
+                    await asyncio.wait_for(self.stopped.wait(), self.retry_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+        logger.info('polling stopped at offset %s', self.offset)
+
+    def stop(self):
+        self.stopped.set()
+
+    def stats(self) -> dict:
+        return {
+            'offset': self.offset,
+            'batch_size': self.batch_size,
+            'batches': self.batches,
+            'received': self.received,
+            'processed': self.processed,
+            'failed': self.failed,
+            'errors': self.errors,
+            'avg_batch': round(self.received / self.batches, 2) if self.batches else 0.0,
+        }
@@ -50,7 +50,7 @@ class StateDispatcher:
         )
 
     async def handle_await_response(self, user_states: User, chat_id: int, text: str, db: AsyncSession, client: AsyncClient, msg_id: int):
-        await send_message(user_state=user_states, chat_id=chat_id, text='Please, wait for a response.', client=client, reply_to_message_id=msg_id)
+        await send_message(user_state=user_states, chat_id=chat_id, text='Please, wait for a response.', client=client, reply_to_message_id=msg_id, inline_reply=True)
         # await self.bot.send_message('Дождитесь ответа', chat_id, user_states)
         return JSONResponse(
             {
@@ -70,19 +70,7 @@ class StateDispatcher:
         if text != 'invalid command':
             await update_state_to_await(user_states, db)
 
-            task = asyncio.create_task(self.bot.explain_word(chat_id=chat_id, word=text, user_state=user_states, reply_to_id=msg_id))
-
-            def start_tasks(fut):
-                word = user_states.last_word
-                lang = user_states.lang_code
-
-                tts_task.delay(chat_id=chat_id, word=word, lang=lang)
-
-                empty_list = []
-
-                youtube_parsing_task.delay(chat_id=chat_id, word=word, lang_code=lang, seen_videos=empty_list)
-
-            task.add_done_callback(start_tasks)
+            self.bot.services.supervisor.spawn('explain', self.explain_and_prepare(user_states, chat_id, text, msg_id))
 
             return JSONResponse(
                 {
@@ -97,6 +85,27 @@ class StateDispatcher:
             }
         )
 
+    async def explain_and_prepare(self, user_states: User, chat_id: int, text: str, msg_id: int):
+        '''Explains the word, then queues pronunciation and video search for it.'''
+
+        error = None
+        user = user_states
+        try:
+            async with self.bot.own_session(user_states) as (bot, user):
+                await bot.explain_word(chat_id=chat_id, word=text, user_state=user, reply_to_id=msg_id)
+        except Exception as e:
+            error = e
+
+        word = user.last_word
+        lang = user.lang_code
+
+        # publishing to the broker is blocking I/O, keep it off the event loop
+        await asyncio.to_thread(tts_task.delay, chat_id=chat_id, word=word, lang=lang)
+        await asyncio.to_thread(youtube_parsing_task.delay, chat_id=chat_id, word=word, lang_code=lang, seen_videos=[])
+
+        if error is not None:
+            raise error
+
     async def handle_await_delete_word(self, user_states: User, chat_id: int, text: str, db: AsyncSession, client: AsyncClient, msg_id: int):
         user_states.state = 'ready'
         await update_bd(user_states, self.db)
@@ -0,0 +1,115 @@
+from app.schemas.request_schemas import Update
+from fastapi.responses import JSONResponse
+from app.bot.telegram_bot import TelegramBot, Services
+from app.data.user_crud import UserCRUD
+from app.data.db_init import async_session_factory
+from app.data.unit_of_work import unit_of_work
+from app.data.cache.chat_state import chat_state_store
+from app.web.command_dispatcher import CommandDispatcher
+from app.web.state_dispatcher import StateDispatcher
+from app.telegram_utils.utils import answer_callback
+from app.telegram_utils.utils import update_state_to_await, update_bd
+from sqlalchemy.ext.asyncio import AsyncSession
+from httpx import AsyncClient
+from app.rate_limiter import outbound_priority, Priority
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.container import ServiceContainer
+
+
+def update_chat_id(request: Update) -> int | None:
+    '''Returns the chat an update belongs to, if any.'''
+
+    msg_data = request.message or (request.callback_query.message if request.callback_query else None)
+    return msg_data.chat.id if msg_data else None
+
+
+async def handle_update(request: Update, db: AsyncSession, client: AsyncClient, container: 'ServiceContainer'):
+    '''Runs the bot logic for a single Telegram update. Its database changes are committed once,
+    then the conversation fields are saved to Redis.'''
+
+    async with unit_of_work(db):
+        result = await _handle_update(request, db, client, container)
+    await chat_state_store.save_all(db)
+    return result
+
+
+async def _handle_update(request: Update, db: AsyncSession, client: AsyncClient, container: 'ServiceContainer'):
+
+    user_crud = UserCRUD(db)
+    services = Services(db, client, container)
+    bot = TelegramBot(services)
+    command_dispatcher = CommandDispatcher(bot, services, user_crud, client)
+    state_dispatcher = StateDispatcher(bot, db)
+
+    message = request.message
+    callback = request.callback_query
+    msg_data = message or (callback.message if callback else None)
+
+    if not msg_data:
+        return {'success': False, 'details': 'no data'}
+
+    chat_id = msg_data.chat.id
+
+    msg_id = msg_data.message_id
+
+    user_states = await user_crud.check_exists(chat_id)
+
+    user_states.message_id = msg_id
+
+    if message:
+        text = message.text
+
+        if text in command_dispatcher.commands:
+            user_states.curr_command = text
+            await update_bd(user_states, db)
+            return await command_dispatcher.dispatch(text, user_states, chat_id, client, db, msg_id)
+        return await state_dispatcher.dispatch(text, user_states, chat_id, client, msg_id)
+
+    if callback:
+        data_value = callback.data
+
+        await answer_callback(callback.id, client)
+
+        if data_value == 'pronounce':
+
+            await update_state_to_await(user_states, db)
+
+            services.supervisor.spawn('pronunciation', bot.detached(TelegramBot.send_pronunciation, user_states,
+                                                                   chat_id=chat_id, reply_to_id=msg_id))
+            return JSONResponse(
+                {
+                    'success': True, 'details': 'pronunciation has been successfully sent'
+                }
+            )
+        elif data_value == 'youtube':
+
+            await update_state_to_await(user_states, db)
+
+            with outbound_priority(Priority.BACKGROUND):
+                services.supervisor.spawn('youtube', bot.detached(TelegramBot.send_youtube_video, user_states, chat_id=chat_id))
+            return JSONResponse(
+                {
+                    'success': True, 'details': 'youtube video has been successfully sent'
+                }
+            )
+        elif data_value.startswith('review:') and user_states.state == 'await_rating':
+
+            # the callback comes from the card message itself, ratings edit it in place
+            await bot.spaced_review(chat_id=chat_id, text=data_value.removeprefix('review:'),
+                                    user_state=user_states, client=client, reply_to_id=msg_id)
+            return JSONResponse(
+                {
+                    'success': True, 'details': 'review card has been updated'
+                }
+            )
+
+    return {'success': True}
+
+
+async def process_update(request: Update, container: 'ServiceContainer'):
+    '''Handles an update outside of a webhook request, with its own database session.'''
+
+    async with async_session_factory() as db:
+        return await handle_update(request, db, container.client, container)
@@ -0,0 +1,121 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Awaitable, Callable
+from app.schemas.request_schemas import Update
+from app.web.chat_scheduler import ChatScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    '''A bounded in-process queue of Telegram updates drained by a pool of workers.
+
+    The webhook only validates and enqueues an update, so its latency does not
+    depend on how long the handlers take. With a ChatScheduler a single dispatcher
+    moves updates into per-chat mailboxes in arrival order and the scheduler
+    limits how many of them run at once.'''
+
+    def __init__(self, handler: Callable[[Update], Awaitable], maxsize: int = 1000, workers: int = 16,
+                 scheduler: ChatScheduler | None = None, chat_id_of: Callable[[Update], int | None] | None = None):
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.scheduler = scheduler
+        self.chat_id_of = chat_id_of
+        self.queue: asyncio.Queue[tuple[Update, float]] = asyncio.Queue(maxsize=maxsize)
+        self.tasks: list[asyncio.Task] = []
+        self.accepting = False
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy = 0
+        self.high_watermark = 0
+        self.total_wait = 0.0
+
+    def start(self):
+        self.accepting = True
+        if self.scheduler is not None:
+            self.tasks = [asyncio.create_task(self._dispatcher(), name='update-dispatcher')]
+        else:
+            self.tasks = [asyncio.create_task(self._worker(n), name=f'update-worker-{n}') for n in range(self.workers)]
+        logger.info('update queue started with %i workers', self.workers)
+
+    def put(self, update: Update) -> bool:
+        '''Enqueues an update, returns False when the queue is full or draining.'''
+
+        if not self.accepting:
+            self.rejected += 1
+            return False
+
+        try:
+            self.queue.put_nowait((update, time.monotonic()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning('update queue is full, update %s rejected', update.update_id)
+            return False
+
+        self.enqueued += 1
+        self.high_watermark = max(self.high_watermark, self.queue.qsize())
+        return True
+
+    async def _handle(self, update: Update, enqueued_at: float):
+        self.total_wait += time.monotonic() - enqueued_at
+        self.busy += 1
+        try:
+            await self.handler(update)
+            self.processed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception('failed to handle update %s', update.update_id)
+        finally:
+            self.busy -= 1
+            self.queue.task_done()
+
+    async def _worker(self, number: int):
+        while True:
+            update, enqueued_at = await self.queue.get()
+            await self._handle(update, enqueued_at)
+
+    async def _dispatcher(self):
+        while True:
+            update, enqueued_at = await self.queue.get()
+            chat_id = self.chat_id_of(update) if self.chat_id_of else None
+            job = functools.partial(self._handle, update, enqueued_at)
+
+            if chat_id is None:
+                await job()
+            else:
+                await self.scheduler.submit(chat_id, job)
+
+    async def drain(self, timeout: float = 25.0):
+        '''Stops accepting updates and waits for the queued ones before cancelling the workers.'''
+
+        self.accepting = False
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error('update queue was not drained in %s seconds, %i updates dropped', timeout, self.queue.qsize())
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        logger.info('update queue stopped')
+
+    def stats(self) -> dict:
+        started = self.processed + self.failed + self.busy
+        return {
+            'depth': self.queue.qsize(),
+            'maxsize': self.maxsize,
+            'workers': self.workers,
+            'busy': self.busy,
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'high_watermark': self.high_watermark,
+            'avg_wait_ms': round(self.total_wait / started * 1000, 3) if started else 0.0,
+        }
@@ -1,15 +1,29 @@
-import requests
-from dotenv import load_dotenv
 import os
+import logging
+from dotenv import load_dotenv
+from httpx import AsyncClient
+from app.config import set_webhook_url, webhook_info_url
 
 load_dotenv()
 
-BOT_TOKEN = os.getenv('BOT_TOKEN')
-WEBHOOK_URL = 'https://edfdcaf7a8a2.ngrok-free.app/telegram/webhook'
+logger = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', 'https://edfdcaf7a8a2.ngrok-free.app/telegram/webhook')
+
 
-set_webhook_url = f'https://api.telegram.org/bot{BOT_TOKEN}/setWebhook'
+async def set_webhook(client: AsyncClient, url: str = WEBHOOK_URL) -> bool:
+    '''Registers the webhook, called from the application startup hooks.'''
 
-response = requests.post(set_webhook_url, data={'url': WEBHOOK_URL})
+    try:
+        response = await client.post(set_webhook_url, data={'url': url})
+        if not response.json().get('ok'):
+            logger.error('setWebhook failed: %s', response.json())
+            return False
 
+        info = await client.get(webhook_info_url)
+        logger.info('webhook info: %s', info.json())
+    except Exception:
+        logger.exception('could not register the webhook %s', url)
+        return False
 
-print(response.json())
+    return True
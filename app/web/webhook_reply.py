@@ -0,0 +1,68 @@
+import contextlib
+import logging
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator
+import httpx
+from app.config import BOT_TOKEN
+from app.data.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookReply:
+    '''One Bot API call that may be returned as the body of the webhook response.'''
+
+    def __init__(self):
+        self.payload: dict | None = None
+        self.open = True
+
+
+_reply: ContextVar[WebhookReply | None] = ContextVar('webhook_reply', default=None)
+
+replies = {'inline': 0, 'flushed': 0}
+
+
+@contextlib.contextmanager
+def webhook_reply_slot() -> Iterator[WebhookReply]:
+    '''Lets the handlers of one webhook request put their final call into the response.
+    The slot is closed when the request is done, later calls are sent as usual.'''
+
+    reply = WebhookReply()
+    token = _reply.set(reply)
+    try:
+        yield reply
+    finally:
+        reply.open = False
+        _reply.reset(token)
+        if reply.payload is not None:
+            replies['inline'] += 1
+
+
+def claim_reply(method: str, payload: dict) -> bool:
+    '''Stores the call in the open slot, returns False if it has to be sent as a request.'''
+
+    reply = _reply.get()
+    if reply is None or not reply.open or reply.payload is not None:
+        return False
+
+    reply.payload = {'method': method, **payload}
+    return True
+
+
+def flush_hook(client: httpx.AsyncClient) -> Callable[[httpx.Request], Awaitable[None]]:
+    '''A request hook that sends a stored reply before any other Bot API call,
+    so messages reach the chat in the order the handler produced them.'''
+
+    telegram_host = httpx.URL(settings.TELEGRAM_API_URL).host
+
+    async def flush(request: httpx.Request):
+        reply = _reply.get()
+        if reply is None or not reply.open or reply.payload is None or request.url.host != telegram_host:
+            return
+
+        payload, reply.payload = reply.payload, None
+        method = payload.pop('method')
+        replies['flushed'] += 1
+        await client.post(f'{settings.TELEGRAM_API_URL}/bot{BOT_TOKEN}/{method}', json=payload)
+
+    return flush
@@ -0,0 +1,89 @@
+'''Throughput of the per-message conversation writes: a row UPDATE in Postgres
+against a hash write in Redis.
+
+Every message used to write message_id and curr_command to the users row, and
+every review rating review_index and invalid_reply_count. This replays those
+writes for CHATS chats with CONCURRENCY updates in flight, once as
+UPDATE + COMMIT on a scratch copy of the old users table and once through
+ChatStateStore.
+
+Needs the Postgres and Redis from the app settings, the scratch table is dropped
+at the end.
+
+Run: python -m benchmarks.bench_chat_state
+'''
+import asyncio
+import itertools
+import time
+from sqlalchemy import text
+from app.data.db_init import get_async_engine, async_session_factory
+from app.data.cache.chat_state import ChatStateStore
+from app.data.cache.redis_crud import redis_get_chat_state, redis_set_chat_state
+from app.data.models import User
+
+CHATS = 1000
+UPDATES = 20_000
+CONCURRENCY = 32
+FIRST_CHAT = 9_000_000_000
+
+
+async def run(update) -> float:
+    counter = itertools.count()
+
+    async def worker():
+        while (n := next(counter)) < UPDATES:
+            await update(FIRST_CHAT + n % CHATS, n)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return UPDATES / (time.perf_counter() - start)
+
+
+async def postgres_update(chat_id: int, n: int):
+    async with async_session_factory() as db:
+        await db.execute(
+            text('UPDATE bench_users SET message_id = :message_id, curr_command = :command, '
+                 'review_index = :review_index WHERE chat_id = :chat_id'),
+            {'message_id': n, 'command': '/repeating', 'review_index': n % 20, 'chat_id': chat_id},
+        )
+        await db.commit()
+
+
+def redis_update(store: ChatStateStore):
+    async def update(chat_id: int, n: int):
+        user = await store.load(User(chat_id=chat_id))
+        user.message_id = n
+        user.curr_command = '/repeating'
+        user.review_index = n % 20
+        await store.save(user)
+
+    return update
+
+
+async def main():
+    engine = get_async_engine()
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.execute(text('DROP TABLE IF EXISTS bench_users'))
+        await conn.execute(text(
+            'CREATE TABLE bench_users (id serial PRIMARY KEY, chat_id bigint UNIQUE, state varchar, '
+            'review_index integer NOT NULL DEFAULT 0, message_id integer, curr_command varchar, '
+            'invalid_reply_count integer)'
+        ))
+        await conn.execute(text(
+            'INSERT INTO bench_users (chat_id, state) SELECT :first + n, \'ready\' FROM generate_series(0, :chats - 1) n'
+        ), {'first': FIRST_CHAT, 'chats': CHATS})
+
+    try:
+        print(f'{UPDATES} updates over {CHATS} chats, {CONCURRENCY} in flight')
+        print(f'postgres row update   {await run(postgres_update):10.0f} updates/s')
+        store = ChatStateStore(ttl=600, load=redis_get_chat_state, save=redis_set_chat_state)
+        print(f'redis chat hash       {await run(redis_update(store)):10.0f} updates/s')
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text('DROP TABLE bench_users'))
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
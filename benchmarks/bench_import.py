@@ -0,0 +1,61 @@
+'''Cold-start import time of the API process and the Celery worker.
+
+Every module is imported in a fresh interpreter, so nothing is cached between
+rounds. -X importtime is used to list the slowest imports of the last round.
+
+Run: python -m benchmarks.bench_import
+'''
+import os
+import statistics
+import subprocess
+import sys
+
+ROUNDS = 5
+MODULES = ('app.main', 'app.celery.celery_app', 'app.polling')
+HEAVY = ('reportlab', 'googleapiclient', 'gtts', 'youtube_transcript_api', 'asyncpg', 'psycopg', 'numpy')
+
+CODE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(f'{{elapsed:.1f}} {{",".join(heavy)}}')
+'''
+
+
+def import_once(module: str, importtime: bool = False) -> tuple[float, str, str]:
+    args = [sys.executable]
+    if importtime:
+        args += ['-X', 'importtime']
+    args += ['-c', CODE.format(module=module, heavy=HEAVY)]
+
+    env = {**os.environ, 'BOT_TOKEN': os.environ.get('BOT_TOKEN', 'benchmark')}
+    result = subprocess.run(args, capture_output=True, text=True, env=env, check=True)
+    elapsed, _, heavy = result.stdout.strip().splitlines()[-1].partition(' ')
+    return float(elapsed), heavy, result.stderr
+
+
+def slowest_imports(stderr: str, top: int = 5) -> list[tuple[int, str]]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    for module in MODULES:
+        timings = [import_once(module)[0] for _ in range(ROUNDS)]
+        _, heavy, stderr = import_once(module, importtime=True)
+
+        print(f'{module:<24} median {statistics.median(timings):8.1f} ms   '
+              f'min {min(timings):8.1f} ms   heavy modules: {heavy or "none"}')
+        for cumulative, name in slowest_imports(stderr):
+            print(f'    {cumulative / 1000:8.1f} ms  {name.strip()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+'''Fitting the scheduler parameters of every chat to a review log of millions of rows.
+
+The log is simulated: each chat forgets along the power curve the optimizer
+assumes, with its own memory drawn between 0.5 and 3, and answers 'easy' or
+'perfect' when it recalls a card. The cards are scheduled with the default
+parameters, as the bot did before the fit, and rated somewhat late.
+
+Reported are the time to sort the log, and the time of the grid search
+(9 good_penalty replays x 25 memories). Then, per the fitted curves, the
+retention at the default intervals and the reviews needed for the target
+retention compared with the default schedule, which only holds it for chats
+of memory 1.
+
+Run: python -m benchmarks.bench_optimizer [--chats N] [--cards N] [--reviews N]
+'''
+import argparse
+import time
+import numpy as np
+from app.bot.spaced_review.optimizer import ReviewHistory, fit, recall_probability
+from app.bot.spaced_review.scheduler import Deck, schedule
+
+
+def simulate(chats: int, cards: int, reviews: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    memory = rng.uniform(0.5, 3.0, chats)
+    chat_id = np.repeat(np.arange(chats), cards)
+    total = chats * cards
+    deck = Deck.of(np.zeros(total), np.ones(total))
+    now = rng.uniform(0, 3600, total)
+    word_id = np.arange(total)
+    rows = []
+    for _ in range(reviews):
+        elapsed = deck.interval * rng.uniform(0.9, 1.6, total)
+        now = now + elapsed * 60
+        recalled = rng.random(total) < recall_probability(elapsed, deck.stability, memory[chat_id])
+        rating = np.where(recalled, rng.choice([4, 5], total, p=[0.8, 0.2]), 0)
+        rows.append(np.column_stack([chat_id, word_id, word_id % 2, now, rating, elapsed,
+                                     deck.repetitions, deck.easiness, deck.stability]))
+        deck = schedule(rating, deck)
+    return np.concatenate(rows), memory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chats', type=int, default=2_000)
+    parser.add_argument('--cards', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=10)
+    parser.add_argument('--retention', type=float, default=0.9)
+    args = parser.parse_args()
+
+    columns, memory = simulate(args.chats, args.cards, args.reviews)
+    rows = len(columns)
+
+    started = time.perf_counter()
+    history = ReviewHistory.of(columns)
+    sort_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fits = fit(history, args.retention, min_reviews=0)
+    fit_time = time.perf_counter() - started
+
+    fitted = np.array([f.memory for f in fits])
+    factor = np.array([f.interval_factor for f in fits])
+    retention = np.array([f.retention for f in fits])
+    error = np.abs(fitted / memory[[f.chat_id for f in fits]] - 1)
+
+    print(f'{rows:,} log rows, {args.chats} chats, {args.chats * args.cards:,} cards')
+    print(f'sort by card and time      {sort_time:8.2f} s')
+    print(f'grid search                {fit_time:8.2f} s   {rows / fit_time:12,.0f} rows/s')
+    print(f'memory error, median       {np.median(error):8.1%}')
+    print(f'retention at the default intervals  {retention.min():.3f} .. {retention.max():.3f}')
+    print(f'reviews for {args.retention:.0%} retention vs default  {np.mean(1 / factor):.2f}x')
+
+
+if __name__ == '__main__':
+    main()
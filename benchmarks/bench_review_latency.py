@@ -0,0 +1,137 @@
+'''Rating-to-next-card latency of a review session.
+
+A "forgot" rating used to send the translation, then the voice (with a 0.2 s
+sleep after its bytes were found in Redis), and only then the next card. Now
+the next card is sent together with the feedback, and the voices of upcoming
+cards are synthesized while the user looks at them in case they are not in
+Redis yet. The old order is reproduced from the same pieces; the voices are
+already in Redis for both, as they are for words voiced when they were saved.
+
+Telegram, Redis and the database are in-process stand-ins with fixed delays,
+so the numbers show the ordering, not the network.
+
+Run: python -m benchmarks.bench_review_latency
+'''
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+from app.bot import pronunciation as pronunciation_module
+from app.bot.pronunciation import Pronunciation
+from app.bot.spaced_review import review as review_module
+from app.bot.spaced_review.review import SpacedReview
+from app.bot.spaced_review.review_latency import ReviewLatency
+from app.bot.spaced_review.review_pages import ReviewPager
+from app.bot.spaced_review.review_states import ReviewSessionStore
+from app.data.cache.chat_state import ChatStateStore
+from app.data.models import User
+from app.telegram_utils import utils as utils_module
+from app.telegram_utils.utils import send_message
+
+WORDS = 20
+TELEGRAM_DELAY = 0.04
+SYNTHESIS_DELAY = 0.3
+THINKING_TIME = 0.5
+DUE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def install_stand_ins(words: int):
+    tts = {(chat_id, f'word{i}', 'en'): b'ID3' + b'\x00' * 997 for chat_id in (1, 2) for i in range(words)}
+    pronunciation_module.redis_get_voice_file_id = lambda word, lang, voice: None
+    pronunciation_module.redis_set_voice_file_id = lambda *args, **kwargs: None
+    pronunciation_module.redis_get_hash = lambda chat_id, word, lang, field: tts.get((chat_id, word, lang))
+    pronunciation_module.redis_set_hash = lambda chat_id, word, lang, field, data: tts.__setitem__((chat_id, word, lang), data)
+
+    def synthesize(self, tmp_path, word, lang):
+        time.sleep(SYNTHESIS_DELAY)
+        with open(tmp_path, 'wb') as f:
+            f.write(b'ID3' + b'\x00' * 997)
+
+    Pronunciation.synthesize = synthesize
+    review_module.review_sessions = ReviewSessionStore()
+    utils_module.chat_state_store = ChatStateStore()
+    review_module.review_pager = ReviewPager(page_size=WORDS)
+
+
+def make_client() -> httpx.AsyncClient:
+    async def handler(request):
+        await asyncio.sleep(TELEGRAM_DELAY)
+        return httpx.Response(200, json={'ok': True, 'result': {'message_id': 500, 'voice': {'file_id': 'voice'}}})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def make_review(client, pronunciation) -> SpacedReview:
+    rows = [SimpleNamespace(id=i, word=f'word{i}', translate=f'translation{i}', repetitions=0, interval=1,
+                            review_time=DUE + timedelta(minutes=i), easiness=2.5, stability=1.0,
+                            good_penalty=None, interval_factor=None) for i in range(WORDS)]
+
+    async def get_due_page(model, chat_id, language, due_before, after, limit, with_params=False):
+        return [row for row in rows if after is None or (row.review_time, row.id) > after][:limit]
+
+    async def get_review_words(model, ids):
+        return {row.id: (row.id, row.word, row.translate, row.repetitions, row.interval, row.review_time,
+                         row.easiness, row.stability)
+                for row in rows if row.id in ids}
+
+    word_crud = SimpleNamespace(get_due_page=get_due_page, get_review_words=get_review_words)
+    db = SimpleNamespace(add=MagicMock(), commit=AsyncMock(), refresh=AsyncMock(), execute=AsyncMock())
+    return SpacedReview(word_crud, pronunciation, db, client)
+
+
+async def sequential_forgot(review: SpacedReview, chat_id: int, user: User, word: str, client) -> float:
+    '''The old order: translation, voice synthesized on demand, then the next card.'''
+
+    start = time.monotonic()
+    await review.check_word_quality(chat_id, SimpleNamespace(word=word, translate='translation'), 0, user)
+    user.message_id = await send_message(text='next card', chat_id=chat_id, user_state=user, client=client)
+    return time.monotonic() - start
+
+
+async def run_old(rounds: int) -> list[float]:
+    client = make_client()
+    review = make_review(client, Pronunciation(client))
+    user = User(chat_id=1, state='await_rating', curr_command='/repeating', lang_code='en', message_id=10)
+    return [await sequential_forgot(review, 1, user, f'word{i}', client) for i in range(rounds)]
+
+
+async def run_new(rounds: int) -> list[float]:
+    client = make_client()
+    pronunciation = Pronunciation(client)
+    latency = ReviewLatency()
+    review_module.review_latency = latency
+    user = User(chat_id=2, state='ready', curr_command='/repeating', lang_code='en', review_index=0, message_id=10)
+    await make_review(client, pronunciation).start_review(chat_id=2, user_state=user, text='/repeating',
+                                                         client=client, model_param='word')
+    samples = []
+    for _ in range(rounds):
+        # the user looks at the card for a while before rating it
+        await asyncio.sleep(THINKING_TIME)
+        review = make_review(client, pronunciation)
+        await review.continue_review(chat_id=2, user_state=user, text='forgot', client=client,
+                                     reply_to_id=10, model_param='word')
+        samples.append(latency.samples['forgot'][-1])
+    # the feedback of the last rating may still be on its way
+    await asyncio.sleep(SYNTHESIS_DELAY + 1)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    print(f'{name:<24} {statistics.median(samples) * 1000:10.1f} {samples[int(len(samples) * 0.95)] * 1000:9.1f}')
+
+
+async def main():
+    install_stand_ins(WORDS)
+    rounds = 10
+    print(f'"forgot" ratings, telegram {TELEGRAM_DELAY * 1000:.0f} ms per call, synthesis {SYNTHESIS_DELAY * 1000:.0f} ms')
+    print(f'{"order":<24} {"median ms":>10} {"p95 ms":>9}')
+    report('feedback, then card', await run_old(rounds))
+    report('warmed, concurrent', await run_new(rounds))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
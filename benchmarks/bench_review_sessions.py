@@ -0,0 +1,115 @@
+'''Memory held by concurrent review sessions.
+
+Before, review_states kept a list of ORM Word objects per chat in the process.
+Now a session is a few packed fields (word ids as uint32, unwritten results as
+fixed-size records) in a Redis hash per chat; without Redis the same encoded
+fields are kept in the process, which is what is measured here.
+
+Building 100k sessions of ORM objects takes gigabytes, so the old layout is
+measured on a sample and scaled linearly. With --redis the growth of Redis
+used_memory is reported as well (needs a server on localhost, the keys are
+deleted afterwards).
+
+Run: python -m benchmarks.bench_review_sessions [--redis]
+'''
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from sqlalchemy.orm import make_transient_to_detached
+from app.data.models import Word
+from app.bot.spaced_review.review_states import ReviewResult, ReviewSession, ReviewSessionStore
+
+SESSIONS = 100_000
+ORM_SAMPLE = 5_000
+WORDS_PER_SESSION = 20
+RATED_PER_SESSION = 5
+NOW = datetime.now(timezone.utc)
+
+
+def orm_sessions(count: int) -> dict:
+    sessions = {}
+    for chat_id in range(count):
+        words = []
+        for i in range(WORDS_PER_SESSION):
+            word = Word(id=chat_id * WORDS_PER_SESSION + i, chat_id=chat_id, user_id=chat_id, word=f'word{i}',
+                        translate=f'translation{i}', language='en', repetitions=1, interval=1, review_time=NOW)
+            make_transient_to_detached(word)
+            words.append(word)
+        sessions[chat_id] = words
+    return sessions
+
+
+def compact_sessions(count: int) -> ReviewSessionStore:
+    store = ReviewSessionStore()
+    results = {i: ReviewResult(2, 5, NOW, 2.5, 5.0) for i in range(RATED_PER_SESSION)}
+
+    async def fill():
+        for chat_id in range(count):
+            first = chat_id * WORDS_PER_SESSION
+            await store.put(chat_id, ReviewSession(range(first, first + WORDS_PER_SESSION), results=dict(results)))
+
+    asyncio.run(fill())
+    return store
+
+
+def measure(build, count: int) -> tuple[float, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build(count)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size, elapsed
+
+
+def redis_memory(count: int) -> float:
+    from app.data.cache.redis_init import r
+    from app.data.cache.redis_crud import (REVIEW_SESSIONS_KEY, redis_set_review_session,
+                                           redis_delete_review_session)
+
+    results = {i: ReviewResult(2, 5, NOW, 2.5, 5.0) for i in range(RATED_PER_SESSION)}
+    first_chat = 10**12
+
+    async def measure_redis():
+        before = r.info('memory')['used_memory']
+        for chat_id in range(first_chat, first_chat + count):
+            session = ReviewSession(range(WORDS_PER_SESSION), results=dict(results))
+            await redis_set_review_session(chat_id, session.encode(), session.touched, 3600)
+        used = r.info('memory')['used_memory'] - before
+        for chat_id in range(first_chat, first_chat + count):
+            await redis_delete_review_session(chat_id)
+        return used
+
+    used = asyncio.run(measure_redis())
+    if not r.zcard(REVIEW_SESSIONS_KEY):
+        r.delete(REVIEW_SESSIONS_KEY)
+    return used
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--redis', action='store_true', help='also measure Redis used_memory')
+    args = parser.parse_args()
+
+    orm_size, orm_time = measure(orm_sessions, ORM_SAMPLE)
+    scale = SESSIONS / ORM_SAMPLE
+    compact_size, compact_time = measure(compact_sessions, SESSIONS)
+
+    print(f'{SESSIONS} sessions, {WORDS_PER_SESSION} words each, {RATED_PER_SESSION} unwritten results')
+    print(f'{"layout":<28} {"MiB":>10} {"bytes/session":>14} {"build s":>9}')
+    print(f'{"ORM words (scaled)":<28} {orm_size * scale / 2**20:10.1f} {orm_size / ORM_SAMPLE:14.0f} '
+          f'{orm_time * scale:9.2f}')
+    print(f'{"packed, in process":<28} {compact_size / 2**20:10.1f} {compact_size / SESSIONS:14.0f} '
+          f'{compact_time:9.2f}')
+    if args.redis:
+        used = redis_memory(SESSIONS)
+        print(f'{"packed, redis used_memory":<28} {used / 2**20:10.1f} {used / SESSIONS:14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+'''Scheduling and forecasting a deck of 1M cards.
+
+Before, a rating went through SpacedReview.update_word_states one word at a
+time. scheduler.schedule updates repetitions, interval, easiness and stability
+of a whole deck with array operations; update_word_states now calls it with a
+deck of one card. The word-by-word loop below applies the same rules to plain
+Python values, which is the best the old code could do without the ORM.
+
+The forecast counts the cards coming due per hour and per day over the next
+days, rating each card 'easy' when it comes due and counting it again when it
+comes back. The columns are generated here as the words table would return
+them, the query itself is not measured.
+
+Run: python -m benchmarks.bench_scheduler [--cards N] [--days N]
+'''
+import argparse
+import time
+import numpy as np
+from app.bot.spaced_review.scheduler import DEFAULT_PARAMS, Deck, forecast, schedule
+
+
+def random_deck(cards: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray, Deck]:
+    rng = np.random.default_rng(seed)
+    repetitions = rng.integers(0, 12, cards)
+    interval = np.maximum(1, (10 * 1.75 ** np.maximum(0, repetitions - 3))).astype(np.int64)
+    deck = Deck.of(repetitions, interval, rng.uniform(1.3, 3.0, cards), interval.astype(np.float64))
+    quality = rng.choice([0, 3, 4, 5], cards, p=[0.1, 0.2, 0.5, 0.2])
+    # up to a week overdue, up to a month ahead
+    due_in = rng.uniform(-7 * 24 * 60, 30 * 24 * 60, cards)
+    return quality, due_in, deck
+
+
+def one_by_one(quality, deck: Deck, params=DEFAULT_PARAMS) -> list:
+    steps = params.steps
+    results = []
+    for q, repetitions, interval, easiness, stability in zip(
+            quality.tolist(), deck.repetitions.tolist(), deck.interval.tolist(),
+            deck.easiness.tolist(), deck.stability.tolist()):
+        if q < 3:
+            repetitions, stability = 0, float(params.lapse_interval)
+            interval = params.lapse_interval
+        elif q > 3:
+            repetitions += 1
+            if repetitions <= len(steps):
+                stability = float(steps[repetitions - 1])
+            else:
+                stability *= easiness if q == 5 else max(params.min_easiness, easiness - params.good_penalty)
+            interval = max(1, int(stability))
+        miss = 5 - q
+        easiness = max(params.min_easiness, easiness + 0.1 - miss * (0.08 + miss * 0.02))
+        results.append((repetitions, interval, easiness, stability))
+    return results
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cards', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    quality, due_in, deck = random_deck(args.cards)
+
+    looped, loop_time = timed(one_by_one, quality, deck)
+    vectorized, vector_time = timed(schedule, quality, deck)
+    assert [card[1] for card in looped] == vectorized.interval.tolist()
+
+    print(f'{args.cards} cards')
+    print(f'{"":<32} {"s":>8} {"cards/s":>14}')
+    print(f'{"schedule, word by word":<32} {loop_time:8.3f} {args.cards / loop_time:14,.0f}')
+    print(f'{"schedule, vectorized":<32} {vector_time:8.3f} {args.cards / vector_time:14,.0f}')
+
+    for bucket in ('hour', 'day'):
+        for quality_label, rating in (('as due', None), ('easy', 4)):
+            counts, spent = timed(forecast, due_in, deck, args.days, bucket, rating)
+            print(f'{f"forecast {args.days}d by {bucket}, {quality_label}":<32} {spent:8.3f} '
+                  f'{"":>14} {counts.sum():,} reviews')
+
+
+if __name__ == '__main__':
+    main()
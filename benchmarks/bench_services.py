@@ -0,0 +1,62 @@
+'''Per-update overhead of building the bot object graph.
+
+Compares the old path, where Services builds every service for each webhook
+call, with the container path, where only the per-request parts are created.
+
+Run: python -m benchmarks.bench_services
+'''
+import os
+import asyncio
+import statistics
+import time
+import httpx
+
+for i in range(1, 6):
+    os.environ.setdefault(f'YOU_TUBE_KEY{i if i > 1 else ""}', f'benchmark-key-{i}')
+
+from app.container import ServiceContainer
+from app.http_pool import HTTPClientPool
+from app.bot.telegram_bot import Services, TelegramBot
+from app.data.user_crud import UserCRUD
+from app.web.command_dispatcher import CommandDispatcher
+from app.web.state_dispatcher import StateDispatcher
+
+ROUNDS = 200
+
+
+def build_graph(db, client, container=None):
+    user_crud = UserCRUD(db)
+    services = Services(db, client, container)
+    bot = TelegramBot(services)
+    CommandDispatcher(bot, services, user_crud, client)
+    StateDispatcher(bot, db)
+
+
+def measure(fn) -> list[float]:
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    timings.sort()
+    print(f'{name:<22} median {statistics.median(timings):8.3f} ms   '
+          f'p95 {timings[int(len(timings) * 0.95)]:8.3f} ms')
+
+
+async def main():
+    db = object()
+    container = ServiceContainer(HTTPClientPool())
+
+    async with httpx.AsyncClient() as client:
+        report('per-update Services', measure(lambda: build_graph(db, client)))
+
+    report('container Services', measure(lambda: build_graph(db, container.client, container)))
+    await container.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
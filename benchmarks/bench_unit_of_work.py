@@ -0,0 +1,115 @@
+'''Database round trips of one "explain word" update.
+
+The update writes the user row four times: message_id/curr_command in the webhook,
+update_state_to_await, AIClient.get_explanation and TelegramBot.update_user_state.
+The old update_bd committed and refreshed after each of them; with a unit of work
+the webhook part and the explanation task commit once each, without refreshes.
+
+Round trips are counted on a session stand-in: every execute, flush of pending
+changes, COMMIT and refresh SELECT is one trip to Postgres.
+
+Run: python -m benchmarks.bench_unit_of_work
+'''
+import asyncio
+import statistics
+import time
+from app.data.models import User
+from app.data.unit_of_work import unit_of_work
+from app.telegram_utils.utils import update_bd, update_state_to_await
+
+ROUNDS = 1000
+LATENCY = 0.0005
+
+
+class CountingSession:
+    def __init__(self):
+        self.round_trips = 0
+        self.dirty = False
+
+    async def _trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(LATENCY)
+
+    def add(self, obj):
+        self.dirty = True
+
+    def add_all(self, objs):
+        self.dirty = True
+
+    async def execute(self, *args, **kwargs):
+        await self._trip()
+
+    async def commit(self):
+        if self.dirty:
+            await self._trip()
+            self.dirty = False
+        await self._trip()
+
+    async def rollback(self):
+        await self._trip()
+
+    async def refresh(self, obj):
+        await self._trip()
+
+
+async def legacy_update_bd(obj, bd):
+    bd.add(obj)
+    await bd.commit()
+    await bd.refresh(obj)
+
+
+async def legacy_update(db, user):
+    await db.execute('select user')
+    user.message_id = 1
+    user.curr_command = None
+    await legacy_update_bd(user, db)
+    user.state = 'await_response'
+    await legacy_update_bd(user, db)
+
+    user.last_word = 'word'
+    await legacy_update_bd(user, db)
+    user.state = 'ready'
+    await legacy_update_bd(user, db)
+
+
+async def unit_of_work_update(db, user):
+    async with unit_of_work(db):
+        await db.execute('select user')
+        user.message_id = 1
+        user.curr_command = None
+        await update_bd(user, db)
+        await update_state_to_await(user, db)
+
+    async with unit_of_work(db):
+        user.last_word = 'word'
+        await update_bd(user, db)
+        user.state = 'ready'
+        await update_bd(user, db)
+
+
+async def measure(update) -> tuple[int, list[float]]:
+    timings = []
+    trips = 0
+    for _ in range(ROUNDS):
+        db = CountingSession()
+        start = time.perf_counter()
+        await update(db, User(chat_id=1))
+        timings.append((time.perf_counter() - start) * 1000)
+        trips = db.round_trips
+    return trips, timings
+
+
+def report(name: str, trips: int, timings: list[float]):
+    timings.sort()
+    print(f'{name:<16} {trips:3d} round trips   median {statistics.median(timings):7.3f} ms   '
+          f'p95 {timings[int(len(timings) * 0.95)]:7.3f} ms')
+
+
+async def main():
+    print(f'{ROUNDS} updates, {LATENCY * 1000:.1f} ms per round trip')
+    report('commit+refresh', *await measure(legacy_update))
+    report('unit of work', *await measure(unit_of_work_update))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
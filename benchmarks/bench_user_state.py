@@ -0,0 +1,78 @@
+'''Cost of loading the user's state for one update against vocabulary size.
+
+Before, User.words was eager (selectin), so the state lookup in check_exists and
+the refresh after it loaded every saved word. Now the lookup reads the users row
+only. The old behaviour is reproduced with an explicit selectinload.
+
+Runs on in-memory SQLite so it needs no server; with Postgres the difference
+grows by the extra network round trips.
+
+Run: python -m benchmarks.bench_user_state
+'''
+import statistics
+import time
+import tracemalloc
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, selectinload
+from app.data.class_base import Base
+from app.data.models import User, Word
+
+ROUNDS = 50
+VOCABULARY_SIZES = (0, 100, 1_000, 10_000)
+CHAT_ID = 1
+
+
+def seed(size: int):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, chat_id=CHAT_ID))
+        db.flush()
+        if size:
+            db.execute(insert(Word), [
+                {'chat_id': CHAT_ID, 'user_id': 1, 'word': f'word{i}', 'translate': f'translate{i}', 'language': 'en'}
+                for i in range(size)
+            ])
+        db.commit()
+    return engine
+
+
+def eager_state(db: Session) -> str:
+    user = db.execute(select(User).where(User.chat_id == CHAT_ID).options(selectinload(User.words))).scalar_one()
+    db.refresh(user)
+    return user.state
+
+
+def slim_state(db: Session) -> str:
+    user = db.execute(select(User).where(User.chat_id == CHAT_ID)).scalar_one()
+    return user.state
+
+
+def measure(engine, lookup) -> tuple[list[float], float]:
+    timings = []
+    peaks = []
+    for _ in range(ROUNDS):
+        with Session(engine) as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+            lookup(db)
+            timings.append((time.perf_counter() - start) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+    return timings, statistics.median(peaks)
+
+
+def main():
+    print(f'{"words":>7}  {"lookup":<8} {"median ms":>10} {"p95 ms":>9} {"peak KiB":>10}')
+    for size in VOCABULARY_SIZES:
+        engine = seed(size)
+        for name, lookup in (('eager', eager_state), ('slim', slim_state)):
+            timings, peak = measure(engine, lookup)
+            timings.sort()
+            print(f'{size:>7}  {name:<8} {statistics.median(timings):10.3f} '
+                  f'{timings[int(len(timings) * 0.95)]:9.3f} {peak:10.1f}')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""move ephemeral conversation fields of 'User' to Redis
+
+Revision ID: 5d0e7b2c9a61
+Revises: c3a91f27d5b4
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0e7b2c9a61'
+down_revision: Union[str, Sequence[str], None] = 'c3a91f27d5b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # message_id, curr_command, review_index and invalid_reply_count live in the chat hash in Redis now
+    op.drop_column('users', 'invalid_reply_count')
+    op.drop_column('users', 'curr_command')
+    op.drop_column('users', 'message_id')
+    op.drop_column('users', 'review_index')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('users', sa.Column('review_index', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('message_id', sa.Integer(), nullable=True))
+    op.add_column('users', sa.Column('curr_command', sa.String(), nullable=True))
+    op.add_column('users', sa.Column('invalid_reply_count', sa.Integer(), nullable=True))
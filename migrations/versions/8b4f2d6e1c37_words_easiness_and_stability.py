@@ -0,0 +1,34 @@
+"""per-card easiness and stability of 'words' and 'revers_words'
+
+Revision ID: 8b4f2d6e1c37
+Revises: 5d0e7b2c9a61
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4f2d6e1c37'
+down_revision: Union[str, Sequence[str], None] = '5d0e7b2c9a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('words', 'revers_words'):
+        op.add_column(table, sa.Column('easiness', sa.Float(), nullable=False, server_default='2.5'))
+        op.add_column(table, sa.Column('stability', sa.Float(), nullable=False, server_default='1'))
+        # the words scheduled so far continue from their current interval
+        op.execute(sa.text(f'UPDATE {table} SET stability = interval'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('revers_words', 'words'):
+        op.drop_column(table, 'stability')
+        op.drop_column(table, 'easiness')
@@ -0,0 +1,51 @@
+"""indexes for review lookups and a unique word per chat and language
+
+Revision ID: c3a91f27d5b4
+Revises: 9fe8371309f3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91f27d5b4'
+down_revision: Union[str, Sequence[str], None] = '9fe8371309f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# a reverse card is the translation of one saved word, synonyms share a translation
+# (big -> большой, large -> большой), so it is only unique together with the word it translates
+TABLES = {
+    'words': ('ix_words_chat_language_review_time', 'uq_words_chat_language_word',
+              ['chat_id', 'language', 'word']),
+    'revers_words': ('ix_revers_words_chat_language_review_time', 'uq_revers_words_chat_language_word_translate',
+                     ['chat_id', 'language', 'word', 'translate']),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the unique index can not be built while exact duplicates exist, keep the oldest row
+    for table, (_, _, columns) in TABLES.items():
+        same = ' AND '.join(f'a.{column} = b.{column}' for column in columns)
+        op.execute(f'DELETE FROM {table} a USING {table} b WHERE {same} AND a.id > b.id')
+
+    # CREATE INDEX CONCURRENTLY does not lock writes but can not run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, (review_index, unique_index, columns) in TABLES.items():
+            op.create_index(review_index, table, ['chat_id', 'language', 'review_time'],
+                            postgresql_concurrently=True, if_not_exists=True)
+            op.create_index(unique_index, table, columns, unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, (review_index, unique_index, _) in TABLES.items():
+            op.drop_index(unique_index, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.drop_index(review_index, table_name=table, postgresql_concurrently=True, if_exists=True)
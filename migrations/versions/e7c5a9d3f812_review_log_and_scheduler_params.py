@@ -0,0 +1,55 @@
+"""append-only 'review_log' and the fitted 'scheduler_params' of chats
+
+Revision ID: e7c5a9d3f812
+Revises: 8b4f2d6e1c37
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c5a9d3f812'
+down_revision: Union[str, Sequence[str], None] = '8b4f2d6e1c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'review_log',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('word_id', sa.Integer(), nullable=False),
+        sa.Column('reverse', sa.Boolean(), nullable=False),
+        sa.Column('reviewed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('rating', sa.SmallInteger(), nullable=False),
+        sa.Column('elapsed', sa.Float(), nullable=False),
+        sa.Column('repetitions', sa.Integer(), nullable=False),
+        sa.Column('easiness', sa.Float(), nullable=False),
+        sa.Column('stability', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('uq_review_log_card_reviewed_at', 'review_log', ['word_id', 'reverse', 'reviewed_at'], unique=True)
+    op.create_index('ix_review_log_chat', 'review_log', ['chat_id'])
+    op.create_table(
+        'scheduler_params',
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('good_penalty', sa.Float(), nullable=False),
+        sa.Column('interval_factor', sa.Float(), nullable=False),
+        sa.Column('reviews', sa.Integer(), nullable=False),
+        sa.Column('fitted_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('chat_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduler_params')
+    op.drop_index('ix_review_log_chat', table_name='review_log')
+    op.drop_index('uq_review_log_card_reviewed_at', table_name='review_log')
+    op.drop_table('review_log')